@@ -0,0 +1,43 @@
+"""Batched logging for the strategy code.
+
+Log entries are appended to a bounded ring buffer rather than sent to the game
+log one by one. The buffer is flushed once, at the end of the turn, on the
+thread of the turn and to the log of that turn: the entries are joined with
+newlines into one log entry per batch of up to `batch_size` entries. When the
+buffer overflows the oldest entries are dropped, and the amount of dropped
+entries is reported first thing in the next flush.
+"""
+import collections
+
+DEFAULT_CAPACITY = 1024
+DEFAULT_BATCH_SIZE = 64
+
+
+class BatchedLogger:
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.dropped = 0
+        self.failed_entries = 0
+        self.batch_size = batch_size
+        self._entries = collections.deque(maxlen=capacity)
+        self._dropped_since_flush = 0
+
+    def log(self, log_entry: str):
+        """Queues the given log entry until the next flush."""
+        if len(self._entries) == self._entries.maxlen:
+            self.dropped += 1
+            self._dropped_since_flush += 1
+        self._entries.append(str(log_entry))
+
+    def flush(self, sink):
+        """Sends everything queued so far to sink, a batch of entries at a time."""
+        entries = list(self._entries)
+        self._entries.clear()
+        if self._dropped_since_flush:
+            entries.insert(0, f'{self._dropped_since_flush} log entries were dropped')
+            self._dropped_since_flush = 0
+        for start in range(0, len(entries), self.batch_size):
+            batch = entries[start:start + self.batch_size]
+            try:
+                sink('\n'.join(batch))
+            except Exception:
+                self.failed_entries += len(batch)
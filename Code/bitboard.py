@@ -0,0 +1,113 @@
+"""Territories as bitboards.
+
+A bitboard is a Python int with one bit per tile: tile (x, y) is bit
+`x * (height + 1) + y`. The extra bit of every column is always clear, so
+shifting a board by one bit moves it along the Y axis without spilling into
+the next column, and shifting by a whole column moves it along the X axis.
+Whole-territory questions then take a few big-int operations, e.g. our tiles
+that touch unclaimed land:
+
+    boards.our & boards.expand(boards.unclaimed)
+"""
+from common_types import Coordinates
+from tactical_api import TurnContext
+
+
+class Geometry:
+    """The bit layout of a board of a given size."""
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.stride = height + 1
+        column = (1 << height) - 1
+        self.full = 0
+        self.columns = []
+        for x in range(width):
+            self.columns.append(column << (x * self.stride))
+            self.full |= self.columns[-1]
+        self.rows = [sum(1 << (x * self.stride + y) for x in range(width)) for y in range(height)]
+
+    def bit(self, coords: Coordinates) -> int:
+        return 1 << (coords[0] * self.stride + coords[1])
+
+    def from_tiles(self, tiles) -> int:
+        board = 0
+        stride = self.stride
+        for x, y in tiles:
+            board |= 1 << (x * stride + y)
+        return board
+
+    def tiles(self, board: int) -> list[Coordinates]:
+        ret = []
+        while board:
+            lowest = board & -board
+            x, y = divmod(lowest.bit_length() - 1, self.stride)
+            ret.append(Coordinates(x, y))
+            board ^= lowest
+        return ret
+
+    def expand(self, board: int) -> int:
+        """The tiles adjacent to the board's tiles, not including them."""
+        stride = self.stride
+        return ((board << 1) | (board >> 1) | (board << stride) | (board >> stride)) & self.full & ~board
+
+    def inner_border(self, board: int) -> int:
+        """The board's tiles that touch a tile outside of it."""
+        return board & self.expand(self.full & ~board)
+
+    def centroid(self, board: int) -> Coordinates | None:
+        """The mass center of the board's tiles, from a popcount per row and column."""
+        count = board.bit_count()
+        if not count:
+            return None
+        x_sum = sum(x * (board & column).bit_count() for x, column in enumerate(self.columns))
+        y_sum = sum(y * (board & row).bit_count() for y, row in enumerate(self.rows))
+        return Coordinates(x_sum // count, y_sum // count)
+
+
+class Territories:
+    """A bitboard per country, kept up to date from the turn diffs."""
+
+    def __init__(self):
+        self.geometry: Geometry = None
+        self.my_country = None
+        self.boards: dict[str, int] = {}
+
+    def update(self, context: TurnContext, diff=None):
+        """Applies the owner changes of the diff, or rebuilds the boards without one."""
+        if (diff is None or self.geometry is None or self.my_country != context.my_country
+                or (self.geometry.width, self.geometry.height) != (context.game_width, context.game_height)):
+            self.geometry = Geometry(context.game_width, context.game_height)
+            self.my_country = context.my_country
+            self.boards = {country: self.geometry.from_tiles(context.get_tiles_of_country(country))
+                           for country in context.all_countries}
+            return
+        bit = self.geometry.bit
+        for coords, (old_owner, new_owner) in diff.owners.items():
+            if old_owner is not None:
+                self.boards[old_owner] &= ~bit(coords)
+            if new_owner is not None:
+                self.boards[new_owner] = self.boards.get(new_owner, 0) | bit(coords)
+
+    @property
+    def our(self) -> int:
+        return self.boards.get(self.my_country, 0)
+
+    @property
+    def enemy(self) -> int:
+        board = 0
+        for country, country_board in self.boards.items():
+            if country != self.my_country:
+                board |= country_board
+        return board
+
+    @property
+    def unclaimed(self) -> int:
+        owned = 0
+        for country_board in self.boards.values():
+            owned |= country_board
+        return self.geometry.full & ~owned
+
+    def expand(self, board: int) -> int:
+        return self.geometry.expand(board)
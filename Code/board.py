@@ -0,0 +1,35 @@
+from common_types import Coordinates
+from tactical_api import TurnContext, Tile
+
+
+def get_neighbours(context: TurnContext, coords: Coordinates) -> list[Coordinates]:
+    """Returns the coordinates of the (up to 4) tiles adjacent to `coords`."""
+    x, y = coords
+    ret = []
+    if x > 0:
+        ret.append(Coordinates(x - 1, y))
+    if y > 0:
+        ret.append(Coordinates(x, y - 1))
+    if x < context.game_width - 1:
+        ret.append(Coordinates(x + 1, y))
+    if y < context.game_height - 1:
+        ret.append(Coordinates(x, y + 1))
+    return ret
+
+
+def is_border(context: TurnContext, tile: Tile) -> bool:
+    if tile.country != context.my_country:
+        return False
+
+    for neighbour in get_neighbours(context, tile.coordinates):
+        if context.tiles[neighbour].country != context.my_country:
+            return True
+
+    return False
+
+
+def get_border_tiles(context: TurnContext) -> list[Coordinates]:
+    """Returns all of our tiles that touch a tile we do not own."""
+    our_tiles = context.get_tiles_of_country(context.my_country)
+    return [coords for coords in our_tiles
+            if any(neighbour not in our_tiles for neighbour in get_neighbours(context, coords))]
@@ -0,0 +1,201 @@
+"""Border garrison allocation.
+
+The border of our territory is cut into short segments. Every turn the threat
+on each segment is estimated from the visible enemy pieces around it, and
+defending pieces are matched to the segments that lack them.
+"""
+from collections import deque
+import math
+
+from common_types import Coordinates, distance
+from board import get_neighbours
+from turn_view import TurnView
+
+SEGMENT_LENGTH = 6
+THREAT_RADIUS = 4
+
+# How much threat a single enemy piece puts on the segment it is near.
+TANK_THREAT = {'tank': 3}
+AIR_THREAT = {'artillery': 2, 'airplane': 2, 'helicopter': 2}
+
+# How much threat a single defending piece is able to hold.
+DEFENDER_CAPACITY = {'antitank': 3, 'irondome': 4}
+
+# Intelligence set by the strategy is forgotten after this many turns.
+INTELLIGENCE_TURNS = 8
+# Bits of the `estimate_tile_danger` flags that intelligence is given in, and
+# the threat each of them stands for. The other bits carry no threat.
+ENEMY_TANK_FLAG = 128
+ENEMY_ARTILLERY_FLAG = 2
+
+
+def expire_intelligence(intelligence: dict[Coordinates, tuple[int, int]], turn: int):
+    """Drops the (danger, turn) entries that are INTELLIGENCE_TURNS old."""
+    for coords in [coords for coords, (_, reported) in intelligence.items() if turn - reported >= INTELLIGENCE_TURNS]:
+        del intelligence[coords]
+
+
+class BorderSegment:
+    def __init__(self, segment_id: int, tiles: list[Coordinates]):
+        self.id = segment_id
+        self.tiles = tiles
+        self.anchor = tiles[len(tiles) // 2]
+        self.tank_threat = 0
+        self.air_threat = 0
+        self.unknown_tiles: list[Coordinates] = []
+        self.garrison = {'antitank': 0, 'irondome': 0}
+
+    def threat(self) -> int:
+        return self.tank_threat + self.air_threat
+
+    def demand(self, piece_type: str) -> int:
+        threat = self.tank_threat if piece_type == 'antitank' else self.air_threat
+        return math.ceil(threat / DEFENDER_CAPACITY[piece_type])
+
+    def deficit(self, piece_type: str) -> int:
+        return max(0, self.demand(piece_type) - self.garrison[piece_type])
+
+
+class BorderGarrison:
+    """Border segments of a single turn, with their threat and garrison."""
+
+    def __init__(self, context: TurnView, intelligence: dict[Coordinates, tuple[int, int]],
+                 defender_destinations: dict[str, Coordinates]):
+        self.context = context
+        self.segments: list[BorderSegment] = []
+        self.tile_to_segment: dict[Coordinates, int] = {}
+        # Every tile up to THREAT_RADIUS away from the border, mapped to the
+        # segment it is closest to.
+        self.zone: dict[Coordinates, int] = {}
+
+        self._build_segments()
+        self._build_zone()
+        self._estimate_threats(intelligence)
+        self._count_garrison(defender_destinations)
+
+    def _build_segments(self):
+        border = self.context.border_tiles
+        for start in border:
+            if start in self.tile_to_segment:
+                continue
+            segment_id = len(self.segments)
+            tiles = []
+            queue = deque([start])
+            self.tile_to_segment[start] = segment_id
+            while queue and len(tiles) < SEGMENT_LENGTH:
+                coords = queue.popleft()
+                tiles.append(coords)
+                x, y = coords
+                for dx in (-1, 0, 1):
+                    for dy in (-1, 0, 1):
+                        neighbour = Coordinates(x + dx, y + dy)
+                        if neighbour in border and neighbour not in self.tile_to_segment:
+                            self.tile_to_segment[neighbour] = segment_id
+                            queue.append(neighbour)
+            # Tiles that were queued but did not fit are released for the next
+            # segments.
+            for coords in queue:
+                del self.tile_to_segment[coords]
+            self.segments.append(BorderSegment(segment_id, tiles))
+
+    def _build_zone(self):
+        queue = deque()
+        for coords, segment_id in self.tile_to_segment.items():
+            self.zone[coords] = segment_id
+            queue.append((coords, 0))
+        while queue:
+            coords, depth = queue.popleft()
+            if depth == THREAT_RADIUS:
+                continue
+            for neighbour in get_neighbours(self.context, coords):
+                if neighbour not in self.zone:
+                    self.zone[neighbour] = self.zone[coords]
+                    queue.append((neighbour, depth + 1))
+        for coords, segment_id in self.zone.items():
+            if self.context.tiles[coords].money is None:
+                self.segments[segment_id].unknown_tiles.append(coords)
+
+    def _estimate_threats(self, intelligence: dict[Coordinates, tuple[int, int]]):
+        for piece in self.context.enemy_pieces:
+            segment_id = self.zone.get(piece.tile.coordinates)
+            if segment_id is None:
+                continue
+            segment = self.segments[segment_id]
+            segment.tank_threat += TANK_THREAT.get(piece.type, 0)
+            segment.air_threat += AIR_THREAT.get(piece.type, 0)
+        for coords, (danger, _) in intelligence.items():
+            segment_id = self.zone.get(coords)
+            if segment_id is None:
+                continue
+            if danger & ENEMY_TANK_FLAG:
+                self.segments[segment_id].tank_threat += TANK_THREAT['tank']
+            if danger & ENEMY_ARTILLERY_FLAG:
+                self.segments[segment_id].air_threat += AIR_THREAT['artillery']
+
+    def _count_garrison(self, defender_destinations: dict[str, Coordinates]):
+        for piece_id, destination in defender_destinations.items():
+            piece = self.context.my_pieces.get(piece_id)
+            segment_id = self.tile_to_segment.get(destination)
+            if piece is None or segment_id is None or piece.type not in DEFENDER_CAPACITY:
+                continue
+            self.segments[segment_id].garrison[piece.type] += 1
+
+    def segments_in_area(self, destination: Coordinates, radius: int) -> list[BorderSegment]:
+        return [segment for segment in self.segments if distance(segment.anchor, destination) <= radius]
+
+    def assign(self, pieces: list, destination: Coordinates, radius: int) -> dict[str, Coordinates]:
+        """Matches the given pieces to the segments around the destination.
+
+        The matching is a single pass: a piece that already stands near a segment
+        lacking its type stays there, and the rest fill the remaining deficits
+        from the most threatened segment down. Pieces left over when all
+        deficits are filled strengthen the most threatened segments in turn.
+        Returns a mapping from piece ID to the tile it should hold.
+        """
+        area = self.segments_in_area(destination, radius)
+        if not area:
+            return {piece.id: destination for piece in pieces}
+        area_ids = {segment.id for segment in area}
+        deficits = {(segment.id, piece_type): segment.deficit(piece_type)
+                    for segment in area for piece_type in DEFENDER_CAPACITY}
+
+        assignment = {}
+        leftovers = {piece_type: deque() for piece_type in DEFENDER_CAPACITY}
+        for piece in pieces:
+            if piece.type not in DEFENDER_CAPACITY:
+                continue
+            segment_id = self.zone.get(piece.tile.coordinates)
+            if segment_id in area_ids and deficits[(segment_id, piece.type)] > 0:
+                self._place(assignment, piece, self.segments[segment_id])
+                deficits[(segment_id, piece.type)] -= 1
+            else:
+                leftovers[piece.type].append(piece)
+
+        area.sort(key=lambda segment: segment.threat(), reverse=True)
+        for piece_type, queue in leftovers.items():
+            for segment in area:
+                while queue and deficits[(segment.id, piece_type)] > 0:
+                    self._place(assignment, queue.popleft(), segment)
+                    deficits[(segment.id, piece_type)] -= 1
+            i = 0
+            while queue:
+                self._place(assignment, queue.popleft(), area[i % len(area)])
+                i += 1
+
+        return assignment
+
+    def _place(self, assignment: dict[str, Coordinates], piece, segment: BorderSegment):
+        held = segment.garrison['antitank'] + segment.garrison['irondome']
+        assignment[piece.id] = segment.tiles[held % len(segment.tiles)]
+        segment.garrison[piece.type] += 1
+
+    def required_pieces(self) -> list[tuple[str, Coordinates, int]]:
+        ret = []
+        for segment in self.segments:
+            for piece_type in DEFENDER_CAPACITY:
+                ret.extend([(piece_type, segment.anchor, segment.threat())] * segment.deficit(piece_type))
+        return ret
+
+    def estimated_required_pieces(self, destination: Coordinates, radius: int) -> int:
+        area = self.segments_in_area(destination, radius)
+        return sum(segment.demand(piece_type) for segment in area for piece_type in DEFENDER_CAPACITY)
@@ -0,0 +1,120 @@
+"""Iron dome placement.
+
+An iron dome protects every tile up to IRON_DOME_RADIUS away from it. Each
+tile that a dome could stand on has a footprint: the bitboard of the tiles it
+would protect. Footprints only depend on the board size, so they are computed
+once per tile and kept for the whole game. The planner also keeps how many of
+our tiles every footprint covers, and updates those counts from the owner
+changes of every turn.
+
+Domes are placed by greedy weighted max-coverage: every dome goes where it
+protects the most weight that no other dome protects yet. Our tiles weigh 1,
+and tiles holding our builders or artillery weigh more, so that domes gather
+around them. Coverage can only shrink as domes are added, so the greedy pass
+is lazy: a candidate is rescored only when its previous score is at the top
+of the queue.
+"""
+import heapq
+
+import tables
+
+from bitboard import Geometry
+from common_types import Coordinates
+from turn_view import TurnView
+
+IRON_DOME_RADIUS = 3
+TILE_WEIGHT = 1
+PIECE_WEIGHTS = {'builder': 8, 'artillery': 4}
+
+
+class DomePlanner:
+    def __init__(self):
+        self.geometry: Geometry = None
+        self._footprints: dict[Coordinates, int] = {}
+        # Our tile -> how many of our tiles a dome standing there protects.
+        self.coverage: dict[Coordinates, int] = {}
+        self.our = 0
+        self._weighted: list[tuple[int, int]] = []
+
+    def footprint(self, coords: Coordinates) -> int:
+        footprint = self._footprints.get(coords)
+        if footprint is None:
+            footprint = tables.get(self.geometry.width, self.geometry.height).diamond(coords, IRON_DOME_RADIUS)
+            if footprint is None:
+                footprint = self.geometry.bit(coords)
+                for _ in range(IRON_DOME_RADIUS):
+                    footprint |= self.geometry.expand(footprint)
+            self._footprints[coords] = footprint
+        return footprint
+
+    def update(self, view: TurnView):
+        territories = view.territories
+        diff = view.diff
+        geometry = territories.geometry
+        if self.geometry is None or (geometry.width, geometry.height) != (self.geometry.width, self.geometry.height):
+            self._footprints = {}
+            diff = None
+        self.geometry = geometry
+        self.our = our = territories.our
+
+        if diff is None:
+            self.coverage = {coords: (self.footprint(coords) & our).bit_count() for coords in geometry.tiles(our)}
+        else:
+            changes, gained = [], []
+            for coords, (old_owner, new_owner) in diff.owners.items():
+                if old_owner == view.my_country:
+                    changes.append((coords, -1))
+                    self.coverage.pop(coords, None)
+                elif new_owner == view.my_country:
+                    changes.append((coords, 1))
+                    gained.append(coords)
+            # Footprints are symmetric: the candidates that cover a tile are the tiles its footprint covers.
+            for coords, change in changes:
+                for candidate in geometry.tiles(self.footprint(coords) & our):
+                    if candidate in self.coverage:
+                        self.coverage[candidate] += change
+            for coords in gained:
+                self.coverage[coords] = (self.footprint(coords) & our).bit_count()
+
+        pieces_by_type = view.pieces_by_type
+        self._weighted = [(weight, our & geometry.from_tiles(piece.tile.coordinates
+                                                               for piece in pieces_by_type.get(piece_type, ())))
+                          for piece_type, weight in PIECE_WEIGHTS.items()]
+
+    def place(self, count: int, taken=(), candidates=None) -> list[Coordinates]:
+        """Positions for `count` more domes, given the positions of the domes already placed.
+
+        When candidates is given, the domes are only placed on its tiles.
+        """
+        covered = 0
+        for coords in taken:
+            covered |= self.footprint(coords)
+
+        def value(coords):
+            uncovered = self.footprint(coords) & ~covered
+            return TILE_WEIGHT * (uncovered & self.our).bit_count() + \
+                sum(weight * (uncovered & board).bit_count() for weight, board in self._weighted)
+
+        # Upper bounds: the coverage with no other domes, plus the weighted pieces.
+        bounds = {coords: TILE_WEIGHT * tiles for coords, tiles in self.coverage.items()}
+        for weight, board in self._weighted:
+            for coords in self.geometry.tiles(board):
+                for candidate in self.geometry.tiles(self.footprint(coords) & self.our):
+                    bounds[candidate] += weight
+        queue = [(-bound, coords) for coords, bound in bounds.items()
+                 if bound and (candidates is None or coords in candidates)]
+        heapq.heapify(queue)
+
+        positions = []
+        while queue and len(positions) < count:
+            _, coords = heapq.heappop(queue)
+            score = value(coords)
+            if queue and score < -queue[0][0]:
+                if score:
+                    heapq.heappush(queue, (-score, coords))
+                continue
+            if not score:
+                break
+            positions.append(coords)
+            covered |= self.footprint(coords)
+        return positions
@@ -0,0 +1,88 @@
+"""Forward economy simulator and build order optimizer.
+
+A build order is a queue of piece types that our builders build one after the
+other. The simulator plays a build order forward for a few turns, with the
+builders collecting money from our tiles, and scores the army it ends up with.
+Many build orders are scored within a fixed CPU budget, and the best one is
+picked.
+"""
+import itertools
+import random
+import time
+
+from estimates import COLLECT_PER_TURN, PRICE_PER_PIECE
+
+ECONOMY_HORIZON = 30
+PLANNING_BUDGET = 0.02
+MAX_NEW_BUILDERS = 8
+
+# Builders also spend turns walking between tiles, so they do not collect
+# money on every turn.
+COLLECTION_EFFICIENCY = 0.6
+
+ARMY_VALUE = {'tank': 10, 'antitank': 8, 'artillery': 7, 'iron_dome': 20}
+# Every additional piece of the same type is worth this much of the previous one.
+DIMINISHING_RETURN = 0.9
+
+ARMY_MIXES = [
+    ('tank',),
+    ('tank', 'antitank'),
+    ('tank', 'tank', 'tank', 'antitank', 'artillery'),
+    ('antitank', 'tank', 'tank', 'tank', 'artillery', 'tank', 'tank', 'tank', 'tank', 'tank',
+     'antitank', 'iron_dome', 'tank', 'tank', 'artillery'),
+    ('tank', 'tank', 'artillery'),
+    ('antitank', 'artillery', 'tank'),
+]
+
+
+def simulate(build_order: list[str], builders: int, money: float, tiles_money: float,
+             horizon: int = ECONOMY_HORIZON) -> float:
+    """Returns the army value that `build_order` reaches within `horizon` turns."""
+    value = 0
+    built = dict.fromkeys(ARMY_VALUE, 0)
+    next_piece = 0
+    for turn in range(horizon):
+        income = min(builders * COLLECT_PER_TURN * COLLECTION_EFFICIENCY, tiles_money)
+        tiles_money -= income
+        money += income
+
+        new_builders = 0
+        for _ in range(builders):
+            if next_piece == len(build_order) or money < PRICE_PER_PIECE[build_order[next_piece]]:
+                break
+            piece_type = build_order[next_piece]
+            money -= PRICE_PER_PIECE[piece_type]
+            next_piece += 1
+            if piece_type == 'builder':
+                new_builders += 1
+            else:
+                # Pieces built earlier get to fight for longer.
+                value += ARMY_VALUE[piece_type] * DIMINISHING_RETURN ** built[piece_type] * (2 * horizon - turn)
+                built[piece_type] += 1
+        builders += new_builders
+
+    return value
+
+
+def candidate_build_orders(rng: random.Random, length: int):
+    for new_builders in range(MAX_NEW_BUILDERS + 1):
+        for mix in ARMY_MIXES:
+            yield ['builder'] * new_builders + list(itertools.islice(itertools.cycle(mix), length))
+    while True:
+        new_builders = rng.randint(0, MAX_NEW_BUILDERS)
+        yield ['builder'] * new_builders + rng.choices(list(ARMY_VALUE), k=length)
+
+
+def best_build_order(builders: int, builders_money: int, tiles_money: int, seed: int = 0,
+                     budget: float = PLANNING_BUDGET) -> list[str]:
+    """Returns the best build order found within `budget` seconds."""
+    deadline = time.perf_counter() + budget
+    length = ECONOMY_HORIZON * max(builders, 1)
+    best_order, best_value = None, -1
+    for build_order in candidate_build_orders(random.Random(seed), length):
+        value = simulate(build_order, builders, builders_money, tiles_money)
+        if value > best_value:
+            best_order, best_value = build_order, value
+        if time.perf_counter() > deadline:
+            break
+    return best_order
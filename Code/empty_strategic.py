@@ -1,6 +1,14 @@
 import random
 import math
 import common_types
+import economy
+import frontier
+import game_state
+import skirmish
+import tables
+import telemetry
+import vision
+import time
 from common_types import Coordinates, distance
 from strategic_api import StrategicApi, StrategicPiece
 from tactical_api import Tile, BasePiece
@@ -14,47 +22,43 @@ ENEMY_BUILDER = 4
 ENEMY_ARTILLERY = 2
 ANTITANK = 1
 
-builder_built_builder = set()
-builder_to_pieces_built = {}
-attack_list = set()
-artillery_attack = {}
-num_of_pieces_built = 0
 
-def mass_center_of_our_territory(strategic: StrategicApi) -> Coordinates:
-    our_area = 0
-    x_sum = 0
-    y_sum = 0
+class StrategicState:
+    """Everything `do_turn` remembers about a single game."""
 
-    for x in range(strategic.get_game_width()):
-        for y in range(strategic.get_game_height()):
-            coordinate = common_types.Coordinates(x, y)
-            danger = strategic.estimate_tile_danger(coordinate)
-            if danger == OUR_TILE:
-                x_sum += x
-                y_sum += y
-                our_area += 1
+    def __init__(self):
+        self.builder_built_builder = set()
+        self.builder_to_pieces_built = {}
+        self.attack_list = set()
+        self.artillery_attack = {}
+        self.num_of_pieces_built = 0
+        self.builder_to_escort_command = {}
+        self.frontier = frontier.FrontierPlanner()
+        # IDs of the builders that were ordered to build a sensor.
+        self.sensor_builders: set[str] = set()
 
-    x_center = x_sum // our_area
-    y_center = y_sum // our_area
-    mass_center = common_types.Coordinates(x_center, y_center)
 
-    return mass_center
+def mass_center_of_our_territory(strategic: StrategicApi) -> Coordinates:
+    return strategic.get_territory_center()
 
-    
 
 def get_ring_of_radius(strategic: StrategicApi, tile: Tile, r: int) -> list[Coordinates]:
+    width, height = strategic.get_game_width(), strategic.get_game_height()
+    ret = tables.get(width, height).ring(tile.coordinates, r)
+    if ret is not None:
+        return ret
     ret = []
     x, y = tile.coordinates.x, tile.coordinates.y
     for i in range(-r, r+1):
         for j in range(-r, r+1):
-            t = common_types.Coordinates((x+i) % strategic.get_game_width(), (y+j) % strategic.get_game_height())
+            t = common_types.Coordinates((x+i) % width, (y+j) % height)
             if common_types.distance(t, tile.coordinates) == r:
                 ret.append(t)
     
     return ret
 
 
-def get_tile_to_attack(strategic: StrategicApi, center: Coordinates, tank_tile: Tile, piece : BasePiece) -> Coordinates:
+def get_tile_to_attack(state: StrategicState, strategic: StrategicApi, center: Coordinates, tank_tile: Tile, piece : BasePiece) -> Coordinates:
     radius = 3
     possible_tiles: list[Coordinates] = []
     while True:
@@ -74,13 +78,13 @@ def get_tile_to_attack(strategic: StrategicApi, center: Coordinates, tank_tile:
                 if strategic.estimate_tile_danger(tile) & ENEMY_ARTILLERY == ENEMY_ARTILLERY:
                     possible_tiles.clear()
                     possible_tiles.append(tile)
-                    artillery_attack[piece.id] = True
+                    state.artillery_attack[piece.id] = True
                     break
                 elif strategic.estimate_tile_danger(tile) & OUR_TILE == OUR_TILE:
                     possible_tiles.append(tile)
         else:
             if piece.type == "artillery":
-                artillery_attack[piece.id] = False
+                state.artillery_attack[piece.id] = False
                 
         if len(possible_tiles) != 0 and piece.type != "artillery":
             return random.choice(possible_tiles)
@@ -93,46 +97,148 @@ def get_tile_to_attack(strategic: StrategicApi, center: Coordinates, tank_tile:
             possible_tiles = []
 
 
-def do_turn(strategic: StrategicApi):
-    global num_of_pieces_built
+def defend_with_idle_pieces(strategic: StrategicApi):
+    """Sends the closest idle defenders to the border segments that lack them, most threatened first."""
+    required = strategic.report_required_pieces_for_defends()
+    if not required:
+        return
+
+    idle_defenders = [piece for piece, command_id in strategic.report_defending_pieces().items() if command_id is None]
+    segment_defenders: dict[Coordinates, set[StrategicPiece]] = {}
+    for piece_type, anchor, _ in sorted(required, key=lambda requirement: requirement[2], reverse=True):
+        candidates = [piece for piece in idle_defenders if piece.type == piece_type]
+        if not candidates:
+            continue
+        piece = min(candidates, key=lambda piece: distance(piece.tile.coordinates, anchor))
+        idle_defenders.remove(piece)
+        segment_defenders.setdefault(anchor, set()).add(piece)
 
-    attack_list.clear()
+    # A segment is the only one within radius 0 of its anchor.
+    for anchor, pieces in segment_defenders.items():
+        strategic.defend(pieces, anchor, 0)
 
-    attacking_pieces: dict[BasePiece, str] = strategic.report_attacking_pieces()
 
+def escort_builders_with_idle_pieces(state: StrategicState, strategic: StrategicApi):
+    idle_antitanks = [piece for piece, command_id in strategic.report_defending_pieces().items()
+                      if command_id is None and piece.type == 'antitank']
+
+    for builder in strategic.report_builders().keys():
+        if not idle_antitanks:
+            break
+        command_id = state.builder_to_escort_command.get(builder.id)
+        if command_id is not None and strategic.report_defense_command_status(command_id).is_in_progress():
+            continue
+        state.builder_to_escort_command[builder.id] = strategic.esscort_piece_with_defending_piece(
+            builder, {idle_antitanks.pop()})
+
+
+def fight_skirmishes(strategic: StrategicApi, attacking_pieces: dict[StrategicPiece, str], deadline: float):
+    """Orders the idle pieces that are in contact with the enemy by the outcome of rollouts."""
+    enemy_tiles = {piece.tile.coordinates for piece in strategic.get_enemy_pieces()}
     for piece, command_id in attacking_pieces.items():
-        if command_id is not None:
+        if time.perf_counter() > deadline:
+            break
+        if command_id is not None or piece.type not in ('tank', 'antitank', 'artillery') \
+                or not skirmish.in_contact(piece.tile.coordinates, enemy_tiles):
+            continue
+        window = skirmish.Skirmish(strategic.get_turn_view(), piece.tile.coordinates)
+        outcomes = skirmish.evaluate(window, piece.id, skirmish.candidate_orders(window, piece.id), deadline)
+        if not outcomes:
+            continue
+        (kind, target), outcome = max(outcomes.items(), key=lambda item: skirmish.score(item[1]))
+        # Only fights worth their material; the rest of the moves are left to the other planners.
+        if outcome[0] <= 0 or skirmish.score(outcome) <= 0:
             continue
-        if piece.type == "artillery":
-            tile_to_attack = get_tile_to_attack(strategic, mass_center_of_our_territory(strategic), piece.tile, piece)
-            strategic.attack({StrategicPiece(piece.id, piece.type)},tile_to_attack, 3 if artillery_attack[piece.id] else 1)
-        elif piece.type == "antitank" or piece.type == "tank":
-            strategic.attack({StrategicPiece(piece.id, piece.type)}, get_tile_to_attack(strategic, mass_center_of_our_territory(strategic), piece.tile, piece), 1)
-        elif piece.type == "iron_dome":
-            strategic.attack({StrategicPiece(piece.id, piece.type)}, piece.tile.coordinates, 0)
+        radius = 3 if kind == 'strike' else 0 if kind == 'hold' else 1
+        attacking_pieces[piece] = strategic.attack({piece}, window.coordinates(target), radius)
 
-    builders : dict[BasePiece, str] = strategic.report_builders()
+
+def do_turn(strategic: StrategicApi):
+    state = game_state.get_game_state(strategic.context, __name__, StrategicState)
+    turn_telemetry = game_state.get_game_state(strategic.context, telemetry.__name__, telemetry.create)
+    started = time.thread_time_ns()
+
+    try:
+        state.attack_list.clear()
+
+        defend_with_idle_pieces(strategic)
+        escort_builders_with_idle_pieces(state, strategic)
+
+        attacking_pieces: dict[StrategicPiece, str] = strategic.report_attacking_pieces()
+        center = mass_center_of_our_territory(strategic)
+
+        fight_skirmishes(strategic, attacking_pieces, time.perf_counter() + skirmish.SKIRMISH_BUDGET)
+
+        state.frontier.update(strategic.get_turn_view())
+        idle_tanks = [piece for piece, command_id in attacking_pieces.items() if command_id is None and piece.type == "tank"]
+        for piece, tile_to_attack in state.frontier.assign(idle_tanks).items():
+            attacking_pieces[piece] = strategic.attack({piece}, tile_to_attack, 1)
+
+        for piece, command_id in attacking_pieces.items():
+            if command_id is not None:
+                continue
+            if piece.type == "artillery":
+                tile_to_attack = get_tile_to_attack(state, strategic, center, piece.tile, piece)
+                strategic.attack({piece},tile_to_attack, 3 if state.artillery_attack[piece.id] else 1)
+            elif piece.type == "antitank" or piece.type == "tank":
+                strategic.attack({piece}, get_tile_to_attack(state, strategic, center, piece.tile, piece), 1)
+            elif piece.type == "iron_dome":
+                strategic.attack({piece}, piece.tile.coordinates, 0)
+
+        build_with_idle_builders(state, strategic)
+
+        if turn_telemetry.enabled:
+            turn_telemetry.count('strategic_cpu_us', (time.thread_time_ns() - started) // 1000)
+    finally:
+        strategic.flush_log()
+
+
+def build_sensor_with_idle_builder(state: StrategicState, strategic: StrategicApi,
+                                   builders: dict[StrategicPiece, str], idle_builders: list[StrategicPiece]):
+    """Builds the sensor that reveals the most per unit of money, if it is worth it.
+
+    Returns the builder that builds it. A builder is always left for the
+    army.
+    """
+    if len(idle_builders) < 2:
+        return None
+    planner = strategic.get_vision_planner()
+    state.sensor_builders = {builder.id for builder, command_id in builders.items()
+                             if command_id is not None and builder.id in state.sensor_builders}
+    sensors = [(sensor_type, piece.tile.coordinates)
+               for sensor_type in vision.SIGHT_RADIUS for piece in strategic.report_pieces_of_type(sensor_type)]
+    if len(sensors) + len(state.sensor_builders) >= vision.MAX_SENSORS:
+        return None
+    best = planner.best_build([builder.tile.coordinates for builder in idle_builders], planner.coverage(sensors))
+    if best is None or best[0] < vision.MIN_VALUE_PER_MONEY:
+        return None
+    _, sensor_type, i = best
+    strategic.build_piece(idle_builders[i], sensor_type)
+    state.sensor_builders.add(idle_builders[i].id)
+    return idle_builders[i]
+
+
+def build_with_idle_builders(state: StrategicState, strategic: StrategicApi):
+    builders : dict[StrategicPiece, str] = strategic.report_builders()
 
     total_money_in_teritorry = strategic.get_total_country_tiles_money()
     strategic.log(f"{total_money_in_teritorry=}")
-    MAX_BUILDERS =  total_money_in_teritorry/ 100
 
-    for builder in builders.keys():
-        if builders[builder] is not None:
-            continue
-        if builder.id not in builder_to_pieces_built:
-            builder_to_pieces_built[builder.id] = 1
-        if len(builders) < MAX_BUILDERS:
-            strategic.build_piece(builder, "builder")
-            builder_built_builder.add(builder.id)
-        elif num_of_pieces_built % 5 == 0:
-            strategic.build_piece(builder, "antitank")
-        elif num_of_pieces_built % 5 == 4:
-            strategic.build_piece(builder, "artillery")
-        elif num_of_pieces_built % 20 == 1:
-            strategic.build_piece(builder, "iron_dome")
-        else:
-            strategic.build_piece(builder, "tank")
-        
-        num_of_pieces_built += 1
-        builder_to_pieces_built[builder.id] += 1
\ No newline at end of file
+    idle_builders = [builder for builder, command_id in builders.items() if command_id is None]
+    if not idle_builders:
+        return
+    sensor_builder = build_sensor_with_idle_builder(state, strategic, builders, idle_builders)
+    if sensor_builder is not None:
+        idle_builders.remove(sensor_builder)
+    build_order = economy.best_build_order(len(builders), strategic.get_total_builders_money(),
+                                           total_money_in_teritorry, seed=state.num_of_pieces_built)
+
+    for builder, piece_type in zip(idle_builders, build_order):
+        if builder.id not in state.builder_to_pieces_built:
+            state.builder_to_pieces_built[builder.id] = 1
+        strategic.build_piece(builder, piece_type)
+        if piece_type == "builder":
+            state.builder_built_builder.add(builder.id)
+
+        state.num_of_pieces_built += 1
+        state.builder_to_pieces_built[builder.id] += 1
@@ -3,69 +3,158 @@ from common_types import Coordinates
 from tactical_api import Tank, Antitank, Builder, TurnContext, distance, Tile, Artillery, Airplane, IronDome
 from strategic_api import CommandStatus, StrategicPiece
 from strategic_api import StrategicApi
+import batched_logger
+import bitboard
+import defense
+import domes
+import escort
+import estimates
+import game_state
+import ledger
 import math
-import random
-
-tank_to_coordinate_to_attack = {}
-tank_to_attacking_command = {}
-
-airplane_to_coordinate_to_attack = {}
-airplane_to_attacking_command = {}
-airplane_to_strike_count = {}
-
-antitank_to_coordinate_to_attack = {}
-antitank_to_attacking_command = {}
-
-builder_to_building_command = {}
-builder_to_piece_type = {}
-
-
-artillery_to_attacking_command = {}
-artillery_to_coordinate_to_attack: dict[str, tuple[Coordinates, int]] = {}
-
-
-commands = []
-price_per_piece = {'tank': 8, 'builder': 20, 'artillery': 8, 'antitank': 10, 'iron_dome': 32, 'airplane': 20, 'satellite': 64}
-
-builder_chosen_tiles = set()
+import mirrors
+import plans
+import regions
+import reservations
+import tables
+import telemetry
+import time
+import tracking
+import turn_diff
+import turn_view
+import vision
+
+price_per_piece = estimates.PRICE_PER_PIECE
 airplane_air_time, airplane_speed = 16, 8
-builder_money_taken: dict[Coordinates, list[int]] = {}
-
-def is_border(context: TurnContext, tile: Tile) -> bool:
-    x, y = tile.coordinates
-
-    if tile.country != context.my_country:
-        return False
-
-    if x > 0 and context.tiles[Coordinates(x - 1, y)].country != context.my_country:
-        return True
-
-    if y > 0 and context.tiles[Coordinates(x, y - 1)].country != context.my_country:
-        return True
-
-    if x < context.game_width - 1 and context.tiles[Coordinates(x + 1, y)].country != context.my_country:
-        return True
-
-    if y < context.game_height - 1 and context.tiles[Coordinates(x, y + 1)].country != context.my_country:
-        return True
-
-    return False
-
-def mass_center_of_our_territory(context: TurnContext) -> Coordinates:
-    our_area = 0
-    x_sum = 0
-    y_sum = 0
-    our_tiles = context.get_tiles_of_country(context.my_country)
-    our_area = len(our_tiles)
-    for tile in our_tiles:
-        x_sum += tile.x
-        y_sum += tile.y
-
-    x_center = x_sum // our_area
-    y_center = y_sum // our_area
-    mass_center = Coordinates(x_center, y_center)
+FLYING_TYPES = {'airplane', 'helicopter', 'satellite'}
+
+
+class GameState:
+    """Everything this implementation remembers about a single game."""
+
+    def __init__(self, turn_telemetry):
+        self.turn = 0
+
+        self.tank_to_coordinate_to_attack = {}
+        self.tank_to_attacking_command = {}
+
+        self.airplane_to_coordinate_to_attack: dict[str, Coordinates] = {}
+        self.airplane_to_radius: dict[str, int] = {}
+        self.airplane_to_attacking_command = {}
+        self.airplane_to_strike_count = {}
+
+        self.antitank_to_coordinate_to_attack = {}
+        self.antitank_to_attacking_command = {}
+        # Antitank ID -> the ID of the enemy tank it is intercepting.
+        self.antitank_to_enemy: dict[str, str] = {}
+
+        self.builder_to_building_command = {}
+        self.builder_to_piece_type = {}
+
+        self.artillery_to_attacking_command = {}
+        self.artillery_to_coordinate_to_attack: dict[str, tuple[Coordinates, int]] = {}
+
+        self.commands = []
+        self.collection_ledger = ledger.CollectionLedger()
+
+        self.defender_to_defending_command = {}
+        self.defender_to_destination: dict[str, Coordinates] = {}
+        self.defending_command_to_pieces: dict[str, set[str]] = {}
+        # Tile -> (danger, turn it was reported on), as set by the strategy.
+        self.defense_intelligence: dict[Coordinates, tuple[int, int]] = {}
+        self.border_garrison: defense.BorderGarrison = None
+        self.dome_planner = domes.DomePlanner()
+
+        self.escort_groups: dict[str, escort.EscortGroup] = {}
+        self.escort_to_leader: dict[str, str] = {}
+        self.escort_to_command: dict[str, str] = {}
+        self.escorting_command_to_pieces: dict[str, set[str]] = {}
+
+        self.turn_estimates: estimates.TurnEstimates = None
+
+        self.board_differ = turn_diff.BoardDiffer()
+        self.turn_diff: turn_diff.TurnDiff = None
+        self.territories = bitboard.Territories()
+        self.regions = regions.TerritoryRegions()
+
+        # What the reports hand out instead of our piece objects.
+        self.mirrors = mirrors.Mirrors()
+        self.enemy_tracker = tracking.EnemyTracker()
+        self.vision_planner = vision.VisionPlanner()
+
+        # Piece ID -> the tile it has been ordered to move to during this turn.
+        self.ordered_moves: dict[str, Coordinates] = {}
+        # Ground piece -> (start, destination) of the moves of this turn that
+        # are not routed yet, and the reservations of the routed ones.
+        self.move_requests: dict = {}
+        self.reservation_table: reservations.ReservationTable = None
+        self.plan_cache = plans.PlanCache()
+
+        self.logger = batched_logger.BatchedLogger()
+
+        # Shared with the strategic module.
+        self.telemetry = turn_telemetry
+        # Command ID -> command type, for commands whose outcome has not been
+        # counted yet. Only kept while telemetry is on.
+        self.open_commands: dict[str, str] = {}
+
+
+def record_command(state: GameState, command_id: str, command_type: str):
+    if state.telemetry.enabled:
+        state.telemetry.count('orders')
+        state.open_commands[command_id] = command_type
+
+def record_command_outcomes(state: GameState):
+    for command_id, command_type in list(state.open_commands.items()):
+        command = state.commands[int(command_id)]
+        if command.is_success():
+            state.telemetry.count(f'{command_type}_succeeded')
+        elif command.is_failed():
+            state.telemetry.count(f'{command_type}_failed')
+        else:
+            continue
+        del state.open_commands[command_id]
+
+def move_piece(state: GameState, piece, destination: Coordinates):
+    state.ordered_moves[piece.id] = destination
+    piece.move(destination)
+
+def request_move(state: GameState, piece, destination: Coordinates):
+    """Steps a ground piece towards the destination once the moves of the turn are routed."""
+    state.move_requests[piece] = (piece.tile.coordinates, destination)
+
+def route_requested_moves(state: GameState, context: TurnContext):
+    if state.reservation_table is None:
+        state.reservation_table = reservations.ReservationTable(context.game_width, context.game_height)
+        for piece_id, piece in context.my_pieces.items():
+            if piece not in state.move_requests and piece_id not in state.escort_to_leader \
+                    and piece.type not in FLYING_TYPES:
+                state.reservation_table.hold(piece.tile.coordinates)
+    for piece, step in reservations.route(state.reservation_table, state.move_requests, state.plan_cache).items():
+        if step != piece.tile.coordinates:
+            move_piece(state, piece, step)
+    state.move_requests.clear()
+
+def move_sensors(state: GameState, context: turn_view.TurnView):
+    """Moves every free spy and satellite to where it reveals the most that our other sensors do not."""
+    planner = state.vision_planner
+    pieces_by_type = context.pieces_by_type
+    covered = planner.coverage(('tower', tower.tile.coordinates) for tower in pieces_by_type.get('tower', ()))
+    for sensor_type in vision.MOBILE_SENSORS:
+        for sensor in pieces_by_type.get(sensor_type, ()):
+            if sensor.id in state.escort_to_leader:
+                continue
+            _, target = planner.best_position(sensor_type, sensor.tile.coordinates, vision.MOBILE_REACH, covered)
+            covered |= planner.mask(sensor_type, target)
+            if target == sensor.tile.coordinates:
+                continue
+            if sensor_type in FLYING_TYPES:
+                move_piece(state, sensor, get_step_to_destination(sensor.tile.coordinates, target))
+            else:
+                request_move(state, sensor, target)
 
-    return mass_center
+def mass_center_of_our_territory(context: turn_view.TurnView) -> Coordinates:
+    return context.territory_center
 
 def get_step_to_destination(start: Coordinates, destination: Coordinates):
     if destination.x < start.x:
@@ -81,6 +170,9 @@ def get_step_to_destination(start: Coordinates, destination: Coordinates):
 
 
 def get_ring_of_radius(context: TurnContext, coords: Coordinates, r: int) -> list[Tile]:
+    ring = tables.get(context.game_width, context.game_height).ring(coords, r)
+    if ring is not None:
+        return [context.tiles[t] for t in ring]
     ret = []
     x, y = coords.x, coords.y
     for i in range(-r, r+1):
@@ -91,181 +183,77 @@ def get_ring_of_radius(context: TurnContext, coords: Coordinates, r: int) -> lis
     
     return ret
 
-def get_tile_map(context: TurnContext, coords: Coordinates) -> dict[int, list[Tile]]:
-    ret = {r:[] for r in range(60)}
-    for tile_coords, tile in context.tiles.items():
-        ret[distance(Coordinates(*tile_coords), coords)].append(tile)
-    
-    del ret[0]
-    
-    return ret
-
-def builder_get_tile_with_money(context: TurnContext, builder: Builder) -> Tile:
-    coords = builder.tile.coordinates
-    tile_map = get_tile_map(context, coords)
-    max_tile_amount = 0
-    goodtiles = []
-    for radius, tiles_at_radius in tile_map.items():
-
-        for tile in tiles_at_radius:
-            if tile.money is None:
-                continue
-            tile_money = tile.money - 5*(radius - 1)
-            if tile.country != context.my_country:
-                continue
-            if tile_money <= 0:
-                continue
-            if tile in builder_chosen_tiles:
-                continue
-
-            if tile_money > max_tile_amount:
-                max_tile_amount = tile_money
-                goodtiles.clear()
-                goodtiles.append(tile)
-                continue
-
-            if tile_money == max_tile_amount:
-                goodtiles.append(tile)
-            
-    if len(goodtiles) != 0:
-        chosen = goodtiles[0]
-        sum_chosen = -1000
-        for tile in goodtiles:
-            sum_tile = 0
-            for tile in context.get_tiles_of_country(context.my_country):
-                if distance(tile, builder.tile.coordinates) < 5:
-                    sum_tile += context.tiles[tile].money - 5 * (distance(tile, builder.tile.coordinates) - 1) > 0
-            if sum_chosen < sum_tile:
-                sum_chosen = sum_tile
-                chosen = tile
-        builder_chosen_tiles.add(chosen)
-        return chosen
-    
-    for radius in sorted(tile_map.keys()):
-        tiles_at_radius = tile_map[radius]
-        max_tile_amount = 0
-        goodtiles = []
-        for tile in tiles_at_radius:
-            tile_money = tile.money
-            if tile.country != context.my_country:
-                continue
-            if tile_money <= 0:
-                continue
-            if tile in builder_chosen_tiles:
-                continue
-
-            if tile_money > max_tile_amount:
-                max_tile_amount = tile_money
-                goodtiles.clear()
-                goodtiles.append(tile)
-                continue
-
-            if tile_money == max_tile_amount:
-                goodtiles.append(tile)
-        if len(goodtiles) != 0:
-            chosen =  random.choice(goodtiles)
-            builder_chosen_tiles.add(chosen)
-            return chosen
-        
-    return context.tiles[mass_center_of_our_territory(context)]
-
-
-def move_tank_to_destination(tank: Tank, dest, context):
+def move_tank_to_destination(state: GameState, tank: Tank, dest, context):
     """Returns True if the tank's mission is complete."""
-    command_id = tank_to_attacking_command[tank.id]
+    command_id = state.tank_to_attacking_command[tank.id]
     if dest is None:
-        commands[int(command_id)] = CommandStatus.failed(command_id)
+        state.commands[int(command_id)] = CommandStatus.failed(command_id)
         return
     tank_coordinate = tank.tile.coordinates
     tile = context.tiles[(tank_coordinate.x, tank_coordinate.y)]
-    if dest.x < tank_coordinate.x:
-        new_coordinate = common_types.Coordinates(tank_coordinate.x - 1, tank_coordinate.y)
-    elif dest.x > tank_coordinate.x:
-        new_coordinate = common_types.Coordinates(tank_coordinate.x + 1, tank_coordinate.y)
-    elif dest.y < tank_coordinate.y:
-        new_coordinate = common_types.Coordinates(tank_coordinate.x, tank_coordinate.y - 1)
-    elif dest.y > tank_coordinate.y:
-        new_coordinate = common_types.Coordinates(tank_coordinate.x, tank_coordinate.y + 1)
-    else:
+    if dest == tank_coordinate:
         tank.attack()
-        commands[int(command_id)] = CommandStatus.success(command_id)
-        del tank_to_attacking_command[tank.id]
+        state.commands[int(command_id)] = CommandStatus.success(command_id)
+        del state.tank_to_attacking_command[tank.id]
         return True
     if tile.country != context.my_country:
         tank.attack()
-        prev_command = commands[int(command_id)]
-        commands[int(command_id)] = CommandStatus.in_progress(command_id,
-                                                          prev_command.elapsed_turns + 1,
-                                                          prev_command.estimated_turns - 1)
+        prev_command = state.commands[int(command_id)]
+        state.commands[int(command_id)] = CommandStatus.in_progress(command_id,
+                                                                    prev_command.elapsed_turns + 1,
+                                                                    prev_command.estimated_turns - 1)
         return False
-    tank.move(new_coordinate)
-    prev_command = commands[int(command_id)]
-    commands[int(command_id)] = CommandStatus.in_progress(command_id,
-                                                          prev_command.elapsed_turns + 1,
-                                                          prev_command.estimated_turns - 1)
+    request_move(state, tank, dest)
+    prev_command = state.commands[int(command_id)]
+    state.commands[int(command_id)] = CommandStatus.in_progress(command_id,
+                                                                prev_command.elapsed_turns + 1,
+                                                                prev_command.estimated_turns - 1)
     return False
 
 
-def move_antitank_to_destination(antitank: Antitank, dest, context):
+def move_antitank_to_destination(state: GameState, antitank: Antitank, dest, context):
     """Returns True if the antitank's mission is complete."""
-    command_id = antitank_to_attacking_command[antitank.id]
+    command_id = state.antitank_to_attacking_command[antitank.id]
     if dest is None:
-        commands[int(command_id)] = CommandStatus.failed(command_id)
+        state.commands[int(command_id)] = CommandStatus.failed(command_id)
         return
     antitank_coordinate = antitank.tile.coordinates
-    tile = context.tiles[(antitank_coordinate.x, antitank_coordinate.y)]
-    if dest.x < antitank_coordinate.x:
-        new_coordinate = common_types.Coordinates(antitank_coordinate.x - 1, antitank_coordinate.y)
-    elif dest.x > antitank_coordinate.x:
-        new_coordinate = common_types.Coordinates(antitank_coordinate.x + 1, antitank_coordinate.y)
-    elif dest.y < antitank_coordinate.y:
-        new_coordinate = common_types.Coordinates(antitank_coordinate.x, antitank_coordinate.y - 1)
-    elif dest.y > antitank_coordinate.y:
-        new_coordinate = common_types.Coordinates(antitank_coordinate.x, antitank_coordinate.y + 1)
-    else:
-        commands[int(command_id)] = CommandStatus.success(command_id)
-        del antitank_to_attacking_command[antitank.id]
+    if dest == antitank_coordinate:
+        state.commands[int(command_id)] = CommandStatus.success(command_id)
+        del state.antitank_to_attacking_command[antitank.id]
         return True
-    antitank.move(new_coordinate)
-    prev_command = commands[int(command_id)]
-    commands[int(command_id)] = CommandStatus.in_progress(command_id,
-                                                          prev_command.elapsed_turns + 1,
-                                                          prev_command.estimated_turns - 1)
+    request_move(state, antitank, dest)
+    prev_command = state.commands[int(command_id)]
+    state.commands[int(command_id)] = CommandStatus.in_progress(command_id,
+                                                                prev_command.elapsed_turns + 1,
+                                                                prev_command.estimated_turns - 1)
     return False
 
-def move_artillery_to_destination(artillery: Artillery, dest: Coordinates, radius: int, context: TurnContext):
+def move_artillery_to_destination(state: GameState, artillery: Artillery, dest: Coordinates, radius: int, context: TurnContext):
     """Returns True if the tank's mission is complete."""
-    command_id = artillery_to_attacking_command[artillery.id]
+    command_id = state.artillery_to_attacking_command[artillery.id]
     if dest is None:
-        commands[int(command_id)] = CommandStatus.failed(command_id)
+        state.commands[int(command_id)] = CommandStatus.failed(command_id)
         return
     artillery_coordinate = artillery.tile.coordinates
 
     if radius != 3 and distance(dest, artillery_coordinate) == 0:
-        commands[int(command_id)] = CommandStatus.success(command_id)
-        del artillery_to_attacking_command[artillery.id]
+        state.commands[int(command_id)] = CommandStatus.success(command_id)
+        del state.artillery_to_attacking_command[artillery.id]
         return True
     
     # radius == 3 means attack
     if radius == 3 and distance(dest, artillery_coordinate) <= 3:
         artillery.attack(dest)
-        commands[int(command_id)] = CommandStatus.success(command_id)
-        del artillery_to_attacking_command[artillery.id]
+        state.commands[int(command_id)] = CommandStatus.success(command_id)
+        del state.artillery_to_attacking_command[artillery.id]
         return True
     
-    if dest.x < artillery_coordinate.x:
-        new_coordinate = common_types.Coordinates(artillery_coordinate.x - 1, artillery_coordinate.y)
-    elif dest.x > artillery_coordinate.x:
-        new_coordinate = common_types.Coordinates(artillery_coordinate.x + 1, artillery_coordinate.y)
-    elif dest.y < artillery_coordinate.y:
-        new_coordinate = common_types.Coordinates(artillery_coordinate.x, artillery_coordinate.y - 1)
-    elif dest.y > artillery_coordinate.y:
-        new_coordinate = common_types.Coordinates(artillery_coordinate.x, artillery_coordinate.y + 1)
-    artillery.move(new_coordinate)
-    prev_command = commands[int(command_id)]
-    commands[int(command_id)] = CommandStatus.in_progress(command_id,
-                                                          prev_command.elapsed_turns + 1,
-                                                          prev_command.estimated_turns - 1)
+    request_move(state, artillery, dest)
+    prev_command = state.commands[int(command_id)]
+    state.commands[int(command_id)] = CommandStatus.in_progress(command_id,
+                                                                prev_command.elapsed_turns + 1,
+                                                                prev_command.estimated_turns - 1)
     return False
 
 def move_x_steps_to_destination(start: Coordinates, dest: Coordinates, x: int) -> Coordinates:
@@ -276,30 +264,145 @@ def move_x_steps_to_destination(start: Coordinates, dest: Coordinates, x: int) -
     return start
 
 # If there is a conqured tile, move to it - otherwise - move 8 tiles towards this destination.
-def move_airplane_to_destination(airplane: Airplane, dest: Coordinates):
+def move_airplane_to_destination(state: GameState, airplane: Airplane, dest: Coordinates):
     end = move_x_steps_to_destination(airplane.tile.coordinates, dest, airplane_speed)
-    airplane.move(end)
+    move_piece(state, airplane, end)
+
+def move_defender_to_destination(state: GameState, defender, dest: Coordinates) -> bool:
+    """Returns True if the defender holds its destination."""
+    defender_coordinate = defender.tile.coordinates
+    if defender_coordinate == dest:
+        if defender.type == 'irondome' and not defender.is_defending:
+            defender.turn_on_protection()
+        return True
+    request_move(state, defender, dest)
+    return False
 
-def builder_collect_money(context: TurnContext, builder: Builder):
+def release_defender(state: GameState, defender_id: str):
+    command_id = state.defender_to_defending_command.pop(defender_id, None)
+    if command_id is None:
+        return
+    del state.defender_to_destination[defender_id]
+    state.defending_command_to_pieces[command_id].discard(defender_id)
+
+def update_defending_commands(state: GameState, defenders_in_position: set[str]):
+    for command_id, defender_ids in list(state.defending_command_to_pieces.items()):
+        prev_command = state.commands[int(command_id)]
+        if not defender_ids:
+            if prev_command.is_in_progress():
+                state.commands[int(command_id)] = CommandStatus.failed(command_id)
+            del state.defending_command_to_pieces[command_id]
+        elif not prev_command.is_in_progress():
+            continue
+        elif defender_ids <= defenders_in_position:
+            state.commands[int(command_id)] = CommandStatus.success(command_id)
+        else:
+            state.commands[int(command_id)] = CommandStatus.in_progress(command_id,
+                                                                        prev_command.elapsed_turns + 1,
+                                                                        max(prev_command.estimated_turns,
+                                                                            prev_command.elapsed_turns + 2))
+
+def release_escort(state: GameState, piece_id: str):
+    leader_id = state.escort_to_leader.pop(piece_id, None)
+    if leader_id is None:
+        return
+    command_id = state.escort_to_command.pop(piece_id)
+    state.escorting_command_to_pieces[command_id].discard(piece_id)
+    group = state.escort_groups[leader_id]
+    group.remove(piece_id)
+    if not group.escorts:
+        del state.escort_groups[leader_id]
+
+def cancel_attacking_command(state: GameState, piece_id: str):
+    for to_command, to_destination in ((state.tank_to_attacking_command, state.tank_to_coordinate_to_attack),
+                                       (state.antitank_to_attacking_command, state.antitank_to_coordinate_to_attack),
+                                       (state.artillery_to_attacking_command, state.artillery_to_coordinate_to_attack),
+                                       (state.airplane_to_attacking_command, state.airplane_to_coordinate_to_attack)):
+        command_id = to_command.pop(piece_id, None)
+        to_destination.pop(piece_id, None)
+        if command_id is not None and state.commands[int(command_id)].is_in_progress():
+            state.commands[int(command_id)] = CommandStatus.failed(command_id)
+    state.airplane_to_strike_count.pop(piece_id, None)
+    state.airplane_to_radius.pop(piece_id, None)
+
+def hold_formation_tile(piece, context: TurnContext):
+    if piece.type == 'tank' and piece.tile.country != context.my_country:
+        piece.attack()
+    elif piece.type == 'irondome' and not piece.is_defending:
+        piece.turn_on_protection()
+
+def move_escort_groups(state: GameState, context: TurnContext):
+    """Steps every escort group once, after all the leaders have been ordered."""
+    for leader_id, group in list(state.escort_groups.items()):
+        for piece_id in [piece_id for piece_id in group.escorts if piece_id not in context.my_pieces]:
+            release_escort(state, piece_id)
+
+        leader = context.my_pieces.get(leader_id)
+        if leader is None:
+            for command_id in group.command_ids():
+                state.commands[int(command_id)] = CommandStatus.failed(command_id)
+            for piece_id in list(group.escorts):
+                release_escort(state, piece_id)
+            continue
+        if not group.escorts:
+            continue
+
+        leader_next = state.ordered_moves.get(leader_id, leader.tile.coordinates)
+        targets = group.plan(context, leader_next)
+        positions = {}
+        for piece_id, target in targets.items():
+            piece = context.my_pieces[piece_id]
+            positions[piece_id] = piece.tile.coordinates
+            if piece.tile.coordinates == target:
+                hold_formation_tile(piece, context)
+            else:
+                request_move(state, piece, target)
+
+        for command_id in group.command_ids():
+            command_targets = {piece_id: target for piece_id, target in targets.items()
+                               if state.escort_to_command[piece_id] == command_id}
+            prev_command = state.commands[int(command_id)]
+            state.commands[int(command_id)] = CommandStatus.in_progress(command_id,
+                                                                        prev_command.elapsed_turns + 1,
+                                                                        prev_command.elapsed_turns + 1 +
+                                                                        escort.formation_turns(positions, command_targets))
+
+    for command_id, piece_ids in list(state.escorting_command_to_pieces.items()):
+        if not piece_ids:
+            if state.commands[int(command_id)].is_in_progress():
+                state.commands[int(command_id)] = CommandStatus.failed(command_id)
+            del state.escorting_command_to_pieces[command_id]
+
+def builder_collect_money(state: GameState, context: TurnContext, builder: Builder, amount: int):
     if not builder or builder.type != 'builder':
         return None
 
-    tile_coords = builder.tile.coordinates
-    if tile_coords not in builder_money_taken:
-        builder_money_taken[tile_coords] = []
-    tile_money = builder.tile.money - sum(builder_money_taken[tile_coords])
+    tile_id = state.collection_ledger.claimed_tile(builder.id)
+    if tile_id is None:
+        # Builders collect within their own region, rather than walking through enemy land.
+        region = context.regions.region_at(builder.tile.coordinates) if context.regions is not None else None
+        tile_id = None
+        if region is not None:
+            tile_id = state.collection_ledger.find_tile(builder.tile.coordinates, amount, region.tiles)
+        if tile_id is None:
+            tile_id = state.collection_ledger.find_tile(builder.tile.coordinates, amount)
+        if tile_id is None:
+            request_move(state, builder, mass_center_of_our_territory(context))
+            return None
+        state.collection_ledger.claim(builder.id, tile_id, amount)
 
-    if tile_money > 0 and builder.tile.country == context.my_country:
-        collected_amnt = min(builder.tile.money, 5)
+    destination = state.collection_ledger.coordinates(tile_id)
+    if builder.tile.coordinates == destination:
+        # Builders collect at most COLLECT_PER_TURN a turn; the rest of the claim stays reserved.
+        collected_amnt = min(state.collection_ledger.claimed_amount(builder.id), estimates.COLLECT_PER_TURN)
         builder.collect_money(collected_amnt)
-        builder_money_taken[tile_coords].append(collected_amnt)
+        state.collection_ledger.collected(builder.id, collected_amnt)
+        state.telemetry.count('money_collected', collected_amnt)
     else:
-        destination = builder_get_tile_with_money(context, builder)
-        step = get_step_to_destination(builder.tile.coordinates, destination.coordinates)
-        builder.move(step)
+        request_move(state, builder, destination)
 
-def builder_do_work(context: TurnContext, builder: Builder, piece_type: str):
-    command_id = builder_to_building_command[builder.id]
+def builder_do_work(state: GameState, context: TurnContext, builder: Builder, piece_type: str):
+    command_id = state.builder_to_building_command[builder.id]
     if price_per_piece[piece_type] <= builder.money:
             if piece_type == 'tank':
                 builder.build_tank()
@@ -315,49 +418,82 @@ def builder_do_work(context: TurnContext, builder: Builder, piece_type: str):
                 builder.build_airplane()
             elif piece_type == 'iron_dome':
                 builder.build_iron_dome()
-            context.log(f"builder built {piece_type}")
-            commands[int(command_id)] = CommandStatus.success(command_id)
-            del builder_to_building_command[builder.id]
+            elif piece_type == 'tower':
+                builder.build_tower()
+            elif piece_type == 'satellite':
+                builder.build_satellite()
+            elif piece_type == 'spy':
+                builder.build_spy()
+            state.logger.log(f"builder built {piece_type}")
+            state.telemetry.count('pieces_built')
+            state.commands[int(command_id)] = CommandStatus.success(command_id)
+            del state.builder_to_building_command[builder.id]
+            state.collection_ledger.release(builder.id)
             return True
     # we dont have enough money, go collect it!
-    return builder_collect_money(context, builder)
+    return builder_collect_money(state, context, builder, price_per_piece[piece_type] - builder.money)
 
 
 class MyStrategicApi(StrategicApi):
-    def __init__(self, *args, **kwargs):
-        super(MyStrategicApi, self).__init__(*args, **kwargs)
+    def __init__(self, context: TurnContext, state: GameState):
+        super(MyStrategicApi, self).__init__(turn_view.TurnView(context))
+        self.state = state
+        started = time.thread_time_ns()
+        self.state.turn += 1
+        self.state.telemetry.begin_turn()
 
         tanks_to_remove = set()
         antitanks_to_remove = set()
         builders_to_remove = set()
         artillery_to_remove = set()
         airplanes_to_remove = set()
-
-        builder_chosen_tiles.clear()
-        builder_money_taken.clear()
-
-        for tank_id, destination in tank_to_coordinate_to_attack.items():
+        defenders_to_remove = set()
+
+        self.state.turn_diff = self.state.board_differ.update(self.context)
+        # The differ keeps the border up to date from the changes alone.
+        self.context.border_tiles = self.state.board_differ.border
+        self.state.territories.update(self.context, self.state.turn_diff)
+        self.context.territories = self.state.territories
+        self.context.diff = self.state.turn_diff
+        self.state.regions.update(self.context)
+        self.context.regions = self.state.regions
+        self.state.mirrors.update(self.context)
+        self.state.enemy_tracker.update(self.context)
+        self.state.dome_planner.update(self.context)
+        self.state.vision_planner.update(self.context)
+        self.state.collection_ledger.update(self.context)
+        self.state.ordered_moves.clear()
+        self.state.reservation_table = None
+        self.state.plan_cache.update(self.context)
+
+        defense.expire_intelligence(self.state.defense_intelligence, self.state.turn)
+        self.state.border_garrison = defense.BorderGarrison(self.context, self.state.defense_intelligence,
+                                                            self.state.defender_to_destination)
+        self.state.turn_estimates = estimates.TurnEstimates(self.context)
+
+        for tank_id, destination in self.state.tank_to_coordinate_to_attack.items():
             tank: Tank = self.context.my_pieces.get(tank_id)
             if tank is None:
                 tanks_to_remove.add(tank_id)
                 continue
-            if move_tank_to_destination(tank, destination, self.context):
+            if move_tank_to_destination(self.state, tank, destination, self.context):
                 tanks_to_remove.add(tank_id)
 
-        for airplane_id, destination in airplane_to_coordinate_to_attack.items():
+        for airplane_id, destination in self.state.airplane_to_coordinate_to_attack.items():
             airplane: Airplane = self.context.my_pieces.get(airplane_id)
             if airplane is None:
                 airplanes_to_remove.add(airplane_id)
                 continue
             
-            command_id = airplane_to_attacking_command[airplane_id]
+            command_id = self.state.airplane_to_attacking_command[airplane_id]
             if not airplane.in_air:
                 airplane.take_off()
             if airplane.time_in_air == airplane_air_time - 2:
-                move_airplane_to_destination(airplane, mass_center_of_our_territory(self.context))
+                move_airplane_to_destination(self.state, airplane, mass_center_of_our_territory(self.context))
             elif airplane.time_in_air == airplane_air_time - 1:
                 airplane.land()
-                commands[int(command_id)] = CommandStatus.success(command_id)
+                self.state.commands[int(command_id)] = CommandStatus.success(command_id)
+                airplanes_to_remove.add(airplane_id)
             elif airplane.tile.coordinates == destination:
                 has_enemy = False
                 for p in airplane.tile.pieces:
@@ -366,58 +502,98 @@ class MyStrategicApi(StrategicApi):
                         break
                 if has_enemy:
                     airplane.attack()
-                    commands[int(command_id)] = CommandStatus.success(command_id)
+                    self.state.commands[int(command_id)] = CommandStatus.success(command_id)
                 else:
-                    airplane_to_strike_count[airplane_id] += 1
-                    found_new_dest = False
-                    for tile in get_ring_of_radius(self.context, airplane.tile.coordinates, 1):
-                        if tile.country != self.context.my_country:
-                            destination = tile.coordinates
-                            found_new_dest = True
-                            break
-                    
-                    if not found_new_dest or airplane_to_strike_count[airplane_id] == 3:
-                        # Mark command as done.
-                        commands[int(command_id)] = CommandStatus.success(command_id)
+                    self.state.airplane_to_strike_count[airplane_id] += 1
+                    # Chase the closest enemy to where it is going next.
+                    target = self.state.enemy_tracker.nearest(airplane.tile.coordinates, airplane_speed)
+                    if target is not None and self.state.airplane_to_strike_count[airplane_id] < 3:
+                        self.state.airplane_to_coordinate_to_attack[airplane_id] = target
+                        move_airplane_to_destination(self.state, airplane, target)
+                    else:
+                        found_new_dest = False
+                        for tile in get_ring_of_radius(self.context, airplane.tile.coordinates, 1):
+                            if tile.country != self.context.my_country:
+                                self.state.airplane_to_coordinate_to_attack[airplane_id] = tile.coordinates
+                                found_new_dest = True
+                                break
+
+                        if not found_new_dest or self.state.airplane_to_strike_count[airplane_id] == 3:
+                            # Mark command as done.
+                            self.state.commands[int(command_id)] = CommandStatus.success(command_id)
             else:
-                move_airplane_to_destination(airplane, destination)
+                move_airplane_to_destination(self.state, airplane, destination)
         
-        for antitank_id, destination in antitank_to_coordinate_to_attack.items():
+        for antitank_id, destination in self.state.antitank_to_coordinate_to_attack.items():
             antitank: Antitank = self.context.my_pieces.get(antitank_id)
             if antitank is None:
                 antitanks_to_remove.add(antitank_id)
                 continue
-            if move_antitank_to_destination(antitank, destination, self.context):
+            enemy_id = self.state.antitank_to_enemy.get(antitank_id)
+            if enemy_id is not None and self.state.enemy_tracker.is_visible(enemy_id):
+                destination = self.state.enemy_tracker.intercept(enemy_id, antitank.tile.coordinates)
+                self.state.antitank_to_coordinate_to_attack[antitank_id] = destination
+            if move_antitank_to_destination(self.state, antitank, destination, self.context):
                 antitanks_to_remove.add(antitank_id)
 
-        for artillery_id, (destination, radius) in artillery_to_coordinate_to_attack.items():
+        for artillery_id, (destination, radius) in self.state.artillery_to_coordinate_to_attack.items():
             artillery: Artillery = self.context.my_pieces.get(artillery_id)
             if artillery is None:
                 artillery_to_remove.add(artillery_id)
                 continue
-            if move_artillery_to_destination(artillery, destination, radius, self.context):
+            if move_artillery_to_destination(self.state, artillery, destination, radius, self.context):
                 artillery_to_remove.add(artillery_id)
 
-        for builder_id, piece_type in builder_to_piece_type.items():
+        for builder_id, piece_type in self.state.builder_to_piece_type.items():
             builder: Builder = self.context.my_pieces.get(builder_id)
             if builder is None:
                 builders_to_remove.add(builder_id)
                 continue
-            if builder_do_work(self.context, builder, piece_type):
+            if builder_do_work(self.state, self.context, builder, piece_type):
                 builders_to_remove.add(builder_id)
 
+        defenders_in_position = set()
+        for defender_id, destination in self.state.defender_to_destination.items():
+            defender = self.context.my_pieces.get(defender_id)
+            if defender is None:
+                defenders_to_remove.add(defender_id)
+                continue
+            if move_defender_to_destination(self.state, defender, destination):
+                defenders_in_position.add(defender_id)
+
         for tank_id in tanks_to_remove:
-            del tank_to_coordinate_to_attack[tank_id]
+            del self.state.tank_to_coordinate_to_attack[tank_id]
 
         for airplane_id in airplanes_to_remove:
-            del airplane_to_strike_count[airplane_id]
-            del airplane_to_coordinate_to_attack[airplane_id]
+            del self.state.airplane_to_strike_count[airplane_id]
+            del self.state.airplane_to_coordinate_to_attack[airplane_id]
+            self.state.airplane_to_radius.pop(airplane_id, None)
+            self.state.airplane_to_attacking_command.pop(airplane_id, None)
         
         for antitank_id in antitanks_to_remove:
-            del antitank_to_coordinate_to_attack[antitank_id]
+            del self.state.antitank_to_coordinate_to_attack[antitank_id]
+            self.state.antitank_to_enemy.pop(antitank_id, None)
+
+        for artillery_id in artillery_to_remove:
+            del self.state.artillery_to_coordinate_to_attack[artillery_id]
 
         for builder_id in builders_to_remove:
-            del builder_to_piece_type[builder_id]
+            del self.state.builder_to_piece_type[builder_id]
+
+        for defender_id in defenders_to_remove:
+            release_defender(self.state, defender_id)
+        update_defending_commands(self.state, defenders_in_position)
+
+        move_sensors(self.state, self.context)
+
+        # Escorts follow wherever their leaders have been routed to.
+        route_requested_moves(self.state, self.context)
+        move_escort_groups(self.state, self.context)
+        route_requested_moves(self.state, self.context)
+
+        if self.state.telemetry.enabled:
+            record_command_outcomes(self.state)
+            self.state.telemetry.count('tactical_cpu_us', (time.thread_time_ns() - started) // 1000)
 
     def attack(self, pieces: set[StrategicPiece], destination: Coordinates, radius: int):
         if len(pieces) == 0:
@@ -427,66 +603,91 @@ class MyStrategicApi(StrategicApi):
                 tank = self.context.my_pieces[piece.id]
                 if not tank or tank.type != 'tank':
                     return None
-
-                if piece.id in tank_to_attacking_command:
-                    old_command_id = int(tank_to_attacking_command[piece.id])
-                    commands[old_command_id] = CommandStatus.failed(old_command_id)
-
-                command_id = str(len(commands))
-                attacking_command = CommandStatus.in_progress(command_id, 0, common_types.distance(tank.tile.coordinates, destination))
-                tank_to_coordinate_to_attack[piece.id] = destination
-                tank_to_attacking_command[piece.id] = command_id
-                commands.append(attacking_command)
+                release_escort(self.state, piece.id)
+
+                if piece.id in self.state.tank_to_attacking_command:
+                    old_command_id = int(self.state.tank_to_attacking_command[piece.id])
+                    self.state.commands[old_command_id] = CommandStatus.failed(old_command_id)
+
+                command_id = str(len(self.state.commands))
+                attacking_command = CommandStatus.in_progress(command_id, 0, self.state.turn_estimates.piece_turns(tank, destination, radius))
+                self.state.tank_to_coordinate_to_attack[piece.id] = destination
+                self.state.tank_to_attacking_command[piece.id] = command_id
+                self.state.commands.append(attacking_command)
+                record_command(self.state, command_id, 'attack')
                 return command_id
             if piece.type == 'antitank':
                 antitank = self.context.my_pieces[piece.id]
                 if not antitank or antitank.type != 'antitank':
                     return None
 
-                if piece.id in antitank_to_attacking_command:
-                    old_command_id = int(antitank_to_attacking_command[piece.id])
-                    commands[old_command_id] = CommandStatus.failed(old_command_id)
-
-                command_id = str(len(commands))
-                attacking_command = CommandStatus.in_progress(command_id, 0, common_types.distance(antitank.tile.coordinates, destination))
-                antitank_to_coordinate_to_attack[piece.id] = destination
-                antitank_to_attacking_command[piece.id] = command_id
-                commands.append(attacking_command)
+                if piece.id in self.state.antitank_to_attacking_command:
+                    old_command_id = int(self.state.antitank_to_attacking_command[piece.id])
+                    self.state.commands[old_command_id] = CommandStatus.failed(old_command_id)
+                release_defender(self.state, piece.id)
+                release_escort(self.state, piece.id)
+
+                command_id = str(len(self.state.commands))
+                attacking_command = CommandStatus.in_progress(command_id, 0, self.state.turn_estimates.piece_turns(antitank, destination, radius))
+                self.state.antitank_to_coordinate_to_attack[piece.id] = destination
+                enemy_id = self.state.enemy_tracker.find(destination, 'tank')
+                if enemy_id is not None:
+                    self.state.antitank_to_enemy[piece.id] = enemy_id
+                else:
+                    self.state.antitank_to_enemy.pop(piece.id, None)
+                self.state.antitank_to_attacking_command[piece.id] = command_id
+                self.state.commands.append(attacking_command)
+                record_command(self.state, command_id, 'attack')
             
             if piece.type == 'artillery':
                 artillery = self.context.my_pieces[piece.id]
                 if not artillery or artillery.type != 'artillery':
                     return None
-
-                if piece.id in artillery_to_attacking_command:
-                    old_command_id = int(artillery_to_attacking_command[piece.id])
-                    commands[old_command_id] = CommandStatus.failed(old_command_id)
-
-                command_id = str(len(commands))
-                attacking_command = CommandStatus.in_progress(command_id, 0, common_types.distance(artillery.tile.coordinates, destination))
-                artillery_to_coordinate_to_attack[piece.id] = (destination, radius)
-                artillery_to_attacking_command[piece.id] = command_id
-                commands.append(attacking_command)
+                release_escort(self.state, piece.id)
+
+                if piece.id in self.state.artillery_to_attacking_command:
+                    old_command_id = int(self.state.artillery_to_attacking_command[piece.id])
+                    self.state.commands[old_command_id] = CommandStatus.failed(old_command_id)
+
+                command_id = str(len(self.state.commands))
+                attacking_command = CommandStatus.in_progress(command_id, 0, self.state.turn_estimates.piece_turns(artillery, destination, radius))
+                self.state.artillery_to_coordinate_to_attack[piece.id] = (destination, radius)
+                self.state.artillery_to_attacking_command[piece.id] = command_id
+                self.state.commands.append(attacking_command)
+                record_command(self.state, command_id, 'attack')
             
             if piece.type == 'airplane':
                 airplane = self.context.my_pieces[piece.id]
                 if not airplane or airplane.type != 'airplane':
                     return None
 
-                if piece.id in airplane_to_attacking_command:
-                    old_command_id = int(airplane_to_attacking_command[piece.id])
-                    commands[old_command_id] = CommandStatus.failed(old_command_id)
+                if piece.id in self.state.airplane_to_attacking_command:
+                    old_command_id = int(self.state.airplane_to_attacking_command[piece.id])
+                    self.state.commands[old_command_id] = CommandStatus.failed(old_command_id)
+
+                command_id = str(len(self.state.commands))
+                attacking_command = CommandStatus.in_progress(command_id, 0, self.state.turn_estimates.piece_turns(airplane, destination, radius))
+                self.state.airplane_to_coordinate_to_attack[piece.id] = destination
+                self.state.airplane_to_radius[piece.id] = radius
+                self.state.airplane_to_attacking_command[piece.id] = command_id
+                self.state.airplane_to_strike_count[piece.id] = 0
+                self.state.commands.append(attacking_command)
+                record_command(self.state, command_id, 'attack')
+            if piece.type == 'irondome':
+                # Domes stand where the placement planner puts them.
+                return self.defend({piece}, destination, radius)
 
-                command_id = str(len(commands))
-                attacking_command = CommandStatus.in_progress(command_id, 0, common_types.distance(airplane.tile.coordinates, destination))
-                airplane_to_coordinate_to_attack[piece.id] = (destination, radius)
-                airplane_to_attacking_command[piece.id] = command_id
-                airplane_to_strike_count[piece.id] = 0
-                commands.append(attacking_command)
-            if piece.type == "iron_dome":
-                iron_dome: IronDome = self.context.my_pieces[piece.id]
-                iron_dome.turn_on_protection()
 
+    def estimate_attack_time(self, pieces: set[StrategicPiece], destination: Coordinates, radius: int):
+        return max((self.state.turn_estimates.piece_turns(self.context.my_pieces[piece.id], destination, radius)
+                    for piece in pieces), default=0)
+
+    def report_attack_command_status(self, command_id: str):
+        return self.state.commands[int(command_id)]
+
+    def estimate_gathering_time(self, pieces: set[StrategicPiece], destination: Coordinates, radius: int):
+        return max((self.state.turn_estimates.area_turns(self.context.my_pieces[piece.id], destination, radius)
+                    for piece in pieces), default=0)
 
     def estimate_tile_danger(self, destination):
         tile = self.context.tiles[Coordinates(destination.x, destination.y)]
@@ -511,7 +712,7 @@ class MyStrategicApi(StrategicApi):
         if tile.country is None:
             flag += 32
 
-        if is_border(self.context, tile):
+        if tile.coordinates in self.context.border_tiles:
             flag += 64
 
         if any([piece.type == 'tank' and piece.country != self.context.my_country for piece in tile.pieces]):
@@ -527,50 +728,212 @@ class MyStrategicApi(StrategicApi):
 
     def report_attacking_pieces(self):
         attacking_pieces = {}
-        for piece_id, piece in self.context.my_pieces.items():
+        for piece_id, piece in self.state.mirrors.pieces.items():
             if piece.type == 'tank':
-                attacking_pieces[piece] = tank_to_attacking_command.get(piece_id)
-            if piece.type == 'antitank':
-                attacking_pieces[piece] = antitank_to_attacking_command.get(piece_id)
+                attacking_pieces[piece] = self.state.tank_to_attacking_command.get(
+                    piece_id, self.state.escort_to_command.get(piece_id))
+            if piece.type == 'antitank' and piece_id not in self.state.defender_to_defending_command \
+                    and piece_id not in self.state.escort_to_command:
+                attacking_pieces[piece] = self.state.antitank_to_attacking_command.get(piece_id)
             if piece.type == 'artillery':
-                attacking_pieces[piece] = artillery_to_attacking_command.get(piece_id)
+                attacking_pieces[piece] = self.state.artillery_to_attacking_command.get(
+                    piece_id, self.state.escort_to_command.get(piece_id))
         return attacking_pieces
     
+    def esscort_piece(self, piece: StrategicPiece, pieces: set[StrategicPiece], role: str):
+        leader = self.context.my_pieces.get(piece.id)
+        if not leader or len(pieces) == 0:
+            return None
+        escorts = []
+        for escorting_piece in pieces:
+            escorting = self.context.my_pieces.get(escorting_piece.id)
+            if not escorting or escorting.id == leader.id or escorting.type not in escort.ESCORTING_TYPES[role]:
+                return None
+            escorts.append(escorting)
+
+        command_id = str(len(self.state.commands))
+        group = self.state.escort_groups.setdefault(leader.id, escort.EscortGroup(leader.id))
+        for escorting in escorts:
+            cancel_attacking_command(self.state, escorting.id)
+            release_defender(self.state, escorting.id)
+            release_escort(self.state, escorting.id)
+            group.add(escorting.id, command_id, role)
+            self.state.escort_to_leader[escorting.id] = leader.id
+            self.state.escort_to_command[escorting.id] = command_id
+        self.state.escorting_command_to_pieces[command_id] = {escorting.id for escorting in escorts}
+
+        targets = group.plan(self.context, leader.tile.coordinates)
+        positions = {escorting.id: escorting.tile.coordinates for escorting in escorts}
+        self.state.commands.append(CommandStatus.in_progress(command_id, 0, escort.formation_turns(
+            positions, {escorting.id: targets[escorting.id] for escorting in escorts})))
+        record_command(self.state, command_id, 'escort')
+        return command_id
+
+    def esscort_piece_with_attacking_piece(self, piece: StrategicPiece, pieces: set[StrategicPiece]):
+        return self.esscort_piece(piece, pieces, 'attack')
+
+    def esscort_piece_with_defending_piece(self, piece: StrategicPiece, pieces: set[StrategicPiece]):
+        return self.esscort_piece(piece, pieces, 'defend')
+
+    def esscort_piece_with_intelligence_piece(self, piece: StrategicPiece, pieces: set[StrategicPiece]):
+        return self.esscort_piece(piece, pieces, 'intelligence')
+
+    def defend(self, pieces: set[StrategicPiece], destination: Coordinates, radius: int):
+        if len(pieces) == 0:
+            return None
+        defenders = []
+        for piece in pieces:
+            defender = self.context.my_pieces.get(piece.id)
+            if not defender or defender.type not in defense.DEFENDER_CAPACITY:
+                return None
+            defenders.append(defender)
+
+        command_id = str(len(self.state.commands))
+        assignment = self.state.border_garrison.assign(defenders, destination, radius)
+        self.place_domes([defender for defender in defenders if defender.type == 'irondome'], assignment,
+                         destination, radius)
+        for defender in defenders:
+            release_defender(self.state, defender.id)
+            release_escort(self.state, defender.id)
+            if defender.id in self.state.antitank_to_attacking_command:
+                old_command_id = self.state.antitank_to_attacking_command.pop(defender.id)
+                del self.state.antitank_to_coordinate_to_attack[defender.id]
+                self.state.commands[int(old_command_id)] = CommandStatus.failed(old_command_id)
+            self.state.defender_to_defending_command[defender.id] = command_id
+            self.state.defender_to_destination[defender.id] = assignment[defender.id]
+        self.state.defending_command_to_pieces[command_id] = set(assignment)
+
+        estimated_turns = max(distance(defender.tile.coordinates, assignment[defender.id]) for defender in defenders)
+        self.state.commands.append(CommandStatus.in_progress(command_id, 0, estimated_turns))
+        record_command(self.state, command_id, 'defend')
+        return command_id
+
+    def place_domes(self, domes: list[IronDome], assignment: dict[str, Coordinates], destination: Coordinates,
+                    radius: int):
+        """Moves the domes of the assignment to where they cover the most that our other domes do not.
+
+        Domes only move to tiles up to radius away from the destination, or on the
+        border segments defended there. Domes with no such tile keep their assignment.
+        """
+        if not domes:
+            return
+        dome_ids = {dome.id for dome in domes}
+        taken = [destination for piece_id, destination in self.state.defender_to_destination.items()
+                 if piece_id not in dome_ids and getattr(self.context.my_pieces.get(piece_id), 'type', None) == 'irondome']
+        candidates = {coords for coords in self.state.dome_planner.coverage if distance(coords, destination) <= radius}
+        for segment in self.state.border_garrison.segments_in_area(destination, radius):
+            candidates.update(segment.tiles)
+        positions = self.state.dome_planner.place(len(domes), taken, candidates)
+        for position in positions:
+            dome = min(domes, key=lambda dome: distance(dome.tile.coordinates, position))
+            domes.remove(dome)
+            assignment[dome.id] = position
+
+    def estimate_defend_time(self, pieces: set[StrategicPiece], destination: Coordinates, radius: int):
+        return max((self.state.turn_estimates.area_turns(self.context.my_pieces[piece.id], destination, radius)
+                    for piece in pieces), default=0)
+
+    def report_defense_command_status(self, command_id: str):
+        return self.state.commands[int(command_id)]
+
     def report_defending_pieces(self):
-        defending_pieces = {}
-        return defending_pieces
-        
+        # Attacking antitanks are reported by report_attacking_pieces.
+        return {piece: self.state.defender_to_defending_command.get(piece_id, self.state.escort_to_command.get(piece_id))
+                for piece_id, piece in self.state.mirrors.pieces.items()
+                if piece.type in defense.DEFENDER_CAPACITY and piece_id not in self.state.antitank_to_attacking_command}
+
+    def estimated_required_defending_pieces(self, destination: Coordinates, radius: int):
+        return self.state.border_garrison.estimated_required_pieces(destination, radius)
+
+    def report_missing_intelligence_for_pending_defends(self):
+        segment_ids = {self.state.border_garrison.tile_to_segment.get(destination)
+                       for destination in self.state.defender_to_destination.values()}
+        segment_ids.discard(None)
+        return {coords for segment_id in segment_ids for coords in self.state.border_garrison.segments[segment_id].unknown_tiles}
+
+    def set_intelligence_for_defends(self, tiles: dict[Coordinates, int]):
+        self.state.defense_intelligence.update((coords, (danger, self.state.turn)) for coords, danger in tiles.items())
+
+    def report_required_pieces_for_defends(self):
+        return self.state.border_garrison.required_pieces()
+
+    def report_required_tiles_for_defends(self):
+        ret = []
+        for defender_id, destination in self.state.defender_to_destination.items():
+            defender = self.context.my_pieces.get(defender_id)
+            if defender is None or defender.tile.coordinates == destination:
+                continue
+            segment_id = self.state.border_garrison.tile_to_segment.get(destination)
+            importance = self.state.border_garrison.segments[segment_id].threat() if segment_id is not None else 0
+            ret.append((destination, importance))
+        return ret
+
 
     def build_piece(self, piece, piece_type):
         builder: Builder = self.context.my_pieces[piece.id]
         if not builder or builder.type != 'builder':
             return None
 
-        if piece.id in builder_to_building_command:
-            old_command_id = int(builder_to_building_command[piece.id])
-            commands[old_command_id] = CommandStatus.failed(old_command_id)
+        if piece.id in self.state.builder_to_building_command:
+            old_command_id = int(self.state.builder_to_building_command[piece.id])
+            self.state.commands[old_command_id] = CommandStatus.failed(old_command_id)
 
-        command_id = str(len(commands))
-        building_command = CommandStatus.in_progress(command_id, 0, 0)
-        builder_to_building_command[piece.id] = command_id
-        builder_to_piece_type[piece.id] = piece_type
-        commands.append(building_command)
+        command_id = str(len(self.state.commands))
+        building_command = CommandStatus.in_progress(command_id, 0, self.state.turn_estimates.building_turns(builder, piece_type))
+        self.state.builder_to_building_command[piece.id] = command_id
+        self.state.builder_to_piece_type[piece.id] = piece_type
+        self.state.commands.append(building_command)
+        record_command(self.state, command_id, 'build')
 
         return command_id
 
 
 
+    def estimate_collection_time(self, builder: StrategicPiece, amount: int):
+        return self.state.turn_estimates.collection_turns(self.context.my_pieces[builder.id], amount)
+
+    def estimate_building_time(self, builder: StrategicPiece, piece_type: str):
+        return self.state.turn_estimates.building_turns(self.context.my_pieces[builder.id], piece_type)
+
     def log(self, log_entry):
-        return self.context.log(log_entry)
+        self.state.logger.log(log_entry)
+
+    def flush_log(self):
+        """Sends everything logged during the turn to the log of the turn. Called at the end of the turn."""
+        self.state.logger.flush(self.context.log)
+
+    def get_turn_view(self) -> turn_view.TurnView:
+        """The views of the turn shared with the tactical layer, for planners that look at the whole board."""
+        return self.context
+
+    def get_territory_center(self) -> Coordinates:
+        return self.context.territory_center
+
+    def get_enemy_pieces(self) -> list:
+        return self.context.enemy_pieces
+
+    def report_pieces_of_type(self, piece_type: str) -> list[StrategicPiece]:
+        return [self.state.mirrors.pieces[piece.id] for piece in self.context.pieces_by_type.get(piece_type, ())]
+
+    def get_vision_planner(self) -> vision.VisionPlanner:
+        return self.state.vision_planner
 
     def report_builders(self):
-        return {piece : builder_to_building_command.get(piece_id)
-                for piece_id, piece in self.context.my_pieces.items()
-                if piece.type == 'builder'}
+        return {self.state.mirrors.pieces[piece.id] : self.state.builder_to_building_command.get(piece.id)
+                for piece in self.context.pieces_by_type.get('builder', [])}
+
+    def get_total_builders_money(self):
+        return sum(piece.money for piece in self.context.pieces_by_type.get('builder', []))
 
     def get_total_country_tiles_money(self):
-        return sum([(self.context.tiles[Coordinates(*coordinate)].money if self.context.tiles[Coordinates(*coordinate)].money is not None else 0) 
-                    for coordinate in self.context.get_tiles_of_country(self.context.my_country)])
+        # Exact: the differ re-reads the money of our tiles every turn.
+        return self.state.board_differ.our_money
     
 def get_strategic_implementation(context):
-    return MyStrategicApi(context)
+    turn_telemetry = game_state.get_game_state(context, telemetry.__name__, telemetry.create)
+    return MyStrategicApi(context, game_state.get_game_state(context, __name__, lambda: GameState(turn_telemetry)))
+
+
+def end_game(context):
+    """Forgets everything kept about the game of the context, once it is over."""
+    game_state.end_game(context)
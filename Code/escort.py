@@ -0,0 +1,58 @@
+"""Group movement for escort commands.
+
+All the escorts of a single piece form one group. Once per turn the group
+works out where its leader is going to be, and every escort is stepped towards
+its own slot in a formation around that tile.
+"""
+from common_types import Coordinates, distance
+from tactical_api import TurnContext
+
+FORMATION_RADIUS = 2
+FORMATION_OFFSETS = sorted(((dx, dy)
+                            for dx in range(-FORMATION_RADIUS, FORMATION_RADIUS + 1)
+                            for dy in range(-FORMATION_RADIUS, FORMATION_RADIUS + 1)
+                            if 0 < abs(dx) + abs(dy) <= FORMATION_RADIUS),
+                           key=lambda offset: (abs(offset[0]) + abs(offset[1]), offset))
+
+ESCORTING_TYPES = {
+    'attack': {'tank', 'artillery'},
+    'defend': {'antitank', 'irondome'},
+    'intelligence': {'spy'},
+}
+
+
+class EscortGroup:
+    def __init__(self, leader_id: str):
+        self.leader_id = leader_id
+        # Escort piece ID -> (command ID, role), in the order they joined.
+        self.escorts: dict[str, tuple[str, str]] = {}
+        self.slots: dict[str, int] = {}
+
+    def add(self, piece_id: str, command_id: str, role: str):
+        if piece_id not in self.slots:
+            taken = set(self.slots.values())
+            self.slots[piece_id] = next(i for i in range(len(FORMATION_OFFSETS) + len(self.slots) + 1)
+                                        if i not in taken)
+        self.escorts[piece_id] = (command_id, role)
+
+    def remove(self, piece_id: str):
+        self.escorts.pop(piece_id, None)
+        self.slots.pop(piece_id, None)
+
+    def command_ids(self) -> set[str]:
+        return {command_id for command_id, _ in self.escorts.values()}
+
+    def plan(self, context: TurnContext, leader_next: Coordinates) -> dict[str, Coordinates]:
+        """Returns the formation tile of every escort around the leader's next tile."""
+        targets = {}
+        for piece_id, slot in self.slots.items():
+            dx, dy = FORMATION_OFFSETS[slot % len(FORMATION_OFFSETS)]
+            x = min(max(leader_next.x + dx, 0), context.game_width - 1)
+            y = min(max(leader_next.y + dy, 0), context.game_height - 1)
+            targets[piece_id] = Coordinates(x, y)
+        return targets
+
+
+def formation_turns(positions: dict[str, Coordinates], targets: dict[str, Coordinates]) -> int:
+    """Returns the amount of turns until every escort stands in its slot."""
+    return max((distance(positions[piece_id], target) for piece_id, target in targets.items()), default=0)
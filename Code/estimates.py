@@ -0,0 +1,110 @@
+"""Turn estimates for commands.
+
+Everything here is computed against a single turn: cost fields are built
+lazily per destination and cached until the next turn, and the builders'
+income model is computed once, so each estimate is a constant time lookup.
+"""
+from collections import OrderedDict
+import math
+
+from common_types import Coordinates, distance
+from turn_view import TurnView
+
+COLLECT_PER_TURN = 5
+AIRPLANE_SPEED = 8
+ARTILLERY_RANGE = 3
+MAX_CACHED_FIELDS = 64
+# Estimated turns of a collection that cannot complete, as no tile of ours has money.
+NEVER = 10 ** 6
+
+# Keyed by piece type. Iron domes are priced under their build name too, which
+# is what the strategy passes to `build_piece`.
+PRICE_PER_PIECE = {'tank': 8, 'builder': 20, 'artillery': 8, 'antitank': 10, 'irondome': 32, 'iron_dome': 32,
+                   'airplane': 20, 'helicopter': 20, 'bunker': 10, 'satellite': 64, 'tower': 16, 'spy': 20}
+
+
+class TurnEstimates:
+    def __init__(self, context: TurnView):
+        self.context = context
+        self.width = context.game_width
+        self.height = context.game_height
+        self._fields: OrderedDict[Coordinates, list[int]] = OrderedDict()
+
+        our_tiles = context.our_tiles
+        self._owned = [False] * (self.width * self.height)
+        for x, y in our_tiles:
+            self._owned[x * self.height + y] = True
+
+        # Income model: while standing on a tile with money a builder collects
+        # COLLECT_PER_TURN every turn, and then has to walk to the next such
+        # tile. The walk is estimated from the density of tiles with money.
+        money_tiles = [context.tiles[coords].money for coords in our_tiles
+                       if context.tiles[coords].money]
+        if money_tiles:
+            average_money = sum(money_tiles) / len(money_tiles)
+            hop = 1 / math.sqrt(len(money_tiles) / len(our_tiles))
+            self.income_per_turn = average_money / (math.ceil(average_money / COLLECT_PER_TURN) + hop)
+        else:
+            self.income_per_turn = 0
+
+    def _tank_field(self, destination: Coordinates) -> list[int]:
+        """Turns for a tank to conquer `destination`, from every tile on the board.
+
+        A tank walks along the X axis first and then along the Y axis, and
+        spends an extra turn attacking every tile on its way that is not ours.
+        """
+        field = self._fields.get(destination)
+        if field is not None:
+            self._fields.move_to_end(destination)
+            return field
+
+        width, height, owned = self.width, self.height, self._owned
+        field = [0] * (width * height)
+        dx, dy = destination
+        field[dx * height + dy] = 1
+        for step in (-1, 1):
+            y = dy + step
+            while 0 <= y < height:
+                field[dx * height + y] = field[dx * height + y - step] + 2 - owned[dx * height + y]
+                y += step
+        for y in range(height):
+            for step in (-1, 1):
+                x = dx + step
+                while 0 <= x < width:
+                    field[x * height + y] = field[(x - step) * height + y] + 2 - owned[x * height + y]
+                    x += step
+
+        self._fields[destination] = field
+        if len(self._fields) > MAX_CACHED_FIELDS:
+            self._fields.popitem(last=False)
+        return field
+
+    def piece_turns(self, piece, destination: Coordinates, radius: int) -> int:
+        start = piece.tile.coordinates
+        if piece.type == 'tank':
+            return self._tank_field(destination)[start.x * self.height + start.y]
+        if piece.type == 'artillery' and radius == ARTILLERY_RANGE:
+            return max(0, distance(start, destination) - ARTILLERY_RANGE) + 1
+        if piece.type == 'airplane':
+            return math.ceil(distance(start, destination) / AIRPLANE_SPEED) + 1
+        return distance(start, destination) + 1
+
+    def area_turns(self, piece, destination: Coordinates, radius: int) -> int:
+        """Turns for a walking piece to get within `radius` of `destination`."""
+        return max(0, distance(piece.tile.coordinates, destination) - radius)
+
+    def collection_turns(self, builder, amount: int) -> int:
+        if amount <= 0:
+            return 0
+        tile = builder.tile
+        on_tile = min(amount, tile.money or 0) if tile.country == self.context.my_country else 0
+        turns = math.ceil(on_tile / COLLECT_PER_TURN)
+        remaining = amount - on_tile
+        if remaining <= 0:
+            return turns
+        if self.income_per_turn == 0:
+            return NEVER
+        return turns + math.ceil(remaining / self.income_per_turn)
+
+    def building_turns(self, builder, piece_type: str) -> int:
+        return self.collection_turns(builder, PRICE_PER_PIECE[piece_type] - builder.money) + 1
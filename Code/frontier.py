@@ -0,0 +1,192 @@
+"""Conquest targets for tanks.
+
+The planner keeps every tile that a tank could capture next - a tile that we
+do not own, next to our territory, and not guarded by an enemy antitank - in a
+priority queue that lives for the whole game. Tiles are scored by their money,
+by enemy presence, and by how compact our territory becomes when they are
+taken. Every turn only the tiles around the turn's changes are rescored - new
+owners, new money, moved pieces, and the borders of the regions whose center
+moved - and the idle tanks share out the top of the queue.
+"""
+import heapq
+
+from common_types import Coordinates, distance
+from board import get_neighbours
+from turn_view import TurnView
+
+MONEY_WEIGHT = 1
+# Money assumed for tiles whose money we cannot see.
+UNKNOWN_MONEY = 10
+ENEMY_TILE_WEIGHT = 12
+ENEMY_BUILDER_WEIGHT = 20
+OUR_NEIGHBOUR_WEIGHT = 6
+CENTER_DISTANCE_WEIGHT = 1
+# Score lost for every tile a tank has to travel to its target.
+TRAVEL_WEIGHT = 12
+# How many of the best targets are considered for every idle tank.
+CANDIDATES_PER_TANK = 4
+# All the tiles are rescored when the territory center moves this far.
+RESCORE_CENTER_SHIFT = 2
+
+
+class FrontierPlanner:
+    def __init__(self):
+        self._heap: list[tuple[int, Coordinates]] = []
+        # Score of every capturable tile. Heap entries with another score are stale.
+        self.scores: dict[Coordinates, int] = {}
+        # Target -> the ID of the tank it was handed to.
+        self.assigned: dict[Coordinates, str] = {}
+        self.tank_targets: dict[str, Coordinates] = {}
+        self.center: Coordinates = None
+        # Region ID -> its center, for the turn.
+        self._region_centers: dict[int, Coordinates] = {}
+
+    def update(self, view: TurnView):
+        center = view.territory_center
+        previous_centers = self._region_centers
+        self._region_centers = {}
+        if view.regions is not None:
+            self._region_centers = {region_id: region.center() for region_id, region in view.regions.regions.items()}
+        diff = view.diff
+        if diff is None or self.center is None or distance(center, self.center) >= RESCORE_CENTER_SHIFT:
+            self.center = center
+            self._rescore_all(view)
+        else:
+            dirty = set()
+            for coords in diff.owners:
+                dirty.add(coords)
+                dirty.update(get_neighbours(view, coords))
+            for piece_id in diff.appeared:
+                piece = view.all_pieces[piece_id]
+                if piece.country != view.my_country:
+                    dirty.add(piece.tile.coordinates)
+            for previous, coords in diff.moved.values():
+                dirty.add(previous)
+                dirty.add(coords)
+            for coords, country, _ in diff.vanished.values():
+                if country != view.my_country:
+                    dirty.add(coords)
+            dirty.update(diff.money)
+            # Tiles are scored by their distance to the center of the region they border.
+            shifted = {region_id for region_id, region_center in self._region_centers.items()
+                       if previous_centers.get(region_id) != region_center}
+            if shifted:
+                for region_id, border in view.regions.borders(view.border_tiles).items():
+                    if region_id in shifted:
+                        for coords in border:
+                            dirty.update(get_neighbours(view, coords))
+            for coords in dirty:
+                self._rescore(view, coords)
+
+        for target, tank_id in list(self.assigned.items()):
+            if target not in self.scores or tank_id not in view.my_pieces:
+                self.release(tank_id)
+
+    def release(self, tank_id: str):
+        """Puts the target of the tank back in the queue."""
+        target = self.tank_targets.pop(tank_id, None)
+        if target is not None:
+            del self.assigned[target]
+            if target in self.scores:
+                heapq.heappush(self._heap, (-self.scores[target], target))
+
+    def assign(self, tanks) -> dict:
+        """Hands distinct targets to the given idle tanks.
+
+        The best few targets per tank are popped, and matched greedily to the
+        tanks by their score minus the travel to them. Targets that are not
+        handed out go back to the queue.
+        """
+        idle = list(tanks)
+        for tank in idle:
+            self.release(tank.id)
+        candidates = []
+        while len(candidates) < CANDIDATES_PER_TANK * len(idle):
+            target = self._pop()
+            if target is None:
+                break
+            # The heap may hold the same tile more than once.
+            if target not in candidates:
+                candidates.append(target)
+
+        pairs = sorted(((self.scores[target] - TRAVEL_WEIGHT * distance(tank.tile.coordinates, target), i, j)
+                        for i, tank in enumerate(idle) for j, target in enumerate(candidates)), reverse=True)
+        targets = {}
+        taken = set()
+        for _, i, j in pairs:
+            tank, target = idle[i], candidates[j]
+            if tank in targets or j in taken:
+                continue
+            taken.add(j)
+            targets[tank] = target
+            self.assigned[target] = tank.id
+            self.tank_targets[tank.id] = target
+        for j, target in enumerate(candidates):
+            if j not in taken:
+                heapq.heappush(self._heap, (-self.scores[target], target))
+        return targets
+
+    def _pop(self) -> Coordinates | None:
+        heap = self._heap
+        while heap:
+            score, coords = heapq.heappop(heap)
+            if self.scores.get(coords) == -score and coords not in self.assigned:
+                return coords
+        return None
+
+    def _rescore_all(self, view: TurnView):
+        if view.territories is not None:
+            territories = view.territories
+            candidates = territories.geometry.tiles(territories.expand(territories.our))
+        else:
+            candidates = {neighbour for coords in view.border_tiles for neighbour in get_neighbours(view, coords)}
+        self.scores = {}
+        self._heap = []
+        for coords in candidates:
+            self._rescore(view, coords)
+        self._heap = [(-score, coords) for coords, score in self.scores.items() if coords not in self.assigned]
+        heapq.heapify(self._heap)
+
+    def _rescore(self, view: TurnView, coords: Coordinates):
+        score = self._score(view, coords)
+        if score is None:
+            self.scores.pop(coords, None)
+            return
+        if self.scores.get(coords) != score:
+            self.scores[coords] = score
+            if coords not in self.assigned:
+                heapq.heappush(self._heap, (-score, coords))
+        if len(self._heap) > 4 * len(self.scores) + 64:
+            self._heap = [(-score, coords) for coords, score in self.scores.items() if coords not in self.assigned]
+            heapq.heapify(self._heap)
+
+    def _center_of(self, view: TurnView, coords: Coordinates) -> Coordinates:
+        """The center of the region the tile borders, or of our whole territory."""
+        if view.regions is not None:
+            for neighbour in get_neighbours(view, coords):
+                region_id = view.regions.region_of.get(neighbour)
+                if region_id is not None:
+                    return self._region_centers[region_id]
+        return self.center
+
+    def _score(self, view: TurnView, coords: Coordinates) -> int | None:
+        """The score of capturing the tile, or None if a tank cannot capture it next."""
+        tile = view.tiles[coords]
+        if tile.country == view.my_country:
+            return None
+        our_neighbours = sum(1 for neighbour in get_neighbours(view, coords)
+                             if view.tiles[neighbour].country == view.my_country)
+        if not our_neighbours:
+            return None
+        score = OUR_NEIGHBOUR_WEIGHT * our_neighbours - CENTER_DISTANCE_WEIGHT * distance(coords, self._center_of(view, coords))
+        score += MONEY_WEIGHT * (UNKNOWN_MONEY if tile.money is None else tile.money)
+        if tile.country is not None:
+            score += ENEMY_TILE_WEIGHT
+        for piece in tile.pieces:
+            if piece.country == view.my_country:
+                continue
+            if piece.type == 'antitank':
+                return None
+            if piece.type == 'builder':
+                score += ENEMY_BUILDER_WEIGHT
+        return score
@@ -0,0 +1,102 @@
+"""Per-game state of the strategy modules.
+
+The server drives a game through module level entry points, so whatever a
+strategy remembers between turns has to live outside of them. Rather than in
+module globals, it lives here, keyed by the game it belongs to, so a process
+can play any number of games, on any threads, without one seeing the state of
+another.
+
+A game is told apart by `game_key`: the `game_id` of the turn context when it
+has one, which the local engine sets, along with our country, the countries of
+the game and the board size. The server passes no game ID and never ends a
+game, so there a later game with the same settings gets the same key. Such a
+game is told from the one before it by its turn: its pieces or its tiles are
+none of the ones we had last turn, or it is back to the pieces and tiles of
+the first turn. The state of the earlier game is then dropped. At most
+MAX_GAMES games are kept, and the ones not played the longest are dropped
+first.
+"""
+from collections import OrderedDict
+import threading
+
+MAX_GAMES = 32
+
+
+class _Game:
+    """The states of a game, and what its turns looked like."""
+
+    def __init__(self):
+        # Owner -> the state the owner keeps for the game.
+        self.states: dict = {}
+        self.first_pieces: frozenset = None
+        self.first_tiles: frozenset = None
+        self.last_pieces: frozenset = None
+        self.last_tiles = None
+        self.last_at_start = True
+
+    def is_new_game(self, context) -> bool:
+        """Whether the turn is of a game other than the previous turns, and remembers the turn."""
+        pieces = frozenset(context.my_pieces)
+        tiles = context.get_tiles_of_country(context.my_country)
+        if self.first_pieces is None:
+            self.first_pieces, self.first_tiles = pieces, frozenset(tiles)
+        at_start = pieces == self.first_pieces and tiles == self.first_tiles
+        new_game = bool(self.last_pieces and pieces and self.last_pieces.isdisjoint(pieces)) \
+            or bool(self.last_tiles and tiles and self.last_tiles.isdisjoint(tiles)) \
+            or (at_start and not self.last_at_start)
+        self.last_pieces, self.last_tiles, self.last_at_start = pieces, tiles, at_start
+        return new_game
+
+
+# Game key -> the game, the most recently played last.
+_games: OrderedDict[tuple, _Game] = OrderedDict()
+_lock = threading.Lock()
+
+
+def game_key(context) -> tuple:
+    return (getattr(context, 'game_id', None), context.my_country, tuple(context.all_countries),
+            context.game_width, context.game_height)
+
+
+def get_game_state(context, owner: str, factory):
+    """Returns the state `owner` keeps for the game of the context, creating it if needed."""
+    key = game_key(context)
+    ended = []
+    with _lock:
+        game = _games.get(key)
+        if game is None:
+            game = _games[key] = _Game()
+            while len(_games) > MAX_GAMES:
+                ended.append(_games.popitem(last=False)[1])
+        else:
+            _games.move_to_end(key)
+        if key[0] is None and game.is_new_game(context):
+            ended.append(game)
+            new_game = _games[key] = _Game()
+            new_game.is_new_game(context)
+            game = new_game
+    for ended_game in ended:
+        _close(ended_game.states)
+
+    states = game.states
+    state = states.get(owner)
+    if state is None:
+        # Created outside of the lock, as factories may ask for other states.
+        # The turns of a single game never run at the same time.
+        state = states[owner] = factory()
+    return state
+
+
+def end_game(context):
+    """Drops the state of the game of the context, closing every state that has a `close` method."""
+    with _lock:
+        game = _games.pop(game_key(context), None)
+    if game is not None:
+        _close(game.states)
+
+
+def _close(states: dict):
+    for state in states.values():
+        close = getattr(state, 'close', None)
+        if close is not None:
+            close()
@@ -0,0 +1,102 @@
+"""Money collection ledger.
+
+Keeps, across turns, which builder is going to collect how much money from
+which tile, so builders never head for money another builder has already
+claimed. Tiles are identified by a packed tile ID (`x * height + y`) and
+their money and reservations are kept in flat arrays.
+"""
+from __future__ import annotations
+from array import array
+
+from common_types import Coordinates, distance
+from turn_view import TurnView
+
+
+class CollectionLedger:
+    def __init__(self):
+        self.width = 0
+        self.height = 0
+        self.money = array('l')
+        self.reserved = array('l')
+        # Tile IDs of our tiles that still have money, refreshed every turn.
+        self.money_tiles: list[int] = []
+        # Builder ID -> (tile ID, amount it is going to collect there).
+        self.claims: dict[str, tuple[int, int]] = {}
+
+    def pack(self, coords: Coordinates) -> int:
+        return coords[0] * self.height + coords[1]
+
+    def coordinates(self, tile_id: int) -> Coordinates:
+        return Coordinates(*divmod(tile_id, self.height))
+
+    def update(self, context: TurnView):
+        """Refreshes the money of our tiles, and re-validates the claims against it."""
+        if (self.width, self.height) != (context.game_width, context.game_height):
+            self.width, self.height = context.game_width, context.game_height
+            self.money = array('l', bytes(self.money.itemsize * self.width * self.height))
+            self.reserved = array('l', bytes(self.reserved.itemsize * self.width * self.height))
+            self.claims.clear()
+
+        for tile_id in self.money_tiles:
+            self.money[tile_id] = 0
+            self.reserved[tile_id] = 0
+        self.money_tiles = []
+        for coords in context.our_tiles:
+            money = context.tiles[coords].money
+            if money:
+                tile_id = self.pack(coords)
+                self.money[tile_id] = money
+                self.money_tiles.append(tile_id)
+
+        claims, self.claims = self.claims, {}
+        for builder_id, (tile_id, amount) in claims.items():
+            if builder_id in context.my_pieces:
+                self.claim(builder_id, tile_id, amount)
+
+    def available(self, tile_id: int) -> int:
+        return self.money[tile_id] - self.reserved[tile_id]
+
+    def claimed_tile(self, builder_id: str) -> int | None:
+        claim = self.claims.get(builder_id)
+        return claim[0] if claim is not None else None
+
+    def claimed_amount(self, builder_id: str) -> int:
+        claim = self.claims.get(builder_id)
+        return claim[1] if claim is not None else 0
+
+    def claim(self, builder_id: str, tile_id: int, amount: int):
+        self.release(builder_id)
+        amount = min(amount, self.available(tile_id))
+        if amount > 0:
+            self.reserved[tile_id] += amount
+            self.claims[builder_id] = (tile_id, amount)
+
+    def release(self, builder_id: str):
+        claim = self.claims.pop(builder_id, None)
+        if claim is not None:
+            self.reserved[claim[0]] -= claim[1]
+
+    def collected(self, builder_id: str, amount: int):
+        tile_id, claimed = self.claims.pop(builder_id)
+        self.reserved[tile_id] -= claimed
+        # The tile money drops by `amount` only from next turn on.
+        self.money[tile_id] -= amount
+        if amount < claimed:
+            self.claim(builder_id, tile_id, claimed - amount)
+
+    def find_tile(self, start: Coordinates, amount: int, tiles: set[Coordinates] = None) -> int | None:
+        """Returns the unclaimed tile which yields the most money per turn of walking.
+
+        Only the given tiles are considered, when there are any.
+        """
+        best_tile_id, best_score = None, 0
+        for tile_id in self.money_tiles:
+            if tiles is not None and self.coordinates(tile_id) not in tiles:
+                continue
+            available = min(self.available(tile_id), amount)
+            if available <= 0:
+                continue
+            score = available / (distance(start, self.coordinates(tile_id)) + 1)
+            if score > best_score:
+                best_tile_id, best_score = tile_id, score
+        return best_tile_id
@@ -0,0 +1,72 @@
+"""Lightweight mirrors of our pieces and of the tiles they stand on.
+
+The strategic layer only needs a piece's ID, type and tile, so the reports
+hand it mirrors instead of the game's piece objects. There is a single mirror
+per piece for the whole game, refreshed in place every turn: the strategic
+layer can pass the mirrors it got back as `StrategicPiece`s, keep them in sets
+and dicts across turns, and use their integer handles to index arrays.
+"""
+from common_types import Coordinates
+from tactical_api import TurnContext
+
+
+class TileMirror:
+    __slots__ = ('handle', 'coordinates', 'country', 'money')
+
+    def __init__(self, handle: int, coordinates: Coordinates):
+        self.handle = handle
+        self.coordinates = coordinates
+        self.country = None
+        self.money = None
+
+
+class PieceMirror:
+    """A piece of ours, usable anywhere a `StrategicPiece` is expected."""
+    __slots__ = ('handle', 'id', 'type', 'tile')
+
+    def __init__(self, handle: int, piece_id: str, piece_type: str):
+        self.handle = handle
+        self.id = piece_id
+        self.type = piece_type
+        self.tile: TileMirror = None
+
+    def __repr__(self):
+        return f'PieceMirror({self.id!r}, {self.type!r})'
+
+
+class Mirrors:
+    """The mirrors of a single game.
+
+    Piece handles are given in the order pieces are first seen and are never
+    reused. Tile handles are `x * height + y`. Only the tiles our pieces stand
+    on are refreshed every turn.
+    """
+
+    def __init__(self):
+        self.pieces: dict[str, PieceMirror] = {}
+        self.by_handle: list[PieceMirror | None] = []
+        self.tiles: list[TileMirror] = []
+        self.height = 0
+
+    def update(self, context: TurnContext):
+        if len(self.tiles) != context.game_width * context.game_height:
+            self.height = context.game_height
+            self.tiles = [TileMirror(x * self.height + y, Coordinates(x, y))
+                          for x in range(context.game_width) for y in range(self.height)]
+
+        for piece_id in [piece_id for piece_id in self.pieces if piece_id not in context.my_pieces]:
+            self.by_handle[self.pieces.pop(piece_id).handle] = None
+
+        for piece_id, piece in context.my_pieces.items():
+            mirror = self.pieces.get(piece_id)
+            if mirror is None:
+                mirror = self.pieces[piece_id] = PieceMirror(len(self.by_handle), piece_id, piece.type)
+                self.by_handle.append(mirror)
+            x, y = piece.tile.coordinates
+            tile = self.tiles[x * self.height + y]
+            tile.country = piece.tile.country
+            tile.money = piece.tile.money
+            mirror.tile = tile
+
+    def tile(self, coords: Coordinates) -> TileMirror:
+        return self.tiles[coords[0] * self.height + coords[1]]
@@ -0,0 +1,97 @@
+"""Routes that are kept across turns.
+
+Routing a piece searches a path over the next few turns, but only its first
+step is used. The plan cache keeps the rest: next turn, a piece that made the
+step it was given, and still heads for the same destination, follows its plan
+without a new search. Every plan is tagged with the tiles its path crosses,
+and is dropped when the turn diff shows that one of them changed owner or that
+an enemy piece showed up on it.
+"""
+from turn_view import TurnView
+
+# Plans that have fewer turns left than this and do not reach their
+# destination are searched again, so that they keep looking far enough ahead.
+MIN_PLANNED_TURNS = 3
+
+
+class Plan:
+    __slots__ = ('destination', 'path')
+
+    def __init__(self, destination: int, path: list[int]):
+        self.destination = destination
+        # Tile IDs of the piece from the turn the plan was made, one per turn.
+        self.path = path
+
+
+class PlanCache:
+    def __init__(self):
+        self.plans: dict[str, Plan] = {}
+        # Tile ID -> IDs of the pieces whose plans cross it.
+        self.tags: dict[int, set[str]] = {}
+        self.height = None
+        self.hits = 0
+        self.misses = 0
+
+    def update(self, view: TurnView):
+        """Drops the plans that the changes of the turn affect."""
+        diff = view.diff
+        height = view.game_height
+        if diff is None or height != self.height:
+            self.height = height
+            self.plans.clear()
+            self.tags.clear()
+            return
+        changed = set(diff.owners)
+        for piece_id in diff.appeared:
+            piece = view.all_pieces[piece_id]
+            if piece.country != view.my_country:
+                changed.add(piece.tile.coordinates)
+        for piece_id, (_, coords) in diff.moved.items():
+            if view.all_pieces[piece_id].country != view.my_country:
+                changed.add(coords)
+        for piece_id in list(self.plans):
+            if piece_id not in view.my_pieces:
+                self.drop(piece_id)
+        for coords in changed:
+            for piece_id in list(self.tags.get(coords[0] * height + coords[1], ())):
+                self.drop(piece_id)
+
+    def get(self, piece_id: str, start: int, destination: int) -> list[int] | None:
+        """The rest of the piece's plan, starting at its current tile."""
+        plan = self.plans.get(piece_id)
+        if plan is None or plan.destination != destination or len(plan.path) < 2 or plan.path[1] != start:
+            if plan is not None:
+                self.drop(piece_id)
+            self.misses += 1
+            return None
+        path = plan.path[1:]
+        if path[-1] != destination and len(path) <= MIN_PLANNED_TURNS:
+            self.drop(piece_id)
+            self.misses += 1
+            return None
+        # The tiles a plan is tagged with are always the tiles of its path.
+        if plan.path[0] not in path:
+            self._untag(piece_id, plan.path[0])
+        plan.path = path
+        self.hits += 1
+        return path
+
+    def store(self, piece_id: str, destination: int, path: list[int]):
+        self.drop(piece_id)
+        self.plans[piece_id] = Plan(destination, path)
+        for tile_id in path:
+            self.tags.setdefault(tile_id, set()).add(piece_id)
+
+    def drop(self, piece_id: str):
+        plan = self.plans.pop(piece_id, None)
+        if plan is None:
+            return
+        for tile_id in set(plan.path):
+            self._untag(piece_id, tile_id)
+
+    def _untag(self, piece_id: str, tile_id: int):
+        piece_ids = self.tags.get(tile_id)
+        if piece_ids is not None:
+            piece_ids.discard(piece_id)
+            if not piece_ids:
+                del self.tags[tile_id]
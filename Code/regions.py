@@ -0,0 +1,199 @@
+"""Our territory as connected regions.
+
+Our tiles fall into regions of 4-connected tiles. Every tile maps straight to
+the ID of its region, and every region keeps its tiles, its money and its
+coordinate sums, so its size, money and centroid are always at hand.
+
+The regions are kept up to date from the owner changes of every turn. A
+gained tile joins the regions around it, and when it connects several of them
+the smaller ones are relabelled into the largest one. A lost tile can split
+its region, which only happens when more than one of its neighbours are in
+the region: searches from those neighbours run side by side, merging when
+they meet, and stop as soon as a single one is left running. Every search that
+ran out before that is a part that broke away, and only those parts are
+relabelled, so the repair is proportional to the smaller parts and not to the
+whole region.
+"""
+from collections import deque
+
+from common_types import Coordinates, distance
+from board import get_neighbours
+from turn_view import TurnView
+
+
+class Region:
+    __slots__ = ('id', 'tiles', 'money', 'x_sum', 'y_sum')
+
+    def __init__(self, region_id: int):
+        self.id = region_id
+        self.tiles: set[Coordinates] = set()
+        self.money = 0
+        self.x_sum = 0
+        self.y_sum = 0
+
+    def add(self, coords: Coordinates, money: int):
+        self.tiles.add(coords)
+        self.money += money
+        self.x_sum += coords[0]
+        self.y_sum += coords[1]
+
+    def remove(self, coords: Coordinates, money: int):
+        self.tiles.discard(coords)
+        self.money -= money
+        self.x_sum -= coords[0]
+        self.y_sum -= coords[1]
+
+    @property
+    def size(self) -> int:
+        return len(self.tiles)
+
+    @property
+    def centroid(self) -> Coordinates:
+        return Coordinates(self.x_sum // len(self.tiles), self.y_sum // len(self.tiles))
+
+    def center(self) -> Coordinates:
+        """The tile of the region closest to its centroid, which, unlike the centroid, is always ours."""
+        centroid = self.centroid
+        if centroid in self.tiles:
+            return centroid
+        return min(self.tiles, key=lambda coords: distance(coords, centroid))
+
+
+class TerritoryRegions:
+    def __init__(self):
+        self.my_country = None
+        self.size = None
+        self.region_of: dict[Coordinates, int] = {}
+        self.regions: dict[int, Region] = {}
+        # Money of our tiles, as the regions counted it.
+        self.money: dict[Coordinates, int] = {}
+        self._next_id = 0
+        self._largest: Region = None
+
+    def update(self, view: TurnView):
+        self._largest = None
+        diff = view.diff
+        if diff is None or self.my_country != view.my_country or self.size != (view.game_width, view.game_height):
+            self.my_country = view.my_country
+            self.size = (view.game_width, view.game_height)
+            self.region_of, self.regions, self.money = {}, {}, {}
+            for coords in view.our_tiles:
+                self._gain(view, coords)
+            return
+
+        for coords, (old_owner, new_owner) in diff.owners.items():
+            if old_owner == self.my_country:
+                self._lose(view, coords)
+        for coords, (old_owner, new_owner) in diff.owners.items():
+            if new_owner == self.my_country:
+                self._gain(view, coords)
+        for coords in diff.money:
+            region_id = self.region_of.get(coords)
+            if region_id is not None and coords not in diff.owners:
+                money = view.tiles[coords].money or 0
+                self.regions[region_id].money += money - self.money[coords]
+                self.money[coords] = money
+
+    def _new_region(self) -> Region:
+        region = Region(self._next_id)
+        self._next_id += 1
+        self.regions[region.id] = region
+        return region
+
+    def _gain(self, view: TurnView, coords: Coordinates):
+        neighbour_ids = {self.region_of[neighbour] for neighbour in get_neighbours(view, coords)
+                         if neighbour in self.region_of}
+        if not neighbour_ids:
+            region = self._new_region()
+        else:
+            region = max((self.regions[region_id] for region_id in neighbour_ids), key=lambda region: region.size)
+            for region_id in neighbour_ids:
+                if region_id != region.id:
+                    self._relabel(self.regions.pop(region_id).tiles, region)
+        money = view.tiles[coords].money or 0
+        self.money[coords] = money
+        self.region_of[coords] = region.id
+        region.add(coords, money)
+
+    def _lose(self, view: TurnView, coords: Coordinates):
+        region_id = self.region_of.pop(coords, None)
+        if region_id is None:
+            return
+        region = self.regions[region_id]
+        region.remove(coords, self.money.pop(coords))
+        if not region.tiles:
+            del self.regions[region_id]
+            return
+        starts = [neighbour for neighbour in get_neighbours(view, coords) if self.region_of.get(neighbour) == region_id]
+        if len(starts) < 2:
+            return
+
+        # One search per start. `owner` maps every reached tile to the search
+        # that reached it, and `groups` links the searches that met.
+        owner: dict[Coordinates, int] = {}
+        searches = []
+        groups = list(range(len(starts)))
+
+        def group(i):
+            while groups[i] != i:
+                i = groups[i]
+            return i
+
+        for i, start in enumerate(starts):
+            owner[start] = i
+            searches.append(([start], deque([start])))
+        while sum(1 for i, (_, queue) in enumerate(searches) if group(i) == i and queue) > 1:
+            for i in range(len(searches)):
+                if group(i) != i or not searches[i][1]:
+                    continue
+                tile = searches[i][1].popleft()
+                for neighbour in get_neighbours(view, tile):
+                    if self.region_of.get(neighbour) != region_id:
+                        continue
+                    root = group(i)
+                    other = owner.get(neighbour)
+                    if other is None:
+                        owner[neighbour] = root
+                        searches[root][0].append(neighbour)
+                        searches[root][1].append(neighbour)
+                    elif group(other) != root:
+                        # The searches met: hand everything to one of them.
+                        merged = group(other)
+                        groups[root] = merged
+                        searches[merged][0].extend(searches[root][0])
+                        searches[merged][1].extend(searches[root][1])
+                        searches[root] = ([], deque())
+
+        # Searches that ran out without meeting the others found parts that broke away.
+        parts = [reached for i, (reached, queue) in enumerate(searches) if group(i) == i and not queue]
+        if not any(queue for i, (_, queue) in enumerate(searches) if group(i) == i):
+            parts.remove(max(parts, key=len))
+        for reached in parts:
+            part = self._new_region()
+            for tile in reached:
+                region.remove(tile, self.money[tile])
+            self._relabel(reached, part)
+
+    def _relabel(self, tiles, region: Region):
+        for coords in tiles:
+            self.region_of[coords] = region.id
+            region.add(coords, self.money[coords])
+
+    def region_at(self, coords: Coordinates) -> Region | None:
+        region_id = self.region_of.get(coords)
+        return self.regions[region_id] if region_id is not None else None
+
+    @property
+    def largest(self) -> Region | None:
+        if self._largest is None and self.regions:
+            self._largest = max(self.regions.values(), key=lambda region: region.size)
+        return self._largest
+
+    def borders(self, border_tiles) -> dict[int, list[Coordinates]]:
+        """The given border tiles, by the ID of their region."""
+        ret = {}
+        for coords in border_tiles:
+            region_id = self.region_of.get(coords)
+            if region_id is not None:
+                ret.setdefault(region_id, []).append(coords)
+        return ret
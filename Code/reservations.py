@@ -0,0 +1,141 @@
+"""Cooperative movement of ground pieces.
+
+Pieces ask to move towards a destination, and once per turn all the requests
+are routed together. Every route is a space-time path over the next HORIZON
+turns: at each turn a piece steps to a neighbouring tile or waits. Routes are
+searched one piece at a time, and each route reserves its (tile, turn) pairs,
+so the pieces searched later spread over the other shortest paths instead of
+piling onto the same tiles. Pieces that do not move reserve their tile for
+the whole horizon. Since pieces may share a tile, reservations make a tile
+more expensive rather than forbidden.
+
+Only the first step of every route is used. Given a `plans.PlanCache`, the
+rest of every route is kept, and followed on the next turns instead of being
+searched again until the board changes under it.
+"""
+from array import array
+import heapq
+
+from common_types import Coordinates
+from plans import PlanCache
+import tables
+
+HORIZON = 6
+# Extra cost of a step into a tile that another piece has reserved for that turn.
+CONGESTION_COST = 0.4
+
+
+class ReservationTable:
+    def __init__(self, width: int, height: int, horizon: int = HORIZON):
+        self.width = width
+        self.height = height
+        self.horizon = horizon
+        self.tables = tables.get(width, height)
+        # Turn from now -> tile ID -> how many pieces are there at that turn.
+        self.slices = [array('B', bytes(width * height)) for _ in range(horizon + 1)]
+        # (from tile ID, to tile ID, turn) of every reserved step.
+        self.steps: set[tuple[int, int, int]] = set()
+
+    def tile_id(self, coords: Coordinates) -> int:
+        return coords[0] * self.height + coords[1]
+
+    def coordinates(self, tile_id: int) -> Coordinates:
+        return Coordinates(*divmod(tile_id, self.height))
+
+    def _reserve(self, tile_id: int, turn: int):
+        occupancy = self.slices[turn]
+        if occupancy[tile_id] < 255:
+            occupancy[tile_id] += 1
+
+    def hold(self, coords: Coordinates):
+        """Reserves the tile of a piece that stays where it is."""
+        tile_id = self.tile_id(coords)
+        for turn in range(1, self.horizon + 1):
+            self._reserve(tile_id, turn)
+
+    def reserve(self, path: list[int]):
+        """Reserves a path of tile IDs starting now, staying at its end until the horizon."""
+        for turn in range(1, self.horizon + 1):
+            self._reserve(path[min(turn, len(path) - 1)], turn)
+        for turn in range(1, len(path)):
+            self.steps.add((path[turn - 1], path[turn], turn))
+
+    def _neighbours(self, tile_id: int) -> list[int]:
+        # Waiting in place, then the adjacent tiles.
+        return [tile_id] + self.tables.neighbours(tile_id)
+
+    def find_path(self, start: Coordinates, goal: Coordinates) -> list[int]:
+        """The cheapest path of tile IDs from start towards goal.
+
+        Every step costs a turn, plus CONGESTION_COST for every piece that
+        has reserved the tile at that turn or is crossing the step the other
+        way, so a piece takes the least crowded of the shortest paths, and
+        only goes around or waits when a way is crowded. The path ends at the
+        goal, or at the end of the horizon.
+        """
+        height = self.height
+        goal_x, goal_y = goal
+        start_id, goal_id = self.tile_id(start), self.tile_id(goal)
+
+        def estimate(tile_id):
+            x, y = divmod(tile_id, height)
+            return abs(x - goal_x) + abs(y - goal_y)
+
+        # (cost + estimate, -turns, estimate, cost, tile ID, turns); ties go to the deeper node.
+        queue = [(estimate(start_id), 0, estimate(start_id), 0, start_id, 0)]
+        parents = {(start_id, 0): None}
+        costs = {(start_id, 0): 0}
+        while queue:
+            _, _, left, cost, tile_id, turn = heapq.heappop(queue)
+            if cost > costs[(tile_id, turn)]:
+                continue
+            if left == 0 or turn == self.horizon:
+                path = []
+                node = (tile_id, turn)
+                while node is not None:
+                    path.append(node[0])
+                    node = parents[node]
+                path.reverse()
+                return path
+            next_turn = turn + 1
+            occupancy = self.slices[next_turn]
+            for next_id in self._neighbours(tile_id):
+                next_cost = cost + 1
+                if next_id != goal_id:
+                    # Pieces may always share their destination.
+                    next_cost += CONGESTION_COST * occupancy[next_id]
+                if (next_id, tile_id, next_turn) in self.steps:
+                    next_cost += CONGESTION_COST
+                node = (next_id, next_turn)
+                if next_cost >= costs.get(node, next_cost + 1):
+                    continue
+                costs[node] = next_cost
+                parents[node] = (tile_id, turn)
+                left = estimate(next_id)
+                heapq.heappush(queue, (next_cost + left, -next_turn, left, next_cost, next_id, next_turn))
+
+
+def route(table: ReservationTable, requests: dict, plans: PlanCache = None) -> dict:
+    """The next step of every requested move.
+
+    `requests` maps each moving piece to its (start, destination); pieces
+    closer to their destination are routed first. Pieces with a cached plan
+    follow it, and the others' new routes are stored in the cache.
+    """
+    steps = {}
+    for piece, (start, destination) in sorted(requests.items(),
+                                              key=lambda request: _distance(*request[1])):
+        path = None
+        if plans is not None:
+            path = plans.get(piece.id, table.tile_id(start), table.tile_id(destination))
+        if path is None:
+            path = table.find_path(start, destination)
+            if plans is not None:
+                plans.store(piece.id, table.tile_id(destination), path)
+        table.reserve(path)
+        steps[piece] = table.coordinates(path[1]) if len(path) > 1 else start
+    return steps
+
+
+def _distance(a: Coordinates, b: Coordinates) -> int:
+    return abs(a[0] - b[0]) + abs(a[1] - b[1])
@@ -0,0 +1,219 @@
+"""Monte Carlo evaluator for local skirmishes.
+
+Where our pieces are in contact with enemy pieces, the evaluator cuts the
+board down to a small window around the contact and plays it forward for a
+few turns, many times over. The piece being decided keeps to one candidate
+order through every rollout, and every other piece in the window acts at
+random, following the rules of the game: tanks capture tiles and kill what
+they find there unless an antitank guards the tile, artillery strikes within
+its range, and iron domes protect the tiles around them. Every rollout scores
+the material killed and lost and the tiles won and lost, and the candidates
+are compared by their average.
+
+All the rollouts of a turn share a single deadline, so the evaluator never
+takes more than SKIRMISH_BUDGET seconds of a turn, however many contacts
+there are.
+"""
+import random
+import time
+
+from common_types import Coordinates
+from estimates import PRICE_PER_PIECE
+from turn_view import TurnView
+
+WINDOW_RADIUS = 3
+ROLLOUT_TURNS = 3
+ROLLOUTS_PER_ORDER = 24
+SKIRMISH_BUDGET = 0.01
+# Pieces closer than this to an enemy piece are in contact.
+CONTACT_RANGE = 2
+ARTILLERY_RANGE = 3
+IRON_DOME_RADIUS = 3
+# A tile is worth this much material.
+TILE_VALUE = 4
+DEFAULT_PIECE_VALUE = 8
+
+OURS, THEIRS = 1, -1
+
+
+class Skirmish:
+    """A window of the board around a contact, in flat per-tile and per-piece lists.
+
+    Tiles are indexed `dx * side + dy` by their offset from the window's
+    corner, and pieces by their position in the lists.
+    """
+
+    def __init__(self, view: TurnView, center: Coordinates, radius: int = WINDOW_RADIUS):
+        self.radius = radius
+        self.side = side = 2 * radius + 1
+        self.corner = Coordinates(center.x - radius, center.y - radius)
+        # Tile index -> OURS, THEIRS, 0 when unclaimed, or None off the board.
+        self.owners: list[int | None] = [None] * (side * side)
+        self.piece_ids: list[str] = []
+        self.sides: list[int] = []
+        self.types: list[str] = []
+        self.positions: list[int] = []
+        self.defending: list[bool] = []
+        for dx in range(side):
+            for dy in range(side):
+                coords = Coordinates(self.corner.x + dx, self.corner.y + dy)
+                tile = view.tiles.get(coords)
+                if tile is None:
+                    continue
+                index = dx * side + dy
+                self.owners[index] = 0 if tile.country is None else OURS if tile.country == view.my_country else THEIRS
+                for piece in tile.pieces:
+                    ours = piece.country == view.my_country
+                    self.piece_ids.append(piece.id)
+                    self.sides.append(OURS if ours else THEIRS)
+                    self.types.append(piece.type)
+                    self.positions.append(index)
+                    # We cannot tell whether an enemy iron dome is on, so assume it is.
+                    self.defending.append(piece.type == 'irondome' and (not ours or piece.is_defending))
+        self.neighbours = [[] for _ in self.owners]
+        for index, owner in enumerate(self.owners):
+            if owner is None:
+                continue
+            dx, dy = divmod(index, side)
+            for nx, ny in ((dx - 1, dy), (dx + 1, dy), (dx, dy - 1), (dx, dy + 1)):
+                if 0 <= nx < side and 0 <= ny < side and self.owners[nx * side + ny] is not None:
+                    self.neighbours[index].append(nx * side + ny)
+
+    def index(self, coords: Coordinates) -> int | None:
+        dx, dy = coords.x - self.corner.x, coords.y - self.corner.y
+        if 0 <= dx < self.side and 0 <= dy < self.side and self.owners[dx * self.side + dy] is not None:
+            return dx * self.side + dy
+        return None
+
+    def coordinates(self, index: int) -> Coordinates:
+        dx, dy = divmod(index, self.side)
+        return Coordinates(self.corner.x + dx, self.corner.y + dy)
+
+    def distance(self, a: int, b: int) -> int:
+        ax, ay = divmod(a, self.side)
+        bx, by = divmod(b, self.side)
+        return abs(ax - bx) + abs(ay - by)
+
+    def step_towards(self, start: int, target: int) -> int:
+        if start == target:
+            return start
+        return min(self.neighbours[start], key=lambda index: self.distance(index, target))
+
+
+def in_contact(coords: Coordinates, enemy_tiles: set[Coordinates]) -> bool:
+    x, y = coords
+    return any((x + dx, y + dy) in enemy_tiles
+               for dx in range(-CONTACT_RANGE, CONTACT_RANGE + 1)
+               for dy in range(-(CONTACT_RANGE - abs(dx)), CONTACT_RANGE - abs(dx) + 1))
+
+
+def candidate_orders(skirmish: Skirmish, piece_id: str) -> list[tuple[str, int]]:
+    """The (order, tile index) pairs worth evaluating for our piece."""
+    piece = skirmish.piece_ids.index(piece_id)
+    position = skirmish.positions[piece]
+    piece_type = skirmish.types[piece]
+    enemy_tiles = {skirmish.positions[i] for i, side in enumerate(skirmish.sides) if side == THEIRS}
+    if piece_type == 'tank':
+        return [('attack', index) for index in sorted(enemy_tiles)
+                if skirmish.distance(position, index) <= CONTACT_RANGE]
+    if piece_type == 'antitank':
+        tank_tiles = {skirmish.positions[i] for i, side in enumerate(skirmish.sides)
+                      if side == THEIRS and skirmish.types[i] == 'tank'}
+        return [('hold', position)] + [('move', index) for index in sorted(tank_tiles)
+                                       if skirmish.distance(position, index) <= CONTACT_RANGE]
+    if piece_type == 'artillery':
+        return [('strike', index) for index in sorted(enemy_tiles)
+                if skirmish.distance(position, index) <= ARTILLERY_RANGE]
+    return []
+
+
+def evaluate(skirmish: Skirmish, piece_id: str, orders: list[tuple[str, int]], deadline: float,
+             seed: int = 0) -> dict[tuple[str, int], tuple[float, float]]:
+    """The average (material, territory) outcome of every order, for the orders that
+    got any rollouts before the deadline."""
+    rng = random.Random(seed)
+    piece = skirmish.piece_ids.index(piece_id)
+    totals = {order: [0, 0, 0] for order in orders}
+    for _ in range(ROLLOUTS_PER_ORDER):
+        for order in orders:
+            if time.perf_counter() > deadline:
+                break
+            material, territory = rollout(skirmish, piece, order, rng)
+            total = totals[order]
+            total[0] += material
+            total[1] += territory
+            total[2] += 1
+    return {order: (material / count, territory / count)
+            for order, (material, territory, count) in totals.items() if count}
+
+
+def rollout(skirmish: Skirmish, piece: int, order: tuple[str, int], rng: random.Random) -> tuple[int, int]:
+    """Plays the window forward once, and returns the material and the tiles we won."""
+    owners = skirmish.owners[:]
+    positions = skirmish.positions[:]
+    sides, types = skirmish.sides, skirmish.types
+    alive = [True] * len(positions)
+    neighbours = skirmish.neighbours
+    kind, target = order
+
+    for _ in range(ROLLOUT_TURNS):
+        attacks = []
+        for i, position in enumerate(positions):
+            if not alive[i]:
+                continue
+            piece_type = types[i]
+            if i == piece:
+                if kind == 'strike':
+                    attacks.append((i, target))
+                elif position != target:
+                    positions[i] = skirmish.step_towards(position, target)
+                elif kind == 'attack':
+                    attacks.append((i, position))
+            elif piece_type == 'tank':
+                if owners[position] != sides[i]:
+                    attacks.append((i, position))
+                elif rng.random() < 0.8:
+                    positions[i] = rng.choice(neighbours[position])
+            elif piece_type == 'antitank':
+                if rng.random() < 0.5:
+                    positions[i] = rng.choice(neighbours[position])
+            elif piece_type == 'artillery':
+                targets = [positions[j] for j in range(len(positions))
+                           if alive[j] and sides[j] != sides[i]
+                           and skirmish.distance(position, positions[j]) <= ARTILLERY_RANGE]
+                if targets and rng.random() < 0.7:
+                    attacks.append((i, rng.choice(targets)))
+
+        rng.shuffle(attacks)
+        for i, tile in attacks:
+            if not alive[i]:
+                continue
+            if types[i] == 'tank':
+                if any(alive[j] and positions[j] == tile and sides[j] != sides[i] and types[j] == 'antitank'
+                       for j in range(len(positions))):
+                    alive[i] = False
+                    continue
+                owners[tile] = sides[i]
+            for j, position in enumerate(positions):
+                if alive[j] and position == tile and sides[j] != sides[i] \
+                        and not _is_protected(skirmish, positions, alive, tile, sides[j]):
+                    alive[j] = False
+
+    material = 0
+    for i, is_alive in enumerate(alive):
+        if not is_alive:
+            material -= sides[i] * PRICE_PER_PIECE.get(types[i], DEFAULT_PIECE_VALUE)
+    territory = sum(owner for owner in owners if owner is not None) - \
+        sum(owner for owner in skirmish.owners if owner is not None)
+    return material, territory
+
+
+def _is_protected(skirmish: Skirmish, positions: list[int], alive: list[bool], tile: int, side: int) -> bool:
+    return any(alive[j] and skirmish.defending[j] and skirmish.sides[j] == side
+               and skirmish.distance(positions[j], tile) <= IRON_DOME_RADIUS
+               for j in range(len(positions)))
+
+
+def score(outcome: tuple[float, float]) -> float:
+    material, territory = outcome
+    return material + TILE_VALUE * territory
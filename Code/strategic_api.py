@@ -28,13 +28,27 @@ class CommandStatus:
     This field is meaningful only if `self.is_in_progress()` returns True.
     """
 
+    def __init__(self, command_id, elapsed_turns=None, estimated_turns=None, failed=None, success=None):
+        """Constructor.
+
+        Please don't use the constructor directly. Use `CommandStatus.failed`,
+        `CommandStstus.success` or `CommandStatus.in_progress` instead.
+        """
+        self.command_id = command_id
+        self.elapsed_turns = elapsed_turns
+        self.estimated_turns = estimated_turns
+        self._failed = failed
+        self._success = success
+
     @staticmethod
     def failed(command_id):
         """Creates a failed command status."""
+        return CommandStatus(command_id, failed=True)
 
     @staticmethod
     def success(command_id):
         """Creates a successful command status."""
+        return CommandStatus(command_id, success=True)
 
     @staticmethod
     def in_progress(command_id, elapsed_turns, estimated_turns):
@@ -44,12 +58,15 @@ class CommandStatus:
         `estimated_turns` is the estimated amount of turns required for completing
         the command execution (including `elapsed_turns`).
         """
+        return CommandStatus(command_id, elapsed_turns, estimated_turns)
 
     def is_success(self):
         """Returns True iff this command has succeeded."""
+        return bool(self._success)
 
     def is_failed(self):
         """Returns True iff this command has failed."""
+        return bool(self._failed)
 
     def is_in_progress(self):
         """Returns True iff this command is still in progress."""
@@ -59,6 +76,10 @@ class CommandStatus:
 class StrategicApi:
     context: TurnContext
 
+    def __init__(self, context):
+        """Constructor. context allows us to use the tactical API."""
+        self.context = context
+
     # ----------------------------------------------------------------------------
     # Attacking military commands.
     # ----------------------------------------------------------------------------
@@ -0,0 +1,179 @@
+"""Board tables that only depend on the board size.
+
+The neighbours of every tile, the ring of tiles at every radius up to
+MAX_RING_RADIUS around every tile, and the diamond bitboards of the radii the
+planners use, are the same for every game played on a board of the same size.
+Every table is a section of its own: it is only built the first time it is
+used on a board size, which takes a few milliseconds, and is then written to a
+file in CACHE_DIRECTORY. The file is memory-mapped rather than read, so later
+games on a board of the same size get the section without computing anything,
+and without copying it either.
+
+A section file starts with a header holding its format version, its board
+size and the length of the section. Files of another version or size, and
+truncated files, are rebuilt. When the cache cannot be written, sections are
+kept in memory for the rest of the process.
+
+Tiles are identified by tile IDs (`x * height + y`); diamonds use the bit
+layout of `bitboard.Geometry`.
+"""
+from array import array
+import mmap
+import os
+import struct
+import tempfile
+
+from common_types import Coordinates
+
+VERSION = 2
+MAGIC = b'PWTB'
+MAX_RING_RADIUS = 8
+DIAMOND_RADII = (2, 3, 4, 6)
+# Diamonds take a bitboard per tile, so they are only kept for boards up to this many tiles.
+MAX_DIAMOND_TILES = 64 * 64
+CACHE_DIRECTORY = os.environ.get('PYWAR_TABLE_CACHE', os.path.join(tempfile.gettempdir(), 'pywar-tables'))
+
+_HEADER = struct.Struct('<4sIIIQ')
+
+# (width, height) -> the tables of that board size, for this process.
+_loaded: dict[tuple[int, int], 'BoardTables'] = {}
+
+
+class BoardTables:
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self._diamond_size = _bitboard_size(width, height)
+        # Section name -> its contents, as loaded or built on first use.
+        self._sections: dict[str, memoryview] = {}
+        # Tile ID -> its 4 neighbours, -1 past the edge of the board.
+        self._neighbours: memoryview = None
+        # Radius -> (tile ID -> the range of its ring in the IDs, ring tile IDs).
+        self._rings: dict[int, tuple[memoryview, memoryview]] = {}
+
+    def _section(self, name: str, build) -> memoryview:
+        section = self._sections.get(name)
+        if section is None:
+            section = self._sections[name] = _load(self.width, self.height, name, build)
+        return section
+
+    def neighbours(self, tile_id: int) -> list[int]:
+        if self._neighbours is None:
+            self._neighbours = self._section('neighbours', _build_neighbours).cast('i')
+        return [neighbour for neighbour in self._neighbours[4 * tile_id:4 * tile_id + 4] if neighbour >= 0]
+
+    def ring(self, coords: Coordinates, radius: int) -> list[Coordinates] | None:
+        """The tiles at exactly `radius` from coords, or None past MAX_RING_RADIUS."""
+        if not 0 < radius <= MAX_RING_RADIUS:
+            return None
+        ring = self._rings.get(radius)
+        if ring is None:
+            section = self._section(f'ring{radius}', lambda width, height: _build_ring(width, height, radius)).cast('i')
+            tiles = self.width * self.height
+            ring = self._rings[radius] = (section[:tiles + 1], section[tiles + 1:])
+        offsets, tile_ids = ring
+        tile_id = coords[0] * self.height + coords[1]
+        height = self.height
+        return [Coordinates(*divmod(ring_tile_id, height))
+                for ring_tile_id in tile_ids[offsets[tile_id]:offsets[tile_id + 1]]]
+
+    def diamond(self, coords: Coordinates, radius: int) -> int | None:
+        """The bitboard of the tiles up to `radius` from coords, or None for radii that are not kept."""
+        if radius not in DIAMOND_RADII or self.width * self.height > MAX_DIAMOND_TILES:
+            return None
+        diamonds = self._section(f'diamond{radius}', lambda width, height: _build_diamonds(width, height, radius))
+        start = (coords[0] * self.height + coords[1]) * self._diamond_size
+        return int.from_bytes(diamonds[start:start + self._diamond_size], 'little')
+
+
+def get(width: int, height: int) -> BoardTables:
+    """The tables of the board size. Their sections are loaded or built when first used."""
+    tables = _loaded.get((width, height))
+    if tables is None:
+        tables = _loaded[(width, height)] = BoardTables(width, height)
+    return tables
+
+
+def _load(width: int, height: int, name: str, build) -> memoryview:
+    """The section, from the disk cache, or built now and written there."""
+    path = os.path.join(CACHE_DIRECTORY, f'{width}x{height}.v{VERSION}.{name}.tables')
+    try:
+        with open(path, 'rb') as table_file:
+            buffer = mmap.mmap(table_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if _is_complete(buffer, width, height):
+            return memoryview(buffer)[_HEADER.size:]
+        buffer.close()
+    except (OSError, ValueError):
+        pass
+
+    section = build(width, height)
+    data = _HEADER.pack(MAGIC, VERSION, width, height, len(section)) + section
+    temporary = None
+    try:
+        os.makedirs(CACHE_DIRECTORY, exist_ok=True)
+        # Written aside and renamed, so a game never maps a half-written file.
+        descriptor, temporary = tempfile.mkstemp(dir=CACHE_DIRECTORY)
+        with os.fdopen(descriptor, 'wb') as table_file:
+            table_file.write(data)
+        os.replace(temporary, path)
+    except OSError:
+        if temporary is not None:
+            try:
+                os.remove(temporary)
+            except OSError:
+                pass
+    return memoryview(data)[_HEADER.size:]
+
+
+def _is_complete(buffer, width: int, height: int) -> bool:
+    """Whether the buffer is a whole section file of this version and board size."""
+    if len(buffer) < _HEADER.size:
+        return False
+    magic, version, file_width, file_height, length = _HEADER.unpack_from(buffer)
+    return (magic, version, file_width, file_height) == (MAGIC, VERSION, width, height) \
+        and len(buffer) == _HEADER.size + length
+
+
+def _build_neighbours(width: int, height: int) -> bytes:
+    neighbours = array('i')
+    for x in range(width):
+        for y in range(height):
+            for nx, ny in ((x - 1, y), (x, y - 1), (x + 1, y), (x, y + 1)):
+                neighbours.append(nx * height + ny if 0 <= nx < width and 0 <= ny < height else -1)
+    return neighbours.tobytes()
+
+
+def _build_ring(width: int, height: int, radius: int) -> bytes:
+    """The ring offsets of every tile, followed by the tile IDs of the rings."""
+    offsets = array('i', [0])
+    tile_ids = array('i')
+    for x in range(width):
+        for y in range(height):
+            for dx in range(max(-radius, -x), min(radius, width - 1 - x) + 1):
+                dy = radius - abs(dx)
+                if 0 <= y - dy < height:
+                    tile_ids.append((x + dx) * height + y - dy)
+                if dy and y + dy < height:
+                    tile_ids.append((x + dx) * height + y + dy)
+            offsets.append(len(tile_ids))
+    return offsets.tobytes() + tile_ids.tobytes()
+
+
+def _build_diamonds(width: int, height: int, radius: int) -> bytes:
+    """The diamond bitboard of every tile, each made of one run of bits per column."""
+    stride = height + 1
+    size = _bitboard_size(width, height)
+    diamonds = bytearray()
+    for x in range(width):
+        for y in range(height):
+            diamond = 0
+            for column in range(max(0, x - radius), min(width - 1, x + radius) + 1):
+                reach = radius - abs(column - x)
+                bottom, top = max(0, y - reach), min(height - 1, y + reach)
+                diamond |= ((1 << (top - bottom + 1)) - 1) << (column * stride + bottom)
+            diamonds += diamond.to_bytes(size, 'little')
+    return bytes(diamonds)
+
+
+def _bitboard_size(width: int, height: int) -> int:
+    return (width * (height + 1) + 7) // 8
@@ -0,0 +1,82 @@
+"""Per-turn telemetry of a game.
+
+Telemetry is off unless the PYWAR_TELEMETRY environment variable names a
+directory. When on, every turn becomes one row of counters, kept column by
+column in arrays, and the whole table is written there as a CSV file when the
+game ends: `game_state.end_game` closes the telemetry of the game. When off,
+every call is a no-op.
+"""
+from array import array
+import csv
+import itertools
+import os
+import os.path
+
+TELEMETRY_DIRECTORY_VARIABLE = 'PYWAR_TELEMETRY'
+COMMAND_TYPES = ('attack', 'defend', 'escort', 'build')
+COLUMNS = (('turn', 'orders')
+           + tuple(f'{command_type}_{outcome}' for command_type in COMMAND_TYPES for outcome in ('succeeded', 'failed'))
+           + ('money_collected', 'pieces_built', 'tactical_cpu_us', 'strategic_cpu_us'))
+
+_telemetry_ids = itertools.count()
+
+
+class Telemetry:
+    enabled = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self.columns = {name: array('q') for name in COLUMNS}
+        self.row = None
+
+    def begin_turn(self):
+        if self.row is not None:
+            self.end_turn()
+        self.row = dict.fromkeys(COLUMNS, 0)
+        self.row['turn'] = len(self.columns['turn'])
+
+    def end_turn(self):
+        for name, column in self.columns.items():
+            column.append(self.row[name])
+        self.row = None
+
+    def count(self, column: str, amount: int = 1):
+        if self.row is not None:
+            self.row[column] += amount
+
+    def dump(self):
+        if self.row is not None:
+            self.end_turn()
+        with open(self.path, 'w', newline='') as telemetry_file:
+            writer = csv.writer(telemetry_file)
+            writer.writerow(COLUMNS)
+            writer.writerows(zip(*(self.columns[name] for name in COLUMNS)))
+
+    def close(self):
+        self.dump()
+
+
+class DisabledTelemetry:
+    enabled = False
+
+    def begin_turn(self):
+        pass
+
+    def end_turn(self):
+        pass
+
+    def count(self, column: str, amount: int = 1):
+        pass
+
+    def dump(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def create():
+    directory = os.environ.get(TELEMETRY_DIRECTORY_VARIABLE)
+    if not directory:
+        return DisabledTelemetry()
+    return Telemetry(os.path.join(directory, f'telemetry-{os.getpid()}-{next(_telemetry_ids)}.csv'))
@@ -0,0 +1,153 @@
+"""Enemy pieces followed across turns.
+
+Every enemy piece we have seen gets a track: a slot in a few parallel arrays
+holding where it was last seen, when, and how fast it has been moving. A new
+sighting of a piece ID updates its track. When a piece shows up further from
+its predicted position than it could have moved, its motion is started over
+rather than averaged with a jump. Tracks of pieces that have not been seen for
+LOST_AFTER turns are closed, and their slots reused.
+
+Predictions extrapolate the smoothed velocity, so the antitanks can head to
+where an enemy tank is going to be, and the airplanes to where their targets
+move.
+"""
+from array import array
+
+from common_types import Coordinates, distance
+from turn_view import TurnView
+
+# Weight of the latest move in the velocity estimate.
+VELOCITY_SMOOTHING = 0.5
+LOST_AFTER = 8
+# How far a sighting may be from its prediction, beyond the piece's speed.
+GATE_SLACK = 1
+SPEEDS = {'airplane': 8, 'helicopter': 4, 'bunker': 0, 'tower': 0}
+GROUND_TYPES = frozenset(('tank', 'antitank', 'artillery', 'builder', 'irondome', 'spy'))
+
+
+class EnemyTracker:
+    def __init__(self):
+        self.turn = 0
+        self.size = None
+        # Piece ID -> its slot in the arrays.
+        self.slots: dict[str, int] = {}
+        self.ids: list[str | None] = []
+        self.types: list[str | None] = []
+        self._free: list[int] = []
+        self.x = array('d')
+        self.y = array('d')
+        self.vx = array('d')
+        self.vy = array('d')
+        self.last_seen = array('l')
+
+    def update(self, view: TurnView):
+        size = (view.game_width, view.game_height)
+        if size != self.size:
+            self.__init__()
+            self.size = size
+        self.turn += 1
+        turn = self.turn
+        x, y, vx, vy, last_seen = self.x, self.y, self.vx, self.vy, self.last_seen
+        for piece in view.enemy_pieces:
+            seen_x, seen_y = piece.tile.coordinates
+            slot = self.slots.get(piece.id)
+            if slot is None:
+                slot = self._open(piece.id, piece.type)
+            else:
+                elapsed = turn - last_seen[slot]
+                predicted_x, predicted_y = x[slot] + vx[slot] * elapsed, y[slot] + vy[slot] * elapsed
+                if abs(seen_x - predicted_x) + abs(seen_y - predicted_y) > \
+                        SPEEDS.get(piece.type, 1) * elapsed + GATE_SLACK:
+                    vx[slot] = vy[slot] = 0.0
+                else:
+                    vx[slot] += VELOCITY_SMOOTHING * ((seen_x - x[slot]) / elapsed - vx[slot])
+                    vy[slot] += VELOCITY_SMOOTHING * ((seen_y - y[slot]) / elapsed - vy[slot])
+            x[slot], y[slot] = seen_x, seen_y
+            last_seen[slot] = turn
+
+        for piece_id, slot in list(self.slots.items()):
+            if turn - last_seen[slot] > LOST_AFTER:
+                self._close(piece_id)
+
+    def _open(self, piece_id: str, piece_type: str) -> int:
+        if self._free:
+            slot = self._free.pop()
+            self.ids[slot] = piece_id
+            self.types[slot] = piece_type
+            self.x[slot] = self.y[slot] = self.vx[slot] = self.vy[slot] = 0.0
+        else:
+            slot = len(self.ids)
+            self.ids.append(piece_id)
+            self.types.append(piece_type)
+            for values in (self.x, self.y, self.vx, self.vy):
+                values.append(0.0)
+            self.last_seen.append(0)
+        self.slots[piece_id] = slot
+        return slot
+
+    def _close(self, piece_id: str):
+        slot = self.slots.pop(piece_id)
+        self.ids[slot] = self.types[slot] = None
+        self._free.append(slot)
+
+    def is_visible(self, piece_id: str) -> bool:
+        slot = self.slots.get(piece_id)
+        return slot is not None and self.last_seen[slot] == self.turn
+
+    def predict(self, piece_id: str, turns: int = 1) -> Coordinates | None:
+        """Where the piece is expected to be the given number of turns from now."""
+        slot = self.slots.get(piece_id)
+        if slot is None:
+            return None
+        return self._predict(slot, turns)
+
+    def _predict(self, slot: int, turns: int) -> Coordinates:
+        elapsed = self.turn - self.last_seen[slot] + turns
+        width, height = self.size
+        x = min(max(round(self.x[slot] + self.vx[slot] * elapsed), 0), width - 1)
+        y = min(max(round(self.y[slot] + self.vy[slot] * elapsed), 0), height - 1)
+        return Coordinates(x, y)
+
+    def intercept(self, piece_id: str, start: Coordinates, horizon: int = 8) -> Coordinates | None:
+        """The first predicted position of the piece that a ground piece at start can reach in time."""
+        slot = self.slots.get(piece_id)
+        if slot is None:
+            return None
+        for turns in range(1, horizon + 1):
+            predicted = self._predict(slot, turns)
+            if distance(start, predicted) <= turns:
+                return predicted
+        return self._predict(slot, horizon)
+
+    def find(self, coords: Coordinates, piece_type: str) -> str | None:
+        """The ID of a visible enemy piece of the given type on the tile."""
+        x, y = coords
+        for piece_id, slot in self.slots.items():
+            if self.types[slot] == piece_type and self.last_seen[slot] == self.turn \
+                    and self.x[slot] == x and self.y[slot] == y:
+                return piece_id
+        return None
+
+    def nearest(self, coords: Coordinates, reach: int, turns: int = 1, types=GROUND_TYPES) -> Coordinates | None:
+        """The predicted position of the closest visible enemy piece within reach."""
+        best, best_distance = None, reach + 1
+        for slot, piece_type in enumerate(self.types):
+            if piece_type not in types or self.last_seen[slot] != self.turn:
+                continue
+            predicted = self._predict(slot, turns)
+            predicted_distance = distance(coords, predicted)
+            if predicted_distance < best_distance:
+                best, best_distance = predicted, predicted_distance
+        return best
+
+    def occupancy(self, turns: int, types=GROUND_TYPES) -> array:
+        """How many tracked enemy pieces are predicted on every tile ID, the given number of turns from now."""
+        width, height = self.size
+        counts = array('B', bytes(width * height))
+        for slot, piece_type in enumerate(self.types):
+            if piece_type in types:
+                x, y = self._predict(slot, turns)
+                tile_id = x * height + y
+                if counts[tile_id] < 255:
+                    counts[tile_id] += 1
+        return counts
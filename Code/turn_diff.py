@@ -0,0 +1,139 @@
+"""What changed on the board since the previous turn.
+
+`BoardDiffer` remembers the owners, the money and the pieces it saw last turn,
+and turns every new turn into a `TurnDiff`. Owner changes come from set
+differences of the countries' territories. Money is re-read every turn on our
+tiles, under pieces and on tiles that changed owner, so the money changes of
+those tiles are always in the diff. Money elsewhere, such as that of enemy
+tiles coming into or out of sight, is only re-read every FULL_SCAN_INTERVAL
+turns, so its changes may reach the diff up to FULL_SCAN_INTERVAL - 1 turns
+late.
+
+The differ also keeps two views up to date from the diffs: our border tiles
+and the money on our tiles, which is exact every turn.
+"""
+from common_types import Coordinates
+from tactical_api import TurnContext
+from board import get_neighbours
+
+FULL_SCAN_INTERVAL = 16
+
+
+class TurnDiff:
+    def __init__(self):
+        # Coordinates -> (previous owner, owner).
+        self.owners: dict[Coordinates, tuple[str | None, str | None]] = {}
+        # Coordinates -> (previous money, money), None meaning unknown. Exact
+        # for our tiles, tiles with pieces and tiles that changed owner; see
+        # the module docstring for the rest.
+        self.money: dict[Coordinates, tuple[int | None, int | None]] = {}
+        self.appeared: list[str] = []
+        # Piece ID -> (previous coordinates, coordinates).
+        self.moved: dict[str, tuple[Coordinates, Coordinates]] = {}
+        # Piece ID -> (coordinates, country, type) when it was last seen.
+        self.vanished: dict[str, tuple[Coordinates, str, str]] = {}
+
+    def __bool__(self):
+        return bool(self.owners or self.money or self.appeared or self.moved or self.vanished)
+
+
+class BoardDiffer:
+    def __init__(self):
+        self.turn = 0
+        self.territories: dict[str | None, set[Coordinates]] = {}
+        self.money: dict[Coordinates, int | None] = {}
+        # Piece ID -> (coordinates, country, type).
+        self.pieces: dict[str, tuple[Coordinates, str, str]] = {}
+        self.my_country = None
+        self.border: set[Coordinates] = set()
+        self.our_money = 0
+        self.size = None
+
+    def update(self, context: TurnContext) -> TurnDiff:
+        diff = TurnDiff()
+        full_scan = (self.size != (context.game_width, context.game_height)
+                     or self.my_country != context.my_country or self.turn % FULL_SCAN_INTERVAL == 0)
+        if full_scan:
+            self._reset(context)
+        self.turn += 1
+
+        territories = {country: set(context.get_tiles_of_country(country)) for country in context.all_countries}
+        lost, gained = {}, {}
+        for country, tiles in territories.items():
+            previous = self.territories.get(country, set())
+            lost.update(dict.fromkeys(previous - tiles, country))
+            gained.update(dict.fromkeys(tiles - previous, country))
+        for coords in lost.keys() | gained.keys():
+            diff.owners[coords] = (lost.get(coords), gained.get(coords))
+        self.territories = territories
+
+        pieces = {}
+        for piece_id, piece in context.all_pieces.items():
+            coords = piece.tile.coordinates
+            pieces[piece_id] = (coords, piece.country, piece.type)
+            previous = self.pieces.get(piece_id)
+            if previous is None:
+                diff.appeared.append(piece_id)
+            elif previous[0] != coords:
+                diff.moved[piece_id] = (previous[0], coords)
+        for piece_id, previous in self.pieces.items():
+            if piece_id not in pieces:
+                diff.vanished[piece_id] = previous
+
+        if full_scan:
+            candidates = context.tiles.keys()
+        else:
+            candidates = set(diff.owners)
+            candidates.update(territories.get(context.my_country, ()))
+            candidates.update(coords for coords, _, _ in pieces.values())
+            candidates.update(coords for coords, _, _ in self.pieces.values())
+        for coords in candidates:
+            money = context.tiles[coords].money
+            previous = self.money.get(coords)
+            if money != previous:
+                diff.money[coords] = (previous, money)
+                self.money[coords] = money
+        self.pieces = pieces
+
+        self._update_our_money(diff, full_scan)
+        self._update_border(context, diff, full_scan)
+        return diff
+
+    def _reset(self, context: TurnContext):
+        self.size = (context.game_width, context.game_height)
+        self.my_country = context.my_country
+        if self.turn == 0 or self.territories.keys() != set(context.all_countries):
+            self.territories = {}
+            self.money = {}
+            self.pieces = {}
+
+    def _update_our_money(self, diff: TurnDiff, full_scan: bool):
+        our_tiles = self.territories.get(self.my_country, set())
+        if full_scan:
+            self.our_money = sum(self.money.get(coords) or 0 for coords in our_tiles)
+            return
+        for coords, (old_owner, new_owner) in diff.owners.items():
+            money = self.money.get(coords) or 0
+            if old_owner == self.my_country:
+                self.our_money -= diff.money.get(coords, (money, None))[0] or 0
+            if new_owner == self.my_country:
+                self.our_money += money
+        for coords, (previous, money) in diff.money.items():
+            if coords in our_tiles and coords not in diff.owners:
+                self.our_money += (money or 0) - (previous or 0)
+
+    def _update_border(self, context: TurnContext, diff: TurnDiff, full_scan: bool):
+        our_tiles = self.territories.get(self.my_country, set())
+        if full_scan:
+            dirty = our_tiles
+            self.border = set()
+        else:
+            dirty = set()
+            for coords in diff.owners:
+                dirty.add(coords)
+                dirty.update(get_neighbours(context, coords))
+        for coords in dirty:
+            if coords in our_tiles and any(neighbour not in our_tiles for neighbour in get_neighbours(context, coords)):
+                self.border.add(coords)
+            else:
+                self.border.discard(coords)
@@ -0,0 +1,121 @@
+"""Views derived from a TurnContext, shared by everything that looks at a turn.
+
+A TurnView stands in for the TurnContext of a single turn. Each view, such as
+our tiles or the pieces on every tile, is computed on its first use and kept
+for the rest of the turn, so helpers that need the same view share it instead
+of deriving it again. The views must not be modified.
+"""
+from functools import cached_property
+
+from common_types import Coordinates
+from tactical_api import BasePiece, TurnContext
+from board import get_border_tiles, get_neighbours
+import bitboard
+
+
+class TurnView:
+    def __init__(self, context: TurnContext):
+        self.context = context
+        # Bitboards of the turn's territories, the diff from the previous turn
+        # and the connected regions of our territory, set by whoever made the
+        # view when it keeps them.
+        self.territories: bitboard.Territories = None
+        self.diff = None
+        self.regions = None
+        # The fields every helper reads, copied so they do not go through __getattr__.
+        self.tiles = context.tiles
+        self.my_pieces = context.my_pieces
+        self.all_pieces = context.all_pieces
+        self.my_country = context.my_country
+        self.all_countries = context.all_countries
+        self.game_width = context.game_width
+        self.game_height = context.game_height
+        self._tiles_of_country: dict[str, set[Coordinates]] = {}
+
+    def __getattr__(self, name):
+        # Everything that is not a view comes from the TurnContext itself.
+        return getattr(self.context, name)
+
+    def get_tiles_of_country(self, country_name) -> set[Coordinates]:
+        tiles = self._tiles_of_country.get(country_name)
+        if tiles is None:
+            tiles = self._tiles_of_country[country_name] = self.context.get_tiles_of_country(country_name)
+        return tiles
+
+    @cached_property
+    def our_tiles(self) -> set[Coordinates]:
+        return self.get_tiles_of_country(self.context.my_country)
+
+    @cached_property
+    def enemy_tiles(self) -> set[Coordinates]:
+        tiles = set()
+        for country in self.context.all_countries:
+            if country != self.context.my_country:
+                tiles |= self.get_tiles_of_country(country)
+        return tiles
+
+    @cached_property
+    def border_tiles(self) -> set[Coordinates]:
+        """Our tiles that touch a tile we do not own."""
+        return set(get_border_tiles(self))
+
+    @cached_property
+    def frontier_tiles(self) -> set[Coordinates]:
+        """Our tiles that touch unclaimed land."""
+        if self.territories is not None:
+            territories = self.territories
+            return set(territories.geometry.tiles(territories.our & territories.expand(territories.unclaimed)))
+        return {coords for coords in self.border_tiles
+                if any(self.context.tiles[neighbour].country is None for neighbour in get_neighbours(self.context, coords))}
+
+    @cached_property
+    def unknown_tiles(self) -> set[Coordinates]:
+        """Tiles whose money we do not know."""
+        return {coords for coords, tile in self.context.tiles.items() if tile.money is None}
+
+    @cached_property
+    def pieces_by_type(self) -> dict[str, list[BasePiece]]:
+        """Our pieces by their type."""
+        pieces = {}
+        for piece in self.context.my_pieces.values():
+            pieces.setdefault(piece.type, []).append(piece)
+        return pieces
+
+    @cached_property
+    def enemy_pieces(self) -> list[BasePiece]:
+        return [piece for piece in self.context.all_pieces.values() if piece.country != self.context.my_country]
+
+    @cached_property
+    def enemy_pieces_by_type(self) -> dict[str, list[BasePiece]]:
+        pieces = {}
+        for piece in self.enemy_pieces:
+            pieces.setdefault(piece.type, []).append(piece)
+        return pieces
+
+    @cached_property
+    def pieces_by_tile(self) -> dict[Coordinates, list[BasePiece]]:
+        """All the pieces we know of, by the coordinates of their tile."""
+        pieces = {}
+        for piece in self.context.all_pieces.values():
+            pieces.setdefault(piece.tile.coordinates, []).append(piece)
+        return pieces
+
+    @cached_property
+    def territory_center(self) -> Coordinates:
+        """The mass center of our tiles, or the middle of the board if we have none.
+
+        When our territory is split into regions, this is the center of the
+        largest one, so that it never lies in enemy land.
+        """
+        if self.regions is not None and self.regions.largest is not None:
+            return self.regions.largest.center()
+        if self.territories is not None:
+            center = self.territories.geometry.centroid(self.territories.our)
+            if center is not None:
+                return center
+        our_tiles = self.our_tiles
+        if not our_tiles:
+            return Coordinates(self.context.game_width // 2, self.context.game_height // 2)
+        return Coordinates(sum(x for x, _ in our_tiles) // len(our_tiles),
+                           sum(y for _, y in our_tiles) // len(our_tiles))
+
@@ -0,0 +1,149 @@
+"""Where to put towers, satellites and spies.
+
+Every sensor type sees the tiles up to its SIGHT_RADIUS away. Its sighting
+mask around a tile is a bitboard, computed once per tile and type and kept for
+the whole game. The planner keeps the tiles whose money we cannot see as a
+bitboard, and per tile ID the turn on which each of them went out of sight, so
+the staleness of a tile is the number of turns since we last saw it. Both are
+updated from the money changes of the turn diff. The diff only re-reads the
+money of most tiles every few turns, so the tiles our sensors see this turn or
+saw last turn are re-read every turn.
+
+Once per turn the unknown tiles are split into weighted layers: every unknown
+tile is worth something, and more the longer it has been unknown and when an
+enemy owns it. The value of a sensor position is then a few popcounts of its
+mask against the layers, and sensors are compared by the value they reveal per
+unit of money.
+"""
+from array import array
+
+from common_types import Coordinates, distance
+from estimates import PRICE_PER_PIECE
+from turn_view import TurnView
+import tables
+
+SIGHT_RADIUS = {'tower': 4, 'satellite': 6, 'spy': 2}
+MOBILE_SENSORS = ('satellite', 'spy')
+# How far from where it is built a mobile sensor is expected to go.
+MOBILE_REACH = 6
+# Unknown tiles are worth one more for every threshold their staleness reaches.
+STALENESS_THRESHOLDS = (0, 5, 20)
+ENEMY_TILE_WEIGHT = 2
+# Sensors are only built while we have fewer than this, and when they reveal
+# at least this much value per unit of money.
+MAX_SENSORS = 3
+MIN_VALUE_PER_MONEY = 1.0
+
+
+class VisionPlanner:
+    def __init__(self):
+        self.size = None
+        self.geometry = None
+        self._masks: dict[tuple[str, Coordinates], int] = {}
+        self.unknown = 0
+        # Tile ID -> the turn on which the tile went out of sight.
+        self.unseen_since = array('l')
+        # The tiles our sensors saw last turn.
+        self.sighted = 0
+        self.turn = 0
+        self._layers: list[tuple[int, int]] = []
+
+    def mask(self, sensor_type: str, coords: Coordinates) -> int:
+        key = (sensor_type, coords)
+        mask = self._masks.get(key)
+        if mask is None:
+            mask = tables.get(*self.size).diamond(coords, SIGHT_RADIUS[sensor_type])
+            if mask is None:
+                mask = self.geometry.bit(coords)
+                for _ in range(SIGHT_RADIUS[sensor_type]):
+                    mask |= self.geometry.expand(mask)
+            self._masks[key] = mask
+        return mask
+
+    def update(self, view: TurnView):
+        self.turn += 1
+        geometry = view.territories.geometry
+        height = view.game_height
+        diff = view.diff
+        if self.size != (view.game_width, view.game_height):
+            self.size = (view.game_width, view.game_height)
+            self._masks = {}
+            diff = None
+        self.geometry = geometry
+
+        if diff is None:
+            self.unknown = geometry.from_tiles(coords for coords, tile in view.tiles.items() if tile.money is None)
+            self.unseen_since = array('l', bytes(8 * view.game_width * height))
+            self.sighted = 0
+        else:
+            for coords, (previous, money) in diff.money.items():
+                self._see(coords, money is not None)
+
+        sighted = self.coverage((sensor_type, sensor.tile.coordinates)
+                                for sensor_type in SIGHT_RADIUS for sensor in view.pieces_by_type.get(sensor_type, ()))
+        for coords in geometry.tiles(sighted | self.sighted):
+            self._see(coords, view.tiles[coords].money is not None)
+        self.sighted = sighted
+
+        # The layers of the turn, in a single pass over the unknown tiles.
+        stride = geometry.stride
+        layers = [0] * len(STALENESS_THRESHOLDS)
+        for coords in geometry.tiles(self.unknown):
+            staleness = self.turn - self.unseen_since[coords[0] * height + coords[1]]
+            for i, threshold in enumerate(STALENESS_THRESHOLDS):
+                if staleness >= threshold:
+                    layers[i] |= 1 << (coords[0] * stride + coords[1])
+        self._layers = [(1, layer) for layer in layers]
+        self._layers.append((ENEMY_TILE_WEIGHT, self.unknown & view.territories.enemy))
+
+    def _see(self, coords: Coordinates, known: bool):
+        bit = self.geometry.bit(coords)
+        if known:
+            self.unknown &= ~bit
+        elif not self.unknown & bit:
+            self.unknown |= bit
+            self.unseen_since[coords[0] * self.size[1] + coords[1]] = self.turn
+
+    def staleness(self, coords: Coordinates) -> int:
+        if not self.unknown & self.geometry.bit(coords):
+            return 0
+        return self.turn - self.unseen_since[coords[0] * self.size[1] + coords[1]]
+
+    def value(self, mask: int) -> int:
+        return sum(weight * (mask & layer).bit_count() for weight, layer in self._layers)
+
+    def best_position(self, sensor_type: str, start: Coordinates, reach: int, covered: int = 0) -> tuple[int, Coordinates]:
+        """The most valuable position within reach, on every other tile of a diamond around start."""
+        width, height = self.size
+        best_value, best = -1, start
+        for dx in range(-reach, reach + 1):
+            for dy in range(-(reach - abs(dx)), reach - abs(dx) + 1, 2):
+                x, y = start[0] + dx, start[1] + dy
+                if not (0 <= x < width and 0 <= y < height):
+                    continue
+                coords = Coordinates(x, y)
+                value = self.value(self.mask(sensor_type, coords) & ~covered)
+                if value > best_value or (value == best_value and distance(start, coords) < distance(start, best)):
+                    best_value, best = value, coords
+        return best_value, best
+
+    def best_build(self, builder_tiles: list[Coordinates], covered: int = 0) -> tuple[float, str, int] | None:
+        """(value per money, sensor type, builder index) of the best sensor to build."""
+        best = None
+        for i, coords in enumerate(builder_tiles):
+            for sensor_type in SIGHT_RADIUS:
+                if sensor_type in MOBILE_SENSORS:
+                    value, _ = self.best_position(sensor_type, coords, MOBILE_REACH, covered)
+                else:
+                    value = self.value(self.mask(sensor_type, coords) & ~covered)
+                candidate = (value / PRICE_PER_PIECE[sensor_type], sensor_type, i)
+                if best is None or candidate[0] > best[0]:
+                    best = candidate
+        return best
+
+    def coverage(self, sensors) -> int:
+        """The tiles the given (sensor type, coordinates) pairs see."""
+        covered = 0
+        for sensor_type, coords in sensors:
+            covered |= self.mask(sensor_type, coords)
+        return covered
@@ -0,0 +1,336 @@
+"""A local stand-in for the PyWar game server.
+
+The engine implements the `TurnContext` interface of `tactical_api` and a
+simplified version of the game rules, which is enough for comparing strategies
+against each other without the server. It is not the real game: pieces fight
+by the simple rules below, and every tile that is not owned by an enemy is
+visible.
+
+Like the server, the engine imports every strategy module once per process,
+so players of the same modules share their module globals: in this game, and
+in every other game played by the process. The strategy modules keep what
+they remember about a game in `game_state`, keyed by the game ID, our country
+and the game settings, which is what keeps the players and the games apart.
+"""
+import importlib
+import itertools
+import os
+import os.path
+import random
+import sys
+import traceback
+
+CODE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Code')
+if CODE_DIRECTORY not in sys.path:
+    sys.path.insert(0, CODE_DIRECTORY)
+
+import tactical_api
+from common_types import Coordinates, distance
+
+PRICE_PER_PIECE = {
+    'tank': 8, 'builder': 20, 'artillery': 8, 'antitank': 10, 'irondome': 32, 'airplane': 20,
+    'satellite': 64, 'helicopter': 20, 'bunker': 10, 'spy': 20, 'tower': 16,
+}
+BUILD_METHOD_TO_TYPE = {
+    'build_tank': 'tank', 'build_airplane': 'airplane', 'build_artillery': 'artillery',
+    'build_helicopter': 'helicopter', 'build_antitank': 'antitank', 'build_iron_dome': 'irondome',
+    'build_bunker': 'bunker', 'build_spy': 'spy', 'build_tower': 'tower', 'build_satellite': 'satellite',
+    'build_builder': 'builder',
+}
+MAX_TILE_MONEY = 40
+START_BUILDER_MONEY = 30
+START_TERRITORY_RADIUS = 1
+ARTILLERY_RANGE = 3
+HELICOPTER_RANGE = 1
+IRON_DOME_RADIUS = 3
+AIRPLANE_SPEED = 8
+HELICOPTER_SPEED = 2
+AIRPLANE_AIR_TIME = 16
+
+_game_ids = itertools.count()
+
+
+class _EnginePiece:
+    """Records the commands given to a piece, to be resolved after the turn."""
+
+    def _order(self, *command):
+        self._game.orders.append((self, command))
+
+    def move(self, destination):
+        self._order('move', Coordinates(*getattr(destination, 'coordinates', destination)))
+
+    def attack(self, destination=None):
+        if destination is not None:
+            destination = Coordinates(*getattr(destination, 'coordinates', destination))
+        self._order('attack', destination)
+
+    def take_off(self):
+        if not self.in_air:
+            self.in_air, self.time_in_air = True, 0
+
+    def land(self):
+        self.in_air, self.time_in_air = False, None
+
+    def turn_on_protection(self):
+        self.is_defending = True
+
+    def turn_off_protection(self):
+        self.is_defending = False
+
+    def collect_money(self, amount: int):
+        self._order('collect', amount)
+
+    def throw_money(self, amount: int):
+        self._order('throw', amount)
+
+
+for _method, _piece_type in BUILD_METHOD_TO_TYPE.items():
+    setattr(_EnginePiece, _method, lambda self, piece_type=_piece_type: self._order('build', piece_type))
+
+PIECE_CLASSES = {piece_type: type(cls.__name__, (_EnginePiece, cls), {})
+                 for piece_type, cls in tactical_api.TYPE_TO_CLASS.items()}
+
+
+class LocalTurnContext(tactical_api.TurnContext):
+    def __init__(self, game: 'LocalGame', country: str):
+        self._game = game
+        # Tells the games of a process apart, for the per-game state of the strategy modules.
+        self.game_id = game.id
+        self.tiles = game.views[country]
+        self.game_width = game.width
+        self.game_height = game.height
+        self.my_country = country
+        self.all_countries = list(game.countries)
+        self.all_pieces = dict(game.pieces)
+        self.my_pieces = {piece_id: piece for piece_id, piece in game.pieces.items() if piece.country == country}
+        self.logs = []
+
+    def get_tiles_of_country(self, country_name) -> set[Coordinates]:
+        return set(self._game.territory[country_name])
+
+    def get_sighings_of_piece(self, piece_id):
+        return set()
+
+    def get_commands_of_piece(self, piece_id: str):
+        return [command for piece, command in self._game.orders if piece.id == piece_id]
+
+    def log(self, log_entry: str):
+        self.logs.append(log_entry)
+
+
+class _TileView(tactical_api.Tile):
+    """A tile as seen by one country: the money of enemy tiles is hidden."""
+
+    def __init__(self, tile: tactical_api.Tile, country: str):
+        self._tile = tile
+        self._country = country
+        self.coordinates = tile.coordinates
+
+    @property
+    def money(self):
+        if self._tile.country not in (None, self._country):
+            return None
+        return self._tile.money
+
+    @property
+    def country(self):
+        return self._tile.country
+
+    @property
+    def pieces(self):
+        return self._tile.pieces
+
+
+class LocalGame:
+    def __init__(self, countries: list[str], width: int = 32, height: int = 32, seed: int = 0):
+        self.id = next(_game_ids)
+        self.rng = random.Random(seed)
+        self.countries = list(countries)
+        self.width = width
+        self.height = height
+        self.turn = 0
+        self.orders = []
+        self.pieces = {}
+        self._next_piece_id = 0
+
+        self.tiles = {}
+        for x in range(width):
+            for y in range(height):
+                tile = tactical_api.Tile()
+                tile.coordinates = Coordinates(x, y)
+                tile.money = self.rng.randint(0, MAX_TILE_MONEY)
+                tile.country = None
+                tile.pieces = []
+                self.tiles[tile.coordinates] = tile
+        self.views = {country: {coords: _TileView(tile, country) for coords, tile in self.tiles.items()}
+                      for country in self.countries}
+        self.territory = {country: set() for country in self.countries}
+        self.territory[None] = set(self.tiles)
+
+        corners = [Coordinates(3, 3), Coordinates(width - 4, height - 4),
+                   Coordinates(width - 4, 3), Coordinates(3, height - 4)]
+        for country, start in zip(self.countries, corners):
+            for coords in self.tiles:
+                if distance(coords, start) <= START_TERRITORY_RADIUS:
+                    self._set_owner(self.tiles[coords], country)
+            self._spawn('builder', country, start).money = START_BUILDER_MONEY
+            self._spawn('tank', country, start)
+
+    def _set_owner(self, tile: tactical_api.Tile, country: str):
+        self.territory[tile.country].discard(tile.coordinates)
+        self.territory[country].add(tile.coordinates)
+        tile.country = country
+
+    def _spawn(self, piece_type: str, country: str, coords: Coordinates):
+        piece = PIECE_CLASSES[piece_type]()
+        piece._game = self
+        piece.id = str(self._next_piece_id)
+        piece.type = piece_type
+        piece.country = country
+        piece.tile = self.tiles[coords]
+        if piece_type == 'builder':
+            piece.money = 0
+        if piece_type in ('airplane', 'helicopter'):
+            piece.in_air, piece.time_in_air = False, None
+        if piece_type == 'irondome':
+            piece.is_defending = False
+        self._next_piece_id += 1
+        self.pieces[piece.id] = piece
+        piece.tile.pieces.append(piece)
+        return piece
+
+    def _kill(self, piece):
+        if self.pieces.pop(piece.id, None) is not None:
+            piece.tile.pieces.remove(piece)
+
+    def _is_protected(self, coords: Coordinates, country: str) -> bool:
+        return any(piece.type == 'irondome' and piece.country == country and piece.is_defending
+                   and distance(piece.tile.coordinates, coords) <= IRON_DOME_RADIUS
+                   for piece in self.pieces.values())
+
+    def _strike(self, attacker, coords: Coordinates):
+        for piece in list(self.tiles[coords].pieces):
+            if piece.country != attacker.country and not self._is_protected(coords, piece.country):
+                self._kill(piece)
+
+    def _max_step(self, piece) -> int:
+        if piece.type == 'airplane':
+            return AIRPLANE_SPEED if piece.in_air else 0
+        if piece.type == 'helicopter':
+            return HELICOPTER_SPEED if piece.in_air else 0
+        if piece.type in ('bunker', 'tower'):
+            return 0
+        return 1
+
+    def play_turn(self, players: dict[str, 'Player']):
+        for country in self.countries:
+            players[country].play(LocalTurnContext(self, country))
+        self._resolve()
+        self.turn += 1
+
+    def _resolve(self):
+        orders, self.orders = self.orders, []
+        alive = lambda piece: piece.id in self.pieces
+
+        for piece, command in orders:
+            if command[0] == 'move' and alive(piece) and command[1] in self.tiles:
+                if 0 < distance(piece.tile.coordinates, command[1]) <= self._max_step(piece):
+                    piece.tile.pieces.remove(piece)
+                    piece.tile = self.tiles[command[1]]
+                    piece.tile.pieces.append(piece)
+
+        for piece, command in orders:
+            if command[0] != 'attack' or not alive(piece):
+                continue
+            tile = piece.tile
+            if piece.type == 'tank':
+                if any(other.type == 'antitank' and other.country != piece.country for other in tile.pieces):
+                    self._kill(piece)
+                    continue
+                self._strike(piece, tile.coordinates)
+                self._set_owner(tile, piece.country)
+            elif piece.type == 'airplane' and piece.in_air:
+                self._strike(piece, tile.coordinates)
+            elif piece.type == 'artillery' and command[1] in self.tiles:
+                if distance(tile.coordinates, command[1]) <= ARTILLERY_RANGE:
+                    self._strike(piece, command[1])
+            elif piece.type == 'helicopter' and command[1] in self.tiles:
+                if distance(tile.coordinates, command[1]) <= HELICOPTER_RANGE:
+                    self._strike(piece, command[1])
+
+        for piece, command in orders:
+            if not alive(piece) or piece.type != 'builder':
+                continue
+            tile = piece.tile
+            if command[0] == 'collect' and tile.country == piece.country:
+                amount = max(0, min(command[1], tile.money))
+                tile.money -= amount
+                piece.money += amount
+            elif command[0] == 'throw':
+                amount = max(0, min(command[1], piece.money))
+                tile.money += amount
+                piece.money -= amount
+            elif command[0] == 'build' and piece.money >= PRICE_PER_PIECE[command[1]]:
+                piece.money -= PRICE_PER_PIECE[command[1]]
+                self._spawn(command[1], piece.country, tile.coordinates)
+
+        for piece in list(self.pieces.values()):
+            if getattr(piece, 'in_air', False):
+                piece.time_in_air += 1
+                if piece.time_in_air > AIRPLANE_AIR_TIME:
+                    self._kill(piece)
+
+    def scores(self) -> dict[str, int]:
+        return {country: len(self.territory[country]) for country in self.countries}
+
+    def is_over(self) -> bool:
+        return sum(1 for country in self.countries if self.territory[country]) <= 1
+
+
+class Player:
+    """A country in a local game.
+
+    The strategy modules are imported once per process and shared by all the
+    games played in it. They keep their per-game state keyed by the `game_id`
+    of the turn context, and are told when the game is over through the
+    `end_game` function of the modules that have one.
+    """
+
+    def __init__(self, tactical_module: str, strategic_module: str):
+        self.tactical = importlib.import_module(tactical_module)
+        self.strategic = importlib.import_module(strategic_module)
+        self.errors = 0
+        self.last_error = None
+
+    def play(self, context: LocalTurnContext):
+        try:
+            strategic = self.tactical.get_strategic_implementation(context)
+            self.strategic.do_turn(strategic)
+        except Exception:
+            self.errors += 1
+            self.last_error = traceback.format_exc()
+
+    def end_game(self, context: LocalTurnContext):
+        for module in {self.tactical, self.strategic}:
+            end_game = getattr(module, 'end_game', None)
+            if end_game is not None:
+                end_game(context)
+
+
+def play_game(players: list[tuple[str, str]], seed: int, turns: int = 200, width: int = 32, height: int = 32) -> dict:
+    """Plays a single game between the given (tactical, strategic) module pairs."""
+    random.seed(seed)
+    countries = [f'country{i}' for i in range(len(players))]
+    game = LocalGame(countries, width, height, seed)
+    loaded = {country: Player(tactical, strategic)
+              for country, (tactical, strategic) in zip(countries, players)}
+    while game.turn < turns and not game.is_over():
+        game.play_turn(loaded)
+    for country in countries:
+        loaded[country].end_game(LocalTurnContext(game, country))
+    return {
+        'seed': seed,
+        'turns': game.turn,
+        'scores': [game.scores()[country] for country in countries],
+        'errors': [loaded[country].errors for country in countries],
+    }
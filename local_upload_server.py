@@ -0,0 +1,135 @@
+"""A local stand-in for the upload endpoints of the PyWar server.
+
+It accepts `/login` and `/code/upload` the way `upload_script.py` uses them,
+and extracts every uploaded tarball into its own directory, which is enough
+for testing the upload script without the real server:
+
+    python local_upload_server.py -p 5555 --password secret
+    python upload_script.py --http -s localhost -p 5555 --password secret ...
+"""
+import argparse
+import email.parser
+import email.policy
+import http.cookies
+import http.server
+import io
+import os
+import os.path
+import secrets
+import ssl
+import sys
+import tarfile
+import urllib.parse
+
+SESSION_COOKIE = 'session'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Local stand-in for the PyWar upload server.')
+    parser.add_argument('-p', '--port', metavar='PORT', type=int, default=5555,
+                        help='Port to listen on.')
+    parser.add_argument('--host', metavar='HOST', type=str, default='localhost',
+                        help='Address to listen on.')
+    parser.add_argument('--password', metavar='PASSWORD', type=str, default=None,
+                        help='Password accepted by /login. Any password is accepted if not given.')
+    parser.add_argument('-o', '--output', metavar='DIR', type=str, default='uploads',
+                        help='Directory to extract the uploaded code to, one subdirectory per code name.')
+    parser.add_argument('--certfile', metavar='FILE', type=str, default=None,
+                        help='Certificate to serve HTTPS with. Plain HTTP is served if not given.')
+    parser.add_argument('--keyfile', metavar='FILE', type=str, default=None,
+                        help='Private key of the certificate.')
+    return parser.parse_args()
+
+
+def parse_form(content_type: str, body: bytes) -> dict[str, tuple[str, bytes]]:
+    """Field name -> (file name, content) of a multipart/form-data body."""
+    message = email.parser.BytesParser(policy=email.policy.default).parsebytes(
+        f'Content-Type: {content_type}\r\n\r\n'.encode('utf8') + body)
+    fields = {}
+    for part in message.iter_parts():
+        content = part.get_payload(decode=True)
+        # The upload script ends every value with a line break before the next boundary.
+        if content.endswith(b'\r\n'):
+            content = content[:-2]
+        elif content.endswith(b'\n'):
+            content = content[:-1]
+        fields[part.get_param('name', header='content-disposition')] = (part.get_filename(), content)
+    return fields
+
+
+class UploadHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Set by `main`.
+    password = None
+    output = None
+    sessions = set()
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.path == '/login':
+            self.login(body)
+        elif self.path == '/code/upload':
+            self.upload(body)
+        else:
+            self.respond(404)
+
+    def respond(self, status: int, headers: dict[str, str] = None, message: str = ''):
+        content = message.encode('utf8')
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def login(self, body: bytes):
+        form = dict(pair.split('=', 1) for pair in body.decode('utf8').split('&') if '=' in pair)
+        password = urllib.parse.unquote_plus(form.get('password', ''))
+        if self.password is not None and password != self.password:
+            self.respond(200, message='Invalid password')
+            return
+        session = secrets.token_hex(16)
+        self.sessions.add(session)
+        self.respond(302, {'Location': '/', 'Set-Cookie': f'{SESSION_COOKIE}={session}; Path=/'})
+
+    def upload(self, body: bytes):
+        cookie = http.cookies.SimpleCookie(self.headers.get('Cookie', ''))
+        if SESSION_COOKIE not in cookie or cookie[SESSION_COOKIE].value not in self.sessions:
+            self.respond(403, message='Not logged in')
+            return
+        try:
+            form = parse_form(self.headers['Content-Type'], body)
+            name = form['name'][1].decode('utf8')
+            tarball_name, tarball = form['tarball']
+            destination = os.path.join(self.output, name.replace(os.sep, '_'))
+            os.makedirs(destination, exist_ok=True)
+            with tarfile.open(fileobj=io.BytesIO(tarball), mode='r:*') as code:
+                code.extractall(destination, filter='data')
+                members = code.getnames()
+        except (KeyError, tarfile.TarError, ValueError) as e:
+            self.respond(400, message=f'Invalid upload: {e}')
+            return
+        print(f'Uploaded {name!r}: {tarball_name}, {len(tarball)} bytes, {len(members)} files, '
+              f'tactical {form["tactical"][1].decode("utf8")}, strategic {form["strategic"][1].decode("utf8")}',
+              file=sys.stderr)
+        self.respond(302, {'Location': '/code'})
+
+
+def main(args):
+    UploadHandler.password = args.password
+    UploadHandler.output = args.output
+    server = http.server.ThreadingHTTPServer((args.host, args.port), UploadHandler)
+    if args.certfile:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(args.certfile, args.keyfile)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+    print(f'Listening on {args.host}:{args.port}', file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    main(args)
@@ -0,0 +1,105 @@
+"""Checks that code is fit for uploading before it reaches the server.
+
+The server imports the tactical and strategic modules at the start of every
+game, so code that does not compile, or that is slow to import or to construct
+its StrategicApi, fails there. The check compiles every module, and then, in a
+fresh interpreter, imports the two entry points next to the local copies of
+the server's API modules and constructs the StrategicApi on the first turn of
+a local game.
+
+    python packaging_check.py DIR TACTICAL STRATEGIC
+
+prints the measured times as JSON.
+"""
+import json
+import os
+import os.path
+import subprocess
+import sys
+import time
+
+ROOT_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+# Where the API modules come from when the checked directory has no copy of them.
+API_DIRECTORY = os.path.join(ROOT_DIRECTORY, 'Code')
+DEFAULT_IMPORT_BUDGET = 1.0
+DEFAULT_CONSTRUCTION_BUDGET = 0.5
+SYNTHETIC_BOARD_SIZE = 32
+
+
+def compile_directory(directory: str) -> list[str]:
+    """Compiles every Python file in the directory, returning the errors."""
+    errors = []
+    for path, directories, filenames in os.walk(directory):
+        directories[:] = [name for name in directories if name != '__pycache__']
+        for filename in sorted(filenames):
+            if not filename.endswith('.py'):
+                continue
+            file_path = os.path.join(path, filename)
+            try:
+                with open(file_path, 'rb') as source_file:
+                    compile(source_file.read(), file_path, 'exec', dont_inherit=True)
+            except (SyntaxError, ValueError) as e:
+                errors.append(f'{file_path}: {e}')
+    return errors
+
+
+def measure(directory: str, tactical_module: str, strategic_module: str) -> dict:
+    """Runs the entry points in a fresh interpreter and returns their times in seconds."""
+    process = subprocess.run([sys.executable, '-B', os.path.abspath(__file__),
+                              directory, tactical_module, strategic_module],
+                             capture_output=True, text=True)
+    if process.returncode != 0:
+        raise RuntimeError(process.stderr.strip() or f'Exited with status {process.returncode}')
+    return json.loads(process.stdout.splitlines()[-1])
+
+
+def check(directory: str, tactical_module: str, strategic_module: str,
+          import_budget: float = DEFAULT_IMPORT_BUDGET,
+          construction_budget: float = DEFAULT_CONSTRUCTION_BUDGET) -> list[str]:
+    """Returns the reasons for not uploading the directory, or nothing if it is fine."""
+    problems = compile_directory(directory)
+    if problems:
+        return problems
+    try:
+        times = measure(directory, tactical_module, strategic_module)
+    except RuntimeError as e:
+        return [str(e)]
+    import_time = times['tactical_import'] + times['strategic_import']
+    if import_time > import_budget:
+        problems.append(f'Importing {tactical_module} and {strategic_module} took {import_time:.3f}s, '
+                        f'over the budget of {import_budget:.3f}s')
+    if times['construction'] > construction_budget:
+        problems.append(f'get_strategic_implementation took {times["construction"]:.3f}s, '
+                        f'over the budget of {construction_budget:.3f}s')
+    return problems
+
+
+def _measure_here(directory: str, tactical_module: str, strategic_module: str) -> dict:
+    import importlib
+
+    sys.path[:0] = [os.path.abspath(directory), API_DIRECTORY, ROOT_DIRECTORY]
+    # The API modules are provided by the server, so they are not part of the measured time.
+    for api_module in ('common_types', 'tactical_api', 'strategic_api'):
+        importlib.import_module(api_module)
+
+    start = time.perf_counter()
+    tactical = importlib.import_module(tactical_module)
+    tactical_import = time.perf_counter() - start
+    start = time.perf_counter()
+    importlib.import_module(strategic_module)
+    strategic_import = time.perf_counter() - start
+
+    import local_engine
+    game = local_engine.LocalGame(['country0', 'country1'], SYNTHETIC_BOARD_SIZE, SYNTHETIC_BOARD_SIZE)
+    context = local_engine.LocalTurnContext(game, 'country0')
+    start = time.perf_counter()
+    tactical.get_strategic_implementation(context)
+    construction = time.perf_counter() - start
+    return {'tactical_import': tactical_import, 'strategic_import': strategic_import, 'construction': construction}
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 4:
+        print(f'Usage: {sys.argv[0]} DIR TACTICAL STRATEGIC', file=sys.stderr)
+        sys.exit(2)
+    print(json.dumps(_measure_here(*sys.argv[1:])))
@@ -0,0 +1,52 @@
+"""Airplane attacks, and the chase of the closest enemy once the target tile is empty."""
+import os.path
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import local_engine
+import empty_tactical
+from common_types import Coordinates
+
+
+class AirplaneTest(unittest.TestCase):
+    def setUp(self):
+        self.game = local_engine.LocalGame(['country0', 'country1'], 16, 16, 0)
+        self.airplane = self.game._spawn('airplane', 'country0', Coordinates(2, 2))
+        self.enemy = self.game._spawn('tank', 'country1', Coordinates(2, 12))
+
+    def tactical_turn(self, order=None):
+        """Plays a turn of country0 through the tactical module only, and resolves it."""
+        context = local_engine.LocalTurnContext(self.game, 'country0')
+        strategic = empty_tactical.get_strategic_implementation(context)
+        if order is not None:
+            order(strategic)
+        self.game._resolve()
+        self.game.turn += 1
+        return strategic
+
+    def tearDown(self):
+        empty_tactical.end_game(local_engine.LocalTurnContext(self.game, 'country0'))
+
+    def test_attack_then_chase(self):
+        mirror = self.tactical_turn().state.mirrors.pieces[self.airplane.id]
+        strategic = self.tactical_turn(lambda strategic: strategic.attack({mirror}, Coordinates(2, 8), 1))
+        self.assertEqual(strategic.state.airplane_to_coordinate_to_attack[self.airplane.id], Coordinates(2, 8))
+        self.assertEqual(strategic.state.airplane_to_radius[self.airplane.id], 1)
+
+        # Flies to the target tile, finds it empty, and heads for the enemy tank.
+        self.tactical_turn()
+        self.assertEqual(self.airplane.tile.coordinates, Coordinates(2, 8))
+        strategic = self.tactical_turn()
+        self.assertEqual(strategic.state.airplane_to_coordinate_to_attack[self.airplane.id], Coordinates(2, 12))
+        self.assertEqual(self.airplane.tile.coordinates, Coordinates(2, 12))
+
+        strategic = self.tactical_turn()
+        self.assertNotIn(self.enemy.id, self.game.pieces)
+        command_id = strategic.state.airplane_to_attacking_command[self.airplane.id]
+        self.assertTrue(strategic.report_attack_command_status(command_id).is_success())
+
+
+if __name__ == '__main__':
+    unittest.main()
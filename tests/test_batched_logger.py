@@ -0,0 +1,65 @@
+"""Batches and overflow of the strategy log."""
+import os.path
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import local_engine
+import batched_logger
+import empty_strategic
+import empty_tactical
+
+
+class BatchedLoggerTest(unittest.TestCase):
+    def test_entries_are_joined_per_batch(self):
+        logger = batched_logger.BatchedLogger(capacity=16, batch_size=4)
+        for i in range(6):
+            logger.log(f'entry {i}')
+        sent = []
+        logger.flush(sent.append)
+        self.assertEqual(sent, ['entry 0\nentry 1\nentry 2\nentry 3', 'entry 4\nentry 5'])
+        logger.flush(sent.append)
+        self.assertEqual(len(sent), 2)
+
+    def test_overflow_is_reported_in_the_next_flush(self):
+        logger = batched_logger.BatchedLogger(capacity=2, batch_size=4)
+        for i in range(5):
+            logger.log(f'entry {i}')
+        sent = []
+        logger.flush(sent.append)
+        self.assertEqual(sent, ['3 log entries were dropped\nentry 3\nentry 4'])
+        self.assertEqual(logger.dropped, 3)
+
+    def test_failed_batches_are_counted(self):
+        def sink(log_entry):
+            raise RuntimeError(log_entry)
+
+        logger = batched_logger.BatchedLogger(capacity=16, batch_size=4)
+        for i in range(5):
+            logger.log(f'entry {i}')
+        logger.flush(sink)
+        self.assertEqual(logger.failed_entries, 5)
+
+    def test_the_log_is_flushed_when_the_turn_fails(self):
+        game = local_engine.LocalGame(['country0', 'country1'], 16, 16, 0)
+        context = local_engine.LocalTurnContext(game, 'country0')
+        strategic = empty_tactical.get_strategic_implementation(context)
+        strategic.log('before the failure')
+
+        def fail(strategic):
+            raise RuntimeError('failed turn')
+
+        original = empty_strategic.defend_with_idle_pieces
+        empty_strategic.defend_with_idle_pieces = fail
+        try:
+            with self.assertRaises(RuntimeError):
+                empty_strategic.do_turn(strategic)
+        finally:
+            empty_strategic.defend_with_idle_pieces = original
+            empty_tactical.end_game(context)
+        self.assertEqual(context.logs, ['before the failure'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+"""Threat estimates of the border garrison, and the placement of iron domes."""
+import os.path
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import local_engine
+import bitboard
+import defense
+import domes
+import turn_view
+from common_types import Coordinates
+
+OUR_BORDER_TILE = 16 | 64
+ENEMY_TANK_TILE = 128 | 8
+ENEMY_ARTILLERY_TILE = 2 | 8
+
+
+class IntelligenceTest(unittest.TestCase):
+    def garrison(self, intelligence: dict[Coordinates, int]) -> defense.BorderGarrison:
+        game = local_engine.LocalGame(['country0', 'country1'], 16, 16, 0)
+        view = turn_view.TurnView(local_engine.LocalTurnContext(game, 'country0'))
+        return defense.BorderGarrison(view, {coords: (danger, 0) for coords, danger in intelligence.items()}, {})
+
+    def required(self, intelligence: dict[Coordinates, int]) -> list[str]:
+        return sorted(piece_type for piece_type, _, _ in self.garrison(intelligence).required_pieces())
+
+    def test_no_threat_without_enemy_bits(self):
+        self.assertEqual(self.required({Coordinates(3, 3): OUR_BORDER_TILE, Coordinates(3, 5): 32 | 4}), [])
+
+    def test_enemy_tank_bit_is_tank_threat(self):
+        self.assertEqual(self.required({Coordinates(3, 6): ENEMY_TANK_TILE}), ['antitank'])
+
+    def test_enemy_artillery_bit_is_air_threat(self):
+        self.assertEqual(self.required({Coordinates(3, 6): ENEMY_ARTILLERY_TILE}), ['irondome'])
+
+    def test_tiles_outside_the_zone_are_ignored(self):
+        self.assertEqual(self.required({Coordinates(3, 15): ENEMY_TANK_TILE | ENEMY_ARTILLERY_TILE}), [])
+
+    def test_expired_intelligence_is_dropped(self):
+        intelligence = {Coordinates(3, 6): (ENEMY_TANK_TILE, 0), Coordinates(4, 6): (ENEMY_TANK_TILE, 5)}
+        defense.expire_intelligence(intelligence, defense.INTELLIGENCE_TURNS)
+        self.assertEqual(list(intelligence), [Coordinates(4, 6)])
+
+
+class DomePlacementTest(unittest.TestCase):
+    def test_domes_stay_among_the_candidates(self):
+        game = local_engine.LocalGame(['country0', 'country1'], 16, 16, 0)
+        for x in range(2, 9):
+            for y in range(2, 5):
+                game._set_owner(game.tiles[Coordinates(x, y)], 'country0')
+        view = turn_view.TurnView(local_engine.LocalTurnContext(game, 'country0'))
+        view.territories = bitboard.Territories()
+        view.territories.update(view)
+        planner = domes.DomePlanner()
+        planner.update(view)
+        self.assertNotIn(planner.place(1)[0], {Coordinates(8, 2), Coordinates(8, 3)})
+        self.assertIn(planner.place(1, candidates={Coordinates(8, 2), Coordinates(8, 3)})[0],
+                      {Coordinates(8, 2), Coordinates(8, 3)})
+        self.assertEqual(planner.place(1, candidates={Coordinates(0, 0)}), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+"""The incremental rescoring of the conquest targets, against scoring every target afresh."""
+import os.path
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import local_engine
+import empty_strategic
+import empty_tactical
+import frontier
+
+TURNS = 40
+
+
+class FrontierTest(unittest.TestCase):
+    def test_incremental_scores_match_a_full_rescore(self):
+        game = local_engine.LocalGame(['country0', 'country1'], 16, 16, 3)
+        enemy = local_engine.Player('empty_tactical', 'empty_strategic')
+        planner = frontier.FrontierPlanner()
+        try:
+            for _ in range(TURNS):
+                strategic = empty_tactical.get_strategic_implementation(local_engine.LocalTurnContext(game, 'country0'))
+                view = strategic.get_turn_view()
+                planner.update(view)
+                fresh = frontier.FrontierPlanner()
+                fresh.update(view)
+                self.assertEqual(planner.scores, fresh.scores, f'turn {game.turn}')
+
+                empty_strategic.do_turn(strategic)
+                enemy.play(local_engine.LocalTurnContext(game, 'country1'))
+                game._resolve()
+                game.turn += 1
+            self.assertIsNone(enemy.last_error)
+        finally:
+            for country in game.countries:
+                empty_tactical.end_game(local_engine.LocalTurnContext(game, country))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+"""The per-game state of the strategy modules, with games sharing threads and threads sharing games."""
+from concurrent.futures import ThreadPoolExecutor
+import os.path
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import local_engine
+import empty_tactical
+import game_state
+
+TURNS = 6
+
+
+def new_game(seed: int):
+    game = local_engine.LocalGame(['country0', 'country1'], 16, 16, seed)
+    players = {country: local_engine.Player('empty_tactical', 'empty_strategic') for country in game.countries}
+    return game, players
+
+
+def server_context(game, country: str) -> local_engine.LocalTurnContext:
+    """A turn context like the server's, which has no game ID."""
+    context = local_engine.LocalTurnContext(game, country)
+    context.game_id = None
+    return context
+
+
+def play_server_turn(game, players):
+    for country in game.countries:
+        players[country].play(server_context(game, country))
+    game._resolve()
+    game.turn += 1
+
+
+def tactical_state(game, country: str = 'country0', context=None) -> empty_tactical.GameState:
+    context = context or local_engine.LocalTurnContext(game, country)
+    return game_state.get_game_state(context, empty_tactical.__name__, lambda: None)
+
+
+class ClosedState:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class GameStateTest(unittest.TestCase):
+    def assert_played(self, game, players):
+        self.assertEqual([player.last_error for player in players.values()], [None, None])
+        # A state shared with another game would have counted its turns too.
+        self.assertEqual(tactical_state(game).turn, game.turn)
+
+    def end(self, game, players):
+        for country, player in players.items():
+            player.end_game(local_engine.LocalTurnContext(game, country))
+
+    def test_interleaved_games_on_one_thread(self):
+        first, second = new_game(0), new_game(1)
+        states = set()
+        for _ in range(TURNS):
+            for game, players in (first, second):
+                game.play_turn(players)
+                states.add((game.id, id(tactical_state(game))))
+        self.assertEqual(len(states), 2)
+        for game, players in (first, second):
+            self.assert_played(game, players)
+            self.end(game, players)
+
+    def test_games_on_one_worker_thread(self):
+        first, second = new_game(2), new_game(3)
+        with ThreadPoolExecutor(1) as executor:
+            for _ in range(TURNS):
+                for game, players in (first, second):
+                    executor.submit(game.play_turn, players).result()
+        self.assertIsNot(tactical_state(first[0]), tactical_state(second[0]))
+        for game, players in (first, second):
+            self.assert_played(game, players)
+            self.end(game, players)
+
+    def test_every_turn_on_a_new_thread(self):
+        game, players = new_game(4)
+        for _ in range(TURNS):
+            thread = threading.Thread(target=game.play_turn, args=(players,))
+            thread.start()
+            thread.join()
+        self.assert_played(game, players)
+        self.end(game, players)
+
+    def test_end_game_drops_the_state(self):
+        game, players = new_game(5)
+        game.play_turn(players)
+        state = tactical_state(game)
+        self.end(game, players)
+        self.assertIsNot(tactical_state(game), state)
+        game_state.end_game(local_engine.LocalTurnContext(game, 'country0'))
+
+    def test_games_without_an_id_are_kept_apart(self):
+        first, first_players = new_game(6)
+        for _ in range(TURNS):
+            play_server_turn(first, first_players)
+        first_state = tactical_state(first, context=server_context(first, 'country0'))
+        self.assertEqual(first_state.turn, TURNS)
+
+        # The same settings and start, and the first game never ended.
+        second, second_players = new_game(6)
+        for _ in range(2):
+            play_server_turn(second, second_players)
+        self.assertEqual([player.last_error for player in second_players.values()], [None, None])
+        second_state = tactical_state(second, context=server_context(second, 'country0'))
+        self.assertIsNot(second_state, first_state)
+        self.assertEqual(second_state.turn, 2)
+        for country in second.countries:
+            game_state.end_game(server_context(second, country))
+
+    def test_oldest_games_are_dropped(self):
+        game, _ = new_game(7)
+        states = []
+        for i in range(game_state.MAX_GAMES + 1):
+            context = local_engine.LocalTurnContext(game, 'country0')
+            context.game_id = ('bounded', i)
+            states.append(game_state.get_game_state(context, 'test', ClosedState))
+        self.assertTrue(states[0].closed)
+        self.assertFalse(any(state.closed for state in states[1:]))
+        for i in range(1, game_state.MAX_GAMES + 1):
+            context = local_engine.LocalTurnContext(game, 'country0')
+            context.game_id = ('bounded', i)
+            game_state.end_game(context)
+        self.assertTrue(all(state.closed for state in states))
+
+
+if __name__ == '__main__':
+    unittest.main()
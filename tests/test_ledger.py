@@ -0,0 +1,98 @@
+"""Money claims of the collection ledger, and collection by builders."""
+import os.path
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import local_engine
+import empty_tactical
+import estimates
+import ledger
+import turn_view
+from common_types import Coordinates
+
+START = Coordinates(3, 3)
+
+
+class CollectionLedgerTest(unittest.TestCase):
+    def setUp(self):
+        self.game = local_engine.LocalGame(['country0', 'country1'], 16, 16, 0)
+        for coords in self.game.territory['country0']:
+            self.game.tiles[coords].money = 0
+        self.game.tiles[START].money = 20
+        self.game.tiles[Coordinates(3, 4)].money = 10
+        self.builder = next(piece for piece in self.game.pieces.values()
+                            if piece.country == 'country0' and piece.type == 'builder')
+        self.ledger = ledger.CollectionLedger()
+        self.update()
+
+    def update(self):
+        self.ledger.update(turn_view.TurnView(local_engine.LocalTurnContext(self.game, 'country0')))
+
+    def test_claimed_money_is_not_offered_again(self):
+        start = self.ledger.pack(START)
+        self.assertEqual(self.ledger.find_tile(START, 20), start)
+        self.ledger.claim(self.builder.id, start, 20)
+        self.assertEqual(self.ledger.available(start), 0)
+        self.assertEqual(self.ledger.find_tile(START, 20), self.ledger.pack(Coordinates(3, 4)))
+        self.ledger.claim('other builder', self.ledger.pack(Coordinates(3, 4)), 10)
+        self.assertIsNone(self.ledger.find_tile(START, 20))
+
+    def test_claims_are_capped_by_the_money_of_the_tile(self):
+        self.ledger.claim(self.builder.id, self.ledger.pack(START), 50)
+        self.assertEqual(self.ledger.claimed_amount(self.builder.id), 20)
+
+    def test_find_tile_keeps_to_the_given_tiles(self):
+        self.assertEqual(self.ledger.find_tile(START, 5, {Coordinates(3, 4)}), self.ledger.pack(Coordinates(3, 4)))
+        self.assertIsNone(self.ledger.find_tile(START, 5, {Coordinates(4, 4)}))
+
+    def test_the_rest_of_a_partial_collection_stays_claimed(self):
+        start = self.ledger.pack(START)
+        self.ledger.claim(self.builder.id, start, 12)
+        self.ledger.collected(self.builder.id, 5)
+        self.assertEqual(self.ledger.claimed_tile(self.builder.id), start)
+        self.assertEqual(self.ledger.claimed_amount(self.builder.id), 7)
+        self.assertEqual(self.ledger.available(start), 20 - 5 - 7)
+        self.ledger.collected(self.builder.id, 7)
+        self.assertIsNone(self.ledger.claimed_tile(self.builder.id))
+        self.assertEqual(self.ledger.available(start), 8)
+
+    def test_update_revalidates_the_claims(self):
+        start = self.ledger.pack(START)
+        self.ledger.claim(self.builder.id, start, 15)
+        self.ledger.claim('dead builder', self.ledger.pack(Coordinates(3, 4)), 10)
+        self.game.tiles[START].money = 6
+        self.update()
+        self.assertEqual(self.ledger.claimed_amount(self.builder.id), 6)
+        self.assertIsNone(self.ledger.claimed_tile('dead builder'))
+        self.assertEqual(self.ledger.available(self.ledger.pack(Coordinates(3, 4))), 10)
+
+
+class CollectionTest(unittest.TestCase):
+    def test_builders_collect_at_most_a_turns_worth(self):
+        game = local_engine.LocalGame(['country0', 'country1'], 16, 16, 0)
+        for coords in game.territory['country0']:
+            game.tiles[coords].money = 0
+        game.tiles[START].money = 40
+        builder = next(piece for piece in game.pieces.values()
+                       if piece.country == 'country0' and piece.type == 'builder')
+        builder.money = 0
+        context = local_engine.LocalTurnContext(game, 'country0')
+        try:
+            strategic = empty_tactical.get_strategic_implementation(context)
+            strategic.build_piece(strategic.state.mirrors.pieces[builder.id], 'tank')
+            money = []
+            for _ in range(3):
+                game._resolve()
+                game.turn += 1
+                money.append(builder.money)
+                empty_tactical.get_strategic_implementation(local_engine.LocalTurnContext(game, 'country0'))
+            # The tank costs 8: a turn's worth, then the rest of the claim.
+            self.assertEqual(money, [0, estimates.COLLECT_PER_TURN, 8])
+        finally:
+            empty_tactical.end_game(context)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+"""The regions of our territory, kept up from the diffs, against a flood fill of the territory."""
+import os.path
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import local_engine
+import regions
+import turn_diff
+import turn_view
+from board import get_neighbours
+from common_types import Coordinates
+
+TURNS = 120
+
+
+def flood_fill(view: turn_view.TurnView) -> set[frozenset]:
+    """The connected parts of our territory, searched from scratch."""
+    our_tiles = view.our_tiles
+    parts, seen = set(), set()
+    for start in our_tiles:
+        if start in seen:
+            continue
+        part, stack = {start}, [start]
+        while stack:
+            for neighbour in get_neighbours(view, stack.pop()):
+                if neighbour in our_tiles and neighbour not in part:
+                    part.add(neighbour)
+                    stack.append(neighbour)
+        seen |= part
+        parts.add(frozenset(part))
+    return parts
+
+
+class TerritoryRegionsTest(unittest.TestCase):
+    def check(self, seed: int, changes_per_turn: int):
+        rng = random.Random(seed)
+        game = local_engine.LocalGame(['country0', 'country1'], 12, 12, seed)
+        differ = turn_diff.BoardDiffer()
+        territory = regions.TerritoryRegions()
+        coordinates = list(game.tiles)
+        for turn in range(TURNS):
+            view = turn_view.TurnView(local_engine.LocalTurnContext(game, 'country0'))
+            view.diff = differ.update(view)
+            territory.update(view)
+
+            parts = {frozenset(region.tiles) for region in territory.regions.values()}
+            self.assertEqual(parts, flood_fill(view), f'turn {turn}')
+            for region in territory.regions.values():
+                self.assertTrue(all(territory.region_of[coords] == region.id for coords in region.tiles))
+                self.assertEqual(region.money, sum(game.tiles[coords].money for coords in region.tiles))
+                self.assertEqual(region.x_sum, sum(x for x, _ in region.tiles))
+                self.assertEqual(region.y_sum, sum(y for _, y in region.tiles))
+            self.assertEqual(set(territory.region_of), view.our_tiles)
+
+            # Owners change mostly around our territory, where they can split and join regions.
+            for _ in range(changes_per_turn):
+                coords = rng.choice(sorted(game.territory['country0'])) if rng.random() < 0.5 else rng.choice(coordinates)
+                if rng.random() < 0.3:
+                    coords = rng.choice(get_neighbours(view, coords))
+                game._set_owner(game.tiles[coords], rng.choice(['country0', 'country0', 'country1', None]))
+            for coords in rng.sample(coordinates, 4):
+                game.tiles[coords].money = rng.randint(0, local_engine.MAX_TILE_MONEY)
+
+    def test_few_changes_a_turn(self):
+        self.check(0, 3)
+
+    def test_many_changes_a_turn(self):
+        self.check(1, 20)
+
+    def test_lost_tile_splits_its_region(self):
+        game = local_engine.LocalGame(['country0', 'country1'], 12, 12, 2)
+        for x in range(1, 8):
+            game._set_owner(game.tiles[Coordinates(x, 6)], 'country0')
+        differ = turn_diff.BoardDiffer()
+        territory = regions.TerritoryRegions()
+        for cut in (None, Coordinates(4, 6), Coordinates(6, 6)):
+            if cut is not None:
+                game._set_owner(game.tiles[cut], 'country1')
+            view = turn_view.TurnView(local_engine.LocalTurnContext(game, 'country0'))
+            view.diff = differ.update(view)
+            territory.update(view)
+        self.assertEqual(len(territory.regions), 4)
+        self.assertEqual(territory.region_at(Coordinates(7, 6)).tiles, {Coordinates(7, 6)})
+        self.assertEqual(territory.region_at(Coordinates(5, 6)).tiles, {Coordinates(5, 6)})
+        self.assertNotEqual(territory.region_of[Coordinates(1, 6)], territory.region_of[Coordinates(5, 6)])
+
+
+if __name__ == '__main__':
+    unittest.main()
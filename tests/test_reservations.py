@@ -0,0 +1,76 @@
+"""Space-time routes of ground pieces through the reservation table."""
+import os.path
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import local_engine
+import reservations
+from common_types import Coordinates
+
+
+def route_all(table: reservations.ReservationTable, requests: list) -> dict:
+    """Routes the (start, goal) requests in the order `reservations.route` does, and returns their paths."""
+    paths = {}
+    for start, goal in sorted(requests, key=lambda request: reservations._distance(*request)):
+        paths[start] = path = table.find_path(start, goal)
+        table.reserve(path)
+    return paths
+
+
+class ReservationTableTest(unittest.TestCase):
+    def assert_no_shared_tiles(self, table, requests, paths, held=()):
+        """No two pieces are on the same tile at the same turn, other than on a shared goal."""
+        goals = {table.tile_id(goal) for _, goal in requests}
+        occupied = {(table.tile_id(coords), turn) for coords in held for turn in range(table.horizon + 1)}
+        for start, path in paths.items():
+            for turn, tile_id in enumerate(path):
+                if tile_id in goals:
+                    continue
+                self.assertNotIn((tile_id, turn), occupied, f'{table.coordinates(tile_id)} at turn {turn}')
+                occupied.add((tile_id, turn))
+
+    def assert_shortest(self, table, requests, paths):
+        for start, goal in requests:
+            path = paths[start]
+            self.assertEqual(len(path) - 1, min(table.horizon, reservations._distance(start, goal)))
+            for turn in range(1, len(path)):
+                self.assertEqual(reservations._distance(table.coordinates(path[turn - 1]),
+                                                        table.coordinates(path[turn])), 1)
+
+    def test_crossing_groups_do_not_share_tiles(self):
+        table = reservations.ReservationTable(12, 12)
+        requests = [(Coordinates(2, y), Coordinates(8, y + 4)) for y in range(2, 6)] + \
+                   [(Coordinates(x, 1), Coordinates(x + 5, 7)) for x in range(3, 6)]
+        paths = route_all(table, requests)
+        self.assert_shortest(table, requests, paths)
+        self.assert_no_shared_tiles(table, requests, paths)
+
+    def test_pieces_side_by_side_stay_apart(self):
+        table = reservations.ReservationTable(16, 16)
+        requests = [(Coordinates(1, y), Coordinates(7, y + 2)) for y in range(1, 9)]
+        paths = route_all(table, requests)
+        self.assert_shortest(table, requests, paths)
+        self.assert_no_shared_tiles(table, requests, paths)
+
+    def test_routes_go_around_held_tiles(self):
+        table = reservations.ReservationTable(12, 12)
+        held = [Coordinates(4, 3), Coordinates(5, 4)]
+        for coords in held:
+            table.hold(coords)
+        requests = [(Coordinates(2, 3), Coordinates(7, 5)), (Coordinates(3, 2), Coordinates(8, 3))]
+        paths = route_all(table, requests)
+        self.assert_shortest(table, requests, paths)
+        self.assert_no_shared_tiles(table, requests, paths, held)
+
+    def test_a_shared_goal_is_not_avoided(self):
+        table = reservations.ReservationTable(12, 12)
+        requests = [(Coordinates(2, 2), Coordinates(4, 4)), (Coordinates(6, 6), Coordinates(4, 4))]
+        paths = route_all(table, requests)
+        self.assert_shortest(table, requests, paths)
+        self.assertEqual([path[-1] for path in paths.values()], [table.tile_id(Coordinates(4, 4))] * 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+"""The turn diffs and the views the differ keeps from them, against a full rescan of the board."""
+import os.path
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import local_engine
+import turn_diff
+from board import get_border_tiles
+
+TURNS = 3 * turn_diff.FULL_SCAN_INTERVAL + 5
+
+
+def rescan(context) -> tuple[dict, dict]:
+    """The owner and the money of every tile."""
+    owners = {coords: tile.country for coords, tile in context.tiles.items()}
+    money = {coords: tile.money for coords, tile in context.tiles.items()}
+    return owners, money
+
+
+class BoardDifferTest(unittest.TestCase):
+    def test_diffs_match_a_rescan(self):
+        rng = random.Random(0)
+        game = local_engine.LocalGame(['country0', 'country1'], 12, 12, 0)
+        differ = turn_diff.BoardDiffer()
+        coordinates = list(game.tiles)
+        previous = None
+        for turn in range(TURNS):
+            context = local_engine.LocalTurnContext(game, 'country0')
+            diff = differ.update(context)
+            owners, money = rescan(context)
+            pieces = {piece_id: piece.tile.coordinates for piece_id, piece in context.all_pieces.items()}
+            our_tiles = context.get_tiles_of_country('country0')
+
+            self.assertEqual(differ.border, set(get_border_tiles(context)), f'turn {turn}')
+            self.assertEqual(differ.our_money, sum(money[coords] for coords in our_tiles), f'turn {turn}')
+            # Money is re-read every turn on our tiles, under pieces and on tiles that changed owner.
+            exact = our_tiles | diff.owners.keys() | set(pieces.values())
+            if previous is not None:
+                exact |= set(previous[2].values())
+            self.assertEqual({coords: differ.money.get(coords) for coords in exact},
+                             {coords: money[coords] for coords in exact}, f'turn {turn}')
+            if previous is not None:
+                previous_owners, previous_money, previous_pieces, previous_exact = previous
+                self.assertEqual(diff.owners, {coords: (previous_owners[coords], owner)
+                                               for coords, owner in owners.items() if owner != previous_owners[coords]})
+                # Tiles that were re-read last turn too have their exact change in the diff.
+                both = exact & previous_exact
+                self.assertEqual({coords: change for coords, change in diff.money.items() if coords in both},
+                                 {coords: (previous_money[coords], money[coords])
+                                  for coords in both if money[coords] != previous_money[coords]}, f'turn {turn}')
+                self.assertEqual(set(diff.appeared), pieces.keys() - previous_pieces.keys())
+                self.assertEqual(set(diff.vanished), previous_pieces.keys() - pieces.keys())
+                self.assertEqual(diff.moved, {piece_id: (previous_pieces[piece_id], coords)
+                                              for piece_id, coords in pieces.items()
+                                              if piece_id in previous_pieces and previous_pieces[piece_id] != coords})
+            previous = owners, money, pieces, exact
+
+            for _ in range(rng.randint(0, 8)):
+                coords = rng.choice(coordinates)
+                game._set_owner(game.tiles[coords], rng.choice(['country0', 'country1', None]))
+            for coords in rng.sample(coordinates, 6):
+                game.tiles[coords].money = rng.randint(0, local_engine.MAX_TILE_MONEY)
+            for coords in rng.sample(sorted(game.territory['country0']), min(2, len(game.territory['country0']))):
+                game.tiles[coords].money = rng.randint(0, local_engine.MAX_TILE_MONEY)
+            for piece in rng.sample(sorted(game.pieces.values(), key=lambda piece: piece.id), 2):
+                piece.tile.pieces.remove(piece)
+                piece.tile = game.tiles[rng.choice(coordinates)]
+                piece.tile.pieces.append(piece)
+            if rng.random() < 0.3:
+                game._kill(rng.choice(list(game.pieces.values())))
+            if rng.random() < 0.3:
+                game._spawn('tank', rng.choice(game.countries), rng.choice(coordinates))
+
+    def test_first_diff_has_the_whole_board(self):
+        game = local_engine.LocalGame(['country0', 'country1'], 12, 12, 1)
+        context = local_engine.LocalTurnContext(game, 'country0')
+        diff = turn_diff.BoardDiffer().update(context)
+        self.assertEqual(set(diff.owners), game.territory['country0'] | game.territory['country1'])
+        self.assertEqual(set(diff.appeared), set(game.pieces))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import argparse
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import sys
+
+import local_engine
+
+Z_95 = 1.96
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Play local PyWar games between strategies.')
+    parser.add_argument('players', metavar='TACTICAL:STRATEGIC', type=str, nargs='+',
+                        help='Tactical and strategic module names of each participating player.')
+    parser.add_argument('-g', '--games', metavar='GAMES', type=int, default=100,
+                        help='Games to play between every pair of players.')
+    parser.add_argument('-j', '--processes', metavar='PROCESSES', type=int, default=os.cpu_count(),
+                        help='Amount of games to play in parallel.')
+    parser.add_argument('--seed', metavar='SEED', type=int, default=0,
+                        help='Seed of the first game. Game i is played with seed SEED + i.')
+    parser.add_argument('--turns', metavar='TURNS', type=int, default=200,
+                        help='Maximal amount of turns in a game.')
+    parser.add_argument('--width', metavar='WIDTH', type=int, default=32,
+                        help='Board width.')
+    parser.add_argument('--height', metavar='HEIGHT', type=int, default=32,
+                        help='Board height.')
+    parser.add_argument('-o', '--results', metavar='FILE', type=str, default='tournament_results.jsonl',
+                        help='File to stream the results of the games to, one JSON object per line.')
+    args = parser.parse_args()
+    args.players = [tuple(player.split(':')) for player in args.players]
+    if len(args.players) < 2 or any(len(player) != 2 for player in args.players):
+        parser.error('At least two players of the form TACTICAL:STRATEGIC are required.')
+    return args
+
+
+def schedule(args) -> list[dict]:
+    """Every pair of players plays `args.games` games, alternating start corners."""
+    games = []
+    for first, second in itertools.combinations(range(len(args.players)), 2):
+        for i in range(args.games):
+            pair = [first, second] if i % 2 == 0 else [second, first]
+            games.append({'game': len(games), 'seed': args.seed + len(games), 'players': pair,
+                          'turns': args.turns, 'width': args.width, 'height': args.height})
+    return games
+
+
+def play(players: list[tuple[str, str]], game: dict) -> dict:
+    result = local_engine.play_game([players[i] for i in game['players']], game['seed'], game['turns'],
+                                    game['width'], game['height'])
+    result.update(game=game['game'], players=game['players'])
+    return result
+
+
+def pair_score(result: dict) -> float:
+    """Score of the first player in the result: 1 for a win, 0.5 for a draw."""
+    first, second = result['scores']
+    return 1.0 if first > second else 0.5 if first == second else 0.0
+
+
+def wilson_interval(score: float, games: int) -> tuple[float, float]:
+    denominator = 1 + Z_95 ** 2 / games
+    center = (score + Z_95 ** 2 / (2 * games)) / denominator
+    margin = Z_95 * math.sqrt(score * (1 - score) / games + Z_95 ** 2 / (4 * games ** 2)) / denominator
+    return center - margin, center + margin
+
+
+def elo_difference(score: float) -> float:
+    score = min(max(score, 1e-3), 1 - 1e-3)
+    return -400 * math.log10(1 / score - 1)
+
+
+def summarize(players: list[tuple[str, str]], results: list[dict]):
+    names = [':'.join(player) for player in players]
+    pairs = {}
+    for result in results:
+        first, second = result['players']
+        score = pair_score(result)
+        if first > second:
+            first, second, score = second, first, 1 - score
+        pairs.setdefault((first, second), []).append(score)
+
+    for (first, second), scores in sorted(pairs.items()):
+        games = len(scores)
+        score = sum(scores) / games
+        low, high = wilson_interval(score, games)
+        print(f'{names[first]} vs {names[second]}: {games} games, '
+              f'score {score:.3f} [{low:.3f}, {high:.3f}], '
+              f'Elo {elo_difference(score):+.0f} [{elo_difference(low):+.0f}, {elo_difference(high):+.0f}]')
+
+    for i, name in enumerate(names):
+        errors = sum(result['errors'][result['players'].index(i)] for result in results if i in result['players'])
+        if errors:
+            print(f'{name}: {errors} turns raised an exception', file=sys.stderr)
+
+
+def main(args):
+    games = schedule(args)
+    results = []
+    with multiprocessing.Pool(args.processes) as pool, open(args.results, 'w') as results_file:
+        for result in pool.imap_unordered(_play_with_players, [(args.players, game) for game in games]):
+            results_file.write(json.dumps(result) + '\n')
+            results_file.flush()
+            results.append(result)
+            print(f'{len(results)}/{len(games)} games played', end='\r', file=sys.stderr)
+    print(file=sys.stderr)
+    summarize(args.players, results)
+
+
+def _play_with_players(task) -> dict:
+    return play(*task)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    main(args)
@@ -1,30 +1,55 @@
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from getpass import getpass
+import hashlib
 import http.client
-import io
+import json
 import os
 import os.path
+import queue
 import ssl
 import sys
 import tarfile
+import tempfile
+import threading
 import urllib.parse
 
+import packaging_check
+
 TIMEOUT = 10
 AUTHENTICATIO_REQUEST_HEADERS = {
     'Content-type': 'application/x-www-form-urlencoded'
 }
-BOUNDARY = b'wL36Yn8afVp8Ag7AmP8qZ0SA4n1v9T'
+BOUNDARY = 'wL36Yn8afVp8Ag7AmP8qZ0SA4n1v9T'
 UPLOAD_REQUEST_HEADERS = {
     'Content-type': 'multipart/form-data; boundary={}'.format(BOUNDARY)
 }
+# Size of the pieces the tarball is sent to the server in.
+CHUNK_SIZE = 64 * 1024
+# Tarballs smaller than this are kept in memory, larger ones in a temporary file.
+MAX_INMEMORY_TARBALL_SIZE = 16 * 1024 * 1024
+EXCLUDED_FILES = {'strategic_api.py', 'tactical_api.py', 'common_types.py'}
+EXCLUDED_DIRECTORIES = {'__pycache__'}
+# Compression algorithm -> tarfile mode, uploaded file name, content type.
+COMPRESSIONS = {
+    'gz': ('w:gz', 'code.tar.gz', 'application/tar+gzip'),
+    'bz2': ('w:bz2', 'code.tar.bz2', 'application/x-bzip2'),
+    'xz': ('w:xz', 'code.tar.xz', 'application/x-xz'),
+    'none': ('w', 'code.tar', 'application/x-tar'),
+}
 
 
 def parse_args():
     parser = argparse.ArgumentParser(description='Upload code to PyWar.')
-    parser.add_argument('-d', '--directory', metavar='DIR', type=str, required=True,
+    parser.add_argument('-d', '--directory', metavar='DIR', type=str, default=None,
                         help='Directory to upload.')
-    parser.add_argument('-n', '--name', metavar='NAME', type=str, required=True,
+    parser.add_argument('-n', '--name', metavar='NAME', type=str, default=None,
                         help='Code name in PyWar.')
+    parser.add_argument('--variant', metavar='NAME:DIR', type=str, action='append', default=[],
+                        help='Another code name and directory to upload. May be given several times; '
+                             'all the variants are uploaded concurrently.')
+    parser.add_argument('-j', '--connections', metavar='CONNECTIONS', type=int, default=4,
+                        help='Maximal amount of variants to upload at the same time.')
     parser.add_argument('-s', '--server', metavar='SERVER', type=str, default='pywar.ddns.net',
                         help='PyWar server for uploading this code to.')
     parser.add_argument('-p', '--port', metavar='PORT', type=int, required=True,
@@ -35,12 +60,44 @@ def parse_args():
                         help='Strategic implementation module name.')
     parser.add_argument('--password', metavar='PASSWORD', type=str, default=None,
                         help='Password for logging in to the server')
-    return parser.parse_args()
+    parser.add_argument('--http', action='store_true',
+                        help='Connect without TLS, e.g. to local_upload_server.py.')
+    parser.add_argument('--compression', choices=COMPRESSIONS, default='gz',
+                        help='Compression algorithm of the uploaded tarball.')
+    parser.add_argument('--compression-level', metavar='LEVEL', type=int, default=9, choices=range(10),
+                        help='Compression level, from 0 (fastest) to 9 (smallest).')
+    parser.add_argument('--manifest', metavar='FILE', type=str, default='.upload_manifest.json',
+                        help='File remembering the hashes of the last uploaded files, '
+                             'for skipping uploads of unchanged code.')
+    parser.add_argument('-f', '--force', action='store_true',
+                        help='Upload even if the code did not change since the last upload.')
+    parser.add_argument('--import-budget', metavar='SECONDS', type=float,
+                        default=packaging_check.DEFAULT_IMPORT_BUDGET,
+                        help='Maximal time for importing the tactical and strategic modules.')
+    parser.add_argument('--construction-budget', metavar='SECONDS', type=float,
+                        default=packaging_check.DEFAULT_CONSTRUCTION_BUDGET,
+                        help='Maximal time for get_strategic_implementation on the first turn.')
+    parser.add_argument('--skip-check', action='store_true',
+                        help='Upload without compiling and timing the code first.')
+    args = parser.parse_args()
+    if (args.name is None) != (args.directory is None):
+        parser.error('--name and --directory must be given together.')
+    args.variants = [] if args.name is None else [(args.name, args.directory)]
+    for variant in args.variant:
+        name, separator, directory = variant.rpartition(':')
+        if not separator or not name or not directory:
+            parser.error(f'Invalid variant {variant!r}, expected NAME:DIR.')
+        args.variants.append((name, directory))
+    if not args.variants:
+        parser.error('Nothing to upload: give --name and --directory, or --variant.')
+    return args
 
 
-def add_directory_to_tarball(tarball, directory, base_dir=None):
-    for filename in os.listdir(directory):
-        if filename in ["strategic_api.py", "tactical_api.py", "common_types.py"]:
+def get_directory_files(directory, base_dir=None):
+    """The (path, name in tarball) of every file to upload from the directory, sorted by name."""
+    files = []
+    for filename in sorted(os.listdir(directory)):
+        if filename in EXCLUDED_FILES:
             continue
         real_path = os.path.join(directory, filename)
         if base_dir is None:
@@ -48,11 +105,64 @@ def add_directory_to_tarball(tarball, directory, base_dir=None):
         else:
             arcfilename = '/'.join([base_dir, filename])
         if os.path.isfile(real_path):
-            tarball.add(real_path, arcfilename)
+            files.append((real_path, arcfilename))
         elif os.path.isdir(real_path):
-            add_directory_to_tarball(tarball, real_path, arcfilename)
+            if filename not in EXCLUDED_DIRECTORIES:
+                files.extend(get_directory_files(real_path, arcfilename))
         else:
             print('Ignoring', filename, 'for it is not recognized as a file or directory')
+    return files
+
+
+def add_directory_to_tarball(tarball, files):
+    for real_path, arcfilename in files:
+        tarball.add(real_path, arcfilename)
+
+
+def hash_files(files):
+    hashes = {}
+    for real_path, arcfilename in files:
+        file_hash = hashlib.sha256()
+        with open(real_path, 'rb') as f:
+            while chunk := f.read(CHUNK_SIZE):
+                file_hash.update(chunk)
+        hashes[arcfilename] = file_hash.hexdigest()
+    return hashes
+
+
+class Manifest:
+    """The file hashes of the last successful upload of every directory.
+
+    Uploads are keyed by the server, the uploaded directory and the module
+    names, not by the code name, so that code which did not change is not
+    uploaded again under a new name.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path) as manifest_file:
+                self.uploads = json.load(manifest_file)
+        except (OSError, ValueError):
+            self.uploads = {}
+
+    @staticmethod
+    def key(args, directory):
+        return '|'.join([args.server, str(args.port), os.path.abspath(directory),
+                         args.tactical_module, args.strategic_module])
+
+    def is_uploaded(self, key, hashes):
+        with self._lock:
+            return self.uploads.get(key) == hashes
+
+    def set_uploaded(self, key, hashes):
+        with self._lock:
+            self.uploads[key] = hashes
+            temporary_path = self.path + '.tmp'
+            with open(temporary_path, 'w') as manifest_file:
+                json.dump(self.uploads, manifest_file, indent=1, sort_keys=True)
+            os.replace(temporary_path, self.path)
 
 
 def get_password(args):
@@ -65,63 +175,177 @@ def get_ssl_context():
     return context
 
 
-def authenticate(args):
+class ConnectionPool:
+    """Keep-alive connections to the server, shared by the uploading threads.
+
+    `http.client` reconnects by itself when the server closes a connection, so
+    a connection taken from the pool is always usable.
+    """
+
+    def __init__(self, args):
+        self.server = args.server
+        self.port = args.port
+        self.use_tls = not args.http
+        self.ssl_context = get_ssl_context() if self.use_tls else None
+        self._idle = queue.SimpleQueue()
+
+    def _connect(self):
+        if not self.use_tls:
+            return http.client.HTTPConnection(self.server, self.port, timeout=TIMEOUT)
+        return http.client.HTTPSConnection(self.server, self.port, timeout=TIMEOUT, context=self.ssl_context)
+
+    def request(self, method, url, body, headers):
+        """Sends a request and returns the response status, reason and headers."""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            conn.request(method, url, body, headers)
+            response = conn.getresponse()
+            # The response must be read to the end before the connection can be reused.
+            response.read()
+        except Exception:
+            conn.close()
+            raise
+        self._idle.put(conn)
+        return response.status, response.reason, response
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def authenticate(args, pool):
     encoded_password = urllib.parse.quote(get_password(args), safe='')
     body = f'password={encoded_password}'
 
-    conn = http.client.HTTPSConnection(args.server, args.port, timeout=TIMEOUT, context=get_ssl_context())
-    conn.request('POST', '/login', body, AUTHENTICATIO_REQUEST_HEADERS)
-    response = conn.getresponse()
+    _, _, response = pool.request('POST', '/login', body, AUTHENTICATIO_REQUEST_HEADERS)
     return response.getheader('Set-Cookie')
 
 
-def upload_file(args, cookie):
+def build_tarball(args, files):
+    """Compresses the files into a temporary file, without holding all of them in memory."""
+    mode = COMPRESSIONS[args.compression][0]
+    if args.compression in ('gz', 'bz2'):
+        options = {'compresslevel': max(1, args.compression_level) if args.compression == 'bz2'
+                   else args.compression_level}
+    elif args.compression == 'xz':
+        options = {'preset': args.compression_level}
+    else:
+        options = {}
+    tarball_file = tempfile.SpooledTemporaryFile(max_size=MAX_INMEMORY_TARBALL_SIZE)
+    with tarfile.open(fileobj=tarball_file, mode=mode, **options) as tarball:
+        add_directory_to_tarball(tarball, files)
+    size = tarball_file.tell()
+    tarball_file.seek(0)
+    return tarball_file, size
+
+
+def stream_body(preamble, tarball_file, epilogue):
+    yield preamble
+    while chunk := tarball_file.read(CHUNK_SIZE):
+        yield chunk
+    yield epilogue
+
+
+def upload_file(args, pool, cookie, name, files):
     form_data = {
         'tactical': args.tactical_module,
         'strategic': args.strategic_module,
         'overwrite': 'on',
-        'name': args.name,
+        'name': name,
     }
 
-    body = b''
+    preamble = []
     for k, v in form_data.items():
-        body += '--{}\n'.format(BOUNDARY).encode('utf8')
-        body += 'Content-Disposition: form-data; name="{}"\n'.format(k).encode('utf8')
-        body += '\n{}\n'.format(v).encode('utf8')
-
-    body += '--{}\n'.format(BOUNDARY).encode('utf8')
-    body += b'Content-Disposition: form-data; name="tarball"; filename="code.tar.gz"'
-    body += b'Content-Type: application/tar+gzip\n'
-
-    inmemory_tar = io.BytesIO()
-    with tarfile.open(fileobj=inmemory_tar, mode='w:gz') as tarball:
-        add_directory_to_tarball(tarball, args.directory)
-
-    body += b'\n'
-    body += inmemory_tar.getbuffer()
-    body += b'\n'
-    body += '--{}--\n'.format(BOUNDARY).encode('utf8')
-
-    headers = {'Cookie': cookie}
-    headers.update(UPLOAD_REQUEST_HEADERS)
-
-    conn = http.client.HTTPSConnection(args.server, args.port, timeout=TIMEOUT, context=get_ssl_context())
-    conn.request('POST', '/code/upload', body, headers)
-    response = conn.getresponse()
-    if response.status != 302:
-        print('Failure:', response.status, response.reason, file=sys.stderr)
+        preamble.append('--{}\n'.format(BOUNDARY))
+        preamble.append('Content-Disposition: form-data; name="{}"\n'.format(k))
+        preamble.append('\n{}\n'.format(v))
+
+    _, tarball_name, tarball_type = COMPRESSIONS[args.compression]
+    preamble.append('--{}\n'.format(BOUNDARY))
+    preamble.append('Content-Disposition: form-data; name="tarball"; filename="{}"\n'.format(tarball_name))
+    preamble.append('Content-Type: {}\n'.format(tarball_type))
+    preamble.append('\n')
+    preamble = ''.join(preamble).encode('utf8')
+    epilogue = '\n--{}--\n'.format(BOUNDARY).encode('utf8')
+
+    tarball_file, tarball_size = build_tarball(args, files)
+    with tarball_file:
+        headers = {'Cookie': cookie, 'Content-Length': str(len(preamble) + tarball_size + len(epilogue))}
+        headers.update(UPLOAD_REQUEST_HEADERS)
+        status, reason, _ = pool.request('POST', '/code/upload', stream_body(preamble, tarball_file, epilogue),
+                                         headers)
+    return status == 302, f'{status} {reason}'
+
+
+def upload_variant(args, pool, manifest, cookie, variant):
+    name, directory, files, hashes = variant
+    try:
+        success, status = upload_file(args, pool, cookie, name, files)
+    except (OSError, http.client.HTTPException) as e:
+        success, status = False, str(e)
+    if success:
+        manifest.set_uploaded(manifest.key(args, directory), hashes)
+        print(f'{name}: Success')
     else:
-        print('Success')
+        print(f'{name}: Failure:', status, file=sys.stderr)
+    return success
+
+
+def get_changed_variants(args, manifest):
+    """The (name, directory, files, file hashes) of every variant that needs to be uploaded."""
+    changed = []
+    for name, directory in args.variants:
+        files = get_directory_files(directory)
+        hashes = hash_files(files)
+        if not args.force and manifest.is_uploaded(manifest.key(args, directory), hashes):
+            print(f'{name}: Unchanged since the last upload, skipping')
+        else:
+            changed.append((name, directory, files, hashes))
+    return changed
+
+
+def get_checked_variants(args, variants):
+    """The variants that compile, and import and construct within the budgets."""
+    if args.skip_check:
+        return variants
+    checked = []
+    for variant in variants:
+        name, directory = variant[:2]
+        problems = packaging_check.check(directory, args.tactical_module, args.strategic_module,
+                                         args.import_budget, args.construction_budget)
+        if problems:
+            print(f'{name}: Refusing to upload:', *problems, sep='\n    ', file=sys.stderr)
+        else:
+            checked.append(variant)
+    return checked
 
 
 def main(args):
-    cookie = authenticate(args)
-    if not cookie:
-        print('Invalid password', file=sys.stderr)
-    else:
-        upload_file(args, cookie)
+    manifest = Manifest(args.manifest)
+    changed = get_changed_variants(args, manifest)
+    variants = get_checked_variants(args, changed)
+    if not variants:
+        return len(variants) == len(changed)
+    pool = ConnectionPool(args)
+    try:
+        cookie = authenticate(args, pool)
+        if not cookie:
+            print('Invalid password', file=sys.stderr)
+            return False
+        with ThreadPoolExecutor(max(1, args.connections)) as executor:
+            results = executor.map(lambda variant: upload_variant(args, pool, manifest, cookie, variant), variants)
+            return all(list(results)) and len(variants) == len(changed)
+    finally:
+        pool.close()
 
 
 if __name__ == '__main__':
     args = parse_args()
-    main(args)
+    if not main(args):
+        sys.exit(1)